@@ -198,7 +198,7 @@ CORS_ALLOW_HEADERS = list(default_headers) + [
 # REST Framework Settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'users.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
         'rest_framework.authentication.BasicAuthentication',
     ),
@@ -209,6 +209,44 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 20,
 }
 
+# Cache: CACHE_BACKEND=locmem (default, per process), file (CACHE_LOCATION is a
+# directory) or redis (CACHE_LOCATION is a redis:// URL; needs the redis package).
+# Use file or redis when running several workers so invalidations reach all of them.
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'locmem')
+if CACHE_BACKEND == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('CACHE_LOCATION', 'redis://127.0.0.1:6379/1'),
+            'KEY_PREFIX': os.getenv('CACHE_KEY_PREFIX', 'crm'),
+        }
+    }
+elif CACHE_BACKEND == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.getenv('CACHE_LOCATION', str(BASE_DIR / 'cache')),
+            'KEY_PREFIX': os.getenv('CACHE_KEY_PREFIX', 'crm'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'crm',
+        }
+    }
+
+# Seconds dashboard/report responses are kept by core.response_cache (writes invalidate sooner)
+DASHBOARD_CACHE_TTL = int(os.getenv('DASHBOARD_CACHE_TTL', '60'))
+# With locmem, version stamps and per-process copies (permissions, stages,
+# tokens, ETags) expire after this many seconds since other workers' bumps never arrive
+LOCAL_CACHE_MAX_AGE = int(os.getenv('LOCAL_CACHE_MAX_AGE', '30'))
+
+# Per-process token -> user cache used by users.authentication.CachedTokenAuthentication
+TOKEN_AUTH_CACHE_SIZE = int(os.getenv('TOKEN_AUTH_CACHE_SIZE', '1024'))
+TOKEN_AUTH_CACHE_TTL = int(os.getenv('TOKEN_AUTH_CACHE_TTL', '300'))
+
 # Media files
 if os.getenv('USE_AWS_S3') == 'True':
     AWS_ACCESS_KEY_ID = os.getenv('AWS_ACCESS_KEY_ID')
@@ -226,11 +264,35 @@ if os.getenv('USE_AWS_S3') == 'True':
         "staticfiles": {
             "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage",
         },
+        # Background export artifacts (student PII); only served via /api/export-jobs/<id>/download/
+        "exports": {
+            "BACKEND": "storages.backends.s3boto3.S3Boto3Storage",
+            "OPTIONS": {"location": "private"},
+        },
     }
 else:
     MEDIA_URL = 'https://natyaarts.org/api/media/'
     MEDIA_ROOT = BASE_DIR / 'media'
 
+    STORAGES = {
+        "default": {
+            "BACKEND": "django.core.files.storage.FileSystemStorage",
+        },
+        "staticfiles": {
+            "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage",
+        },
+        # Kept outside MEDIA_ROOT (which /api/media/ serves without auth); only served via /api/export-jobs/<id>/download/
+        "exports": {
+            "BACKEND": "django.core.files.storage.FileSystemStorage",
+            "OPTIONS": {"location": os.getenv('EXPORT_ROOT', str(BASE_DIR / 'private_exports'))},
+        },
+    }
+
+# Background exports (core.export_jobs) are deleted this long after they finish
+EXPORT_JOB_TTL_HOURS = int(os.getenv('EXPORT_JOB_TTL_HOURS', '72'))
+# RUNNING/PENDING exports with no progress for this long (e.g. the worker restarted) are marked FAILED by expire_exports
+EXPORT_JOB_STALE_MINUTES = int(os.getenv('EXPORT_JOB_STALE_MINUTES', '30'))
+
 # Custom User Model
 AUTH_USER_MODEL = 'users.User'
 
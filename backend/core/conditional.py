@@ -0,0 +1,153 @@
+"""
+Conditional GET for API views: an ETag on the response and 304 Not Modified
+when the client's If-None-Match already names it.
+
+conditional_response() hashes a payload that has already been built.
+ConditionalGetMixin is for read-mostly endpoints: its ETag is derived from
+per-family version stamps kept in Django's cache (bumped after commit by the
+post_save/post_delete receivers connected in core.signals), so a matching
+request is answered before the handler runs, without touching the serializer
+or the tables behind it. With a per-process cache the stamps expire after
+LOCAL_CACHE_MAX_AGE (see core.version_stamps), so a worker that missed a bump
+stops answering 304 within that bound.
+
+Responses are marked `private, no-cache`, so browsers keep them but revalidate
+on every use; a poll with nothing new then costs one empty 304.
+"""
+import hashlib
+import json
+
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+from .version_stamps import bump_version, current_version
+
+VERSION_CACHE_KEY = 'conditional:version:{}'
+
+# Resource family -> models whose writes change what its endpoints return
+VERSION_FAMILIES = {
+    'programs': ['core.Program', 'core.SubProgram', 'core.Course'],
+    'pipeline_stages': ['crm.PipelineStage'],
+    'dynamic_fields': ['forms_builder.DynamicField'],
+    'users': [settings.AUTH_USER_MODEL, 'users.RolePermission', 'hrms.EmployeeProfile', 'hrms.Designation'],
+    'teaching': ['core.Batch', 'core.ClassSession'],
+    # Bumped by crm.signals (and bulk assignment views) when a lead changes hands
+    'lead_assignment': [],
+    'integration_settings': ['integrations.IntegrationSetting'],
+    # Dashboard/report responses cached by core.response_cache
+    'dashboards': ['core.Student', 'crm.LeadInteraction', 'core.Transaction', 'finance.Expense', 'finance.ExpenseCategory', 'crm.Campaign'],
+}
+
+
+def content_etag(data):
+    """Strong ETag for a JSON-serialisable payload."""
+    payload = json.dumps(data, sort_keys=True, separators=(',', ':'), default=str)
+    return quote_etag(hashlib.md5(payload.encode('utf-8')).hexdigest())
+
+
+def etag_matches(request, etag):
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    etags = parse_etags(header)
+    return '*' in etags or etag in etags or etag.strip('"') in etags
+
+
+def conditional_response(request, data=None, etag=None):
+    """Response(data) carrying `etag` (default: a hash of `data`), or an empty 304 if the client has it."""
+    etag = etag or content_etag(data)
+    if etag_matches(request, etag):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = Response(data)
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ['Authorization'])
+    return response
+
+
+def resource_version(family):
+    return current_version(VERSION_CACHE_KEY.format(family))
+
+
+def bump_resource_version(*families):
+    """Give `families` new version stamps once the current transaction commits."""
+    keys = [VERSION_CACHE_KEY.format(family) for family in families]
+    transaction.on_commit(lambda: bump_version(*keys))
+
+
+def _version_receiver(family):
+    def receiver(sender, update_fields=None, **kwargs):
+        # Logins only touch last_login, which no family exposes
+        if update_fields is not None and set(update_fields) <= {'last_login'}:
+            return
+        bump_resource_version(family)
+    return receiver
+
+
+def connect_version_signals():
+    for family, labels in VERSION_FAMILIES.items():
+        receiver = _version_receiver(family)
+        for label in labels:
+            model = apps.get_model(label)
+            uid = f'conditional:{family}:{label}'
+            post_save.connect(receiver, sender=model, weak=False, dispatch_uid=uid)
+            post_delete.connect(receiver, sender=model, weak=False, dispatch_uid=uid)
+
+
+class NotModified(Exception):
+    pass
+
+
+class ConditionalGetMixin:
+    """
+    ETag/If-None-Match for an APIView or viewset whose GET output only changes
+    when a model in `conditional_families` is written. The ETag also covers the
+    path and query string and the requesting user's id, role and section.
+    `conditional_actions` limits it to some viewset actions (default: every GET).
+    """
+    conditional_families = ()
+    conditional_actions = None
+
+    def get_conditional_etag(self, request):
+        user = request.user
+        parts = [
+            request.get_full_path(),
+            request.META.get('HTTP_ACCEPT', ''),
+            str(user.pk),
+            getattr(user, 'role', '') or '',
+            getattr(user, 'sales_section', '') or '',
+        ]
+        parts += [resource_version(family) for family in self.conditional_families]
+        return quote_etag(hashlib.md5('|'.join(parts).encode('utf-8')).hexdigest())
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.conditional_etag = None
+        if request.method not in ('GET', 'HEAD'):
+            return
+        if self.conditional_actions is not None and getattr(self, 'action', None) not in self.conditional_actions:
+            return
+        self.conditional_etag = self.get_conditional_etag(request)
+        if etag_matches(request, self.conditional_etag):
+            raise NotModified()
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return Response(status=status.HTTP_304_NOT_MODIFIED)
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        etag = getattr(self, 'conditional_etag', None)
+        if etag and response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            response['ETag'] = etag
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ['Authorization'])
+        return response
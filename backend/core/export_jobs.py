@@ -0,0 +1,169 @@
+"""
+Background student/lead exports.
+
+StudentViewSet.export_async records an ExportJob with the request's filter
+params; a daemon thread (the same pattern as the Wise sync) rebuilds the
+StudentViewSet queryset for the requesting user, writes the rows from
+core.exports to a temp file (gzipped CSV or write-only openpyxl workbook) and
+saves it under an unguessable name to the private "exports" storage (outside
+MEDIA_ROOT locally, a private S3 prefix when USE_AWS_S3 is set). Files are only
+served to their requester by ExportJobViewSet.download.
+
+The `expire_exports` command (cron) deletes finished artifacts after
+EXPORT_JOB_TTL_HOURS and fails jobs whose thread stopped reporting progress
+(worker restarts kill daemon threads) after EXPORT_JOB_STALE_MINUTES.
+"""
+import csv
+import gzip
+import logging
+import os
+import tempfile
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import connection, transaction
+from django.db.models import Q
+from django.http import HttpRequest, QueryDict
+from django.utils import timezone
+
+from .models import ExportJob
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_EVERY = 2000
+
+
+def export_ttl():
+    return timedelta(hours=getattr(settings, 'EXPORT_JOB_TTL_HOURS', 72))
+
+
+def export_stale_after():
+    return timedelta(minutes=getattr(settings, 'EXPORT_JOB_STALE_MINUTES', 30))
+
+
+def export_filename(job):
+    """Readable download name; the stored artifact itself has a random name."""
+    suffix = '.xlsx' if job.file_format == 'XLSX' else '.csv.gz'
+    stamp = timezone.localtime(job.finished_at or job.created_at).strftime('%Y%m%d%H%M%S')
+    return f"{job.kind.lower()}_export_{job.pk}_{stamp}{suffix}"
+
+
+def build_export_queryset(job):
+    """The queryset StudentViewSet would serve `job.requested_by` for `job.params`."""
+    from rest_framework.request import Request
+    from .views import StudentViewSet
+
+    http_request = HttpRequest()
+    http_request.method = 'GET'
+    http_request.GET = QueryDict(mutable=True)
+    for key, value in job.params.items():
+        http_request.GET.setlist(key, value if isinstance(value, list) else [value])
+    http_request.user = job.requested_by
+
+    view = StudentViewSet()
+    view.action = 'export_leads_csv' if job.kind == 'LEADS' else 'export_csv'
+    view.args, view.kwargs, view.format_kwarg = (), {}, None
+    view.request = Request(http_request)
+    view.request.user = job.requested_by
+    return view.filter_queryset(view.get_queryset())
+
+
+def _write_csv(path, rows, on_row):
+    with gzip.open(path, 'wt', encoding='utf-8', newline='') as fh:
+        # UTF-8 BOM so Excel opens it correctly
+        fh.write('\ufeff')
+        writer = csv.writer(fh)
+        for row in rows:
+            writer.writerow(row)
+            on_row()
+
+
+def _write_xlsx(path, rows, on_row):
+    from openpyxl import Workbook
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('Export')
+    for row in rows:
+        ws.append(row)
+        on_row()
+    wb.save(path)
+
+
+def run_export_job(job_id):
+    from .exports import student_export_rows, lead_export_rows
+
+    job = ExportJob.objects.select_related('requested_by').get(pk=job_id)
+    started = timezone.now()
+    ExportJob.objects.filter(pk=job.pk).update(status='RUNNING', started_at=started, heartbeat_at=started)
+    suffix = '.xlsx' if job.file_format == 'XLSX' else '.csv.gz'
+    fd, path = tempfile.mkstemp(suffix=suffix)
+    os.close(fd)
+    try:
+        qs = build_export_queryset(job)
+        ExportJob.objects.filter(pk=job.pk).update(total_rows=qs.count())
+        rows = lead_export_rows(qs) if job.kind == 'LEADS' else student_export_rows(qs)
+
+        # The header is the first "row"; progress only counts data rows
+        written = [-1]
+
+        def on_row():
+            written[0] += 1
+            if written[0] and written[0] % PROGRESS_EVERY == 0:
+                ExportJob.objects.filter(pk=job.pk).update(processed_rows=written[0], heartbeat_at=timezone.now())
+
+        if job.file_format == 'XLSX':
+            _write_xlsx(path, rows, on_row)
+        else:
+            _write_csv(path, rows, on_row)
+
+        with open(path, 'rb') as fh:
+            # export_upload_to replaces the name with a random one
+            job.file.save(f'export{suffix}', File(fh), save=False)
+        finished = timezone.now()
+        ExportJob.objects.filter(pk=job.pk).update(
+            status='COMPLETED', file=job.file.name, processed_rows=max(written[0], 0),
+            finished_at=finished, expires_at=finished + export_ttl(),
+        )
+    except Exception as e:
+        logger.exception("Export job %s failed", job_id)
+        ExportJob.objects.filter(pk=job.pk).update(status='FAILED', error=str(e), finished_at=timezone.now())
+    finally:
+        os.remove(path)
+
+
+def start_export_job(job):
+    """Run the export on a daemon thread once the job row is committed."""
+    def run():
+        try:
+            run_export_job(job.pk)
+        finally:
+            connection.close()
+
+    def start():
+        thread = threading.Thread(target=run, name=f'export-job-{job.pk}')
+        thread.daemon = True
+        thread.start()
+
+    transaction.on_commit(start)
+
+
+def expire_export_jobs(now=None):
+    """
+    Delete artifacts past their expiry and fail jobs whose worker stopped
+    reporting progress. Returns the number of jobs changed.
+    """
+    now = now or timezone.now()
+    count = 0
+    for job in ExportJob.objects.filter(status='COMPLETED', expires_at__lte=now):
+        if job.file:
+            job.file.delete(save=False)
+        ExportJob.objects.filter(pk=job.pk).update(status='EXPIRED', file='')
+        count += 1
+
+    # Daemon threads die with their worker, leaving the job PENDING/RUNNING forever
+    stale_before = now - export_stale_after()
+    count += ExportJob.objects.filter(status__in=['PENDING', 'RUNNING']).filter(
+        Q(heartbeat_at__lt=stale_before) | Q(heartbeat_at__isnull=True, created_at__lt=stale_before)
+    ).update(status='FAILED', error='Export was interrupted (server restarted); please request it again.', finished_at=now)
+    return count
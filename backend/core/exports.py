@@ -0,0 +1,189 @@
+"""
+Row generators for the student/lead CSV exports.
+
+Everything a row needs is selected in one `values()` query (related names via
+joins, latest note and paid months via subqueries, dynamic fields pivoted into
+one subquery column per label) and read with `iterator()`, so an export runs in
+constant memory with a fixed number of queries however many students match.
+"""
+import csv
+
+from django.db.models import CharField, F, OuterRef, Subquery
+from django.http import StreamingHttpResponse
+
+EXPORT_CHUNK_SIZE = 2000
+
+STUDENT_COLUMNS = [
+    'CRM Student ID', 'First Name', 'Last Name', 'Mobile', 'Email',
+    'Program', 'Sub Program', 'Course', 'Batch', 'Lead Status',
+    'Academic Status', 'Assigned To', 'Campaign', 'Father/Husband Name',
+    'Mother Name', 'Date of Birth', 'Gender', 'Marital Status',
+    'Permanent Address', 'Correspondence Address', 'Total Paid (CRM)',
+    'Total Fee (Synced)', 'Paid Fee (Synced)', 'Fee Due Date', 'Monthly Payments (Paid Months)',
+]
+
+LEAD_COLUMNS = ['Lead ID', 'Lead Name', 'Mobile', 'Email', 'Assigned To', 'Status', 'Date Created', 'Campaign', 'Note']
+
+STANDARD_STATUS_NAMES = {
+    'NEW': 'New Lead',
+    'FOLLOW_UP': 'Follow-up',
+    'PAYMENT_PENDING': 'Payment Pending',
+    'ENROLLED': 'Enrolled',
+    'DROPPED': 'Dropped',
+    'CONVERTED': 'Converted',
+    'DUPLICATE': 'Duplicate',
+}
+
+
+class ConcatSubquery(Subquery):
+    """
+    Comma-separated values of a one-column `value` queryset, in the queryset's order.
+    SQLite before 3.44 has no ORDER BY inside GROUP_CONCAT, so the ordered rows are
+    concatenated from a derived table; PostgreSQL keeps the order through ARRAY().
+    """
+    template = "(SELECT GROUP_CONCAT(value, ', ') FROM (%(subquery)s))"
+    output_field = CharField()
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, template="ARRAY_TO_STRING(ARRAY(%(subquery)s), ', ')", **extra_context)
+
+
+def latest_note_subquery():
+    from crm.models import LeadInteraction
+    return Subquery(
+        LeadInteraction.objects.filter(student=OuterRef('pk')).order_by('-date').values('notes')[:1]
+    )
+
+
+def paid_months_subquery():
+    from .models import MonthlyPayment
+    months = MonthlyPayment.objects.filter(student=OuterRef('pk')).order_by('-month').values(value=F('month'))
+    return ConcatSubquery(months)
+
+
+def dynamic_field_columns(qs):
+    """{alias: label} for every dynamic-field label that has a value among `qs`, in form order."""
+    from forms_builder.models import StudentDynamicValue
+    labels = []
+    rows = (
+        StudentDynamicValue.objects.filter(student__in=qs.order_by().values('pk'))
+        .order_by('field__order', 'field__label').values_list('field__label', flat=True).distinct()
+    )
+    for label in rows:
+        if label not in labels:
+            labels.append(label)
+    return {f'dyn_{i}': label for i, label in enumerate(labels)}
+
+
+def _dynamic_value_subquery(label):
+    from forms_builder.models import StudentDynamicValue
+    return Subquery(
+        StudentDynamicValue.objects.filter(student=OuterRef('pk'), field__label=label).order_by('-id').values('value')[:1]
+    )
+
+
+def _assignee_name(row):
+    if not row['assigned_to_id']:
+        return None
+    return f"{row['assigned_to__first_name'] or ''} {row['assigned_to__last_name'] or ''}".strip() or row['assigned_to__username']
+
+
+def _base_values(qs):
+    # The viewset queryset carries select/prefetch lookups meant for the serializer
+    return qs.select_related(None).prefetch_related(None)
+
+
+def student_export_rows(qs):
+    """Header row followed by one row per student, matching the historical export_csv layout."""
+    dynamic = dynamic_field_columns(qs)
+    values = _base_values(qs).annotate(
+        export_paid_months=paid_months_subquery(),
+        **{alias: _dynamic_value_subquery(label) for alias, label in dynamic.items()},
+    ).values(
+        'crm_student_id', 'first_name', 'last_name', 'mobile', 'email',
+        'program_type__name', 'sub_program__name', 'course__name', 'batch__name',
+        'lead_status', 'academic_status',
+        'assigned_to_id', 'assigned_to__first_name', 'assigned_to__last_name', 'assigned_to__username',
+        'campaign__name', 'father_husband_name', 'mother_name', 'dob', 'gender', 'marital_status',
+        'perm_address', 'corr_address', 'total_paid', 'total_fee', 'paid_fee', 'fee_due_date',
+        'export_paid_months', *dynamic.keys(),
+    )
+
+    yield STUDENT_COLUMNS + list(dynamic.values())
+    for row in values.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield [
+            row['crm_student_id'],
+            row['first_name'],
+            row['last_name'],
+            row['mobile'],
+            row['email'],
+            row['program_type__name'] or 'N/A',
+            row['sub_program__name'] or 'N/A',
+            row['course__name'] or 'N/A',
+            row['batch__name'] or 'N/A',
+            row['lead_status'],
+            row['academic_status'],
+            _assignee_name(row) or 'Unassigned',
+            row['campaign__name'] or 'N/A',
+            row['father_husband_name'] or '',
+            row['mother_name'] or '',
+            row['dob'] or '',
+            row['gender'] or '',
+            row['marital_status'] or '',
+            row['perm_address'] or '',
+            row['corr_address'] or '',
+            row['total_paid'],
+            row['total_fee'],
+            row['paid_fee'],
+            row['fee_due_date'] or '',
+            row['export_paid_months'] or '',
+            *(row[alias] for alias in dynamic),
+        ]
+
+
+def lead_export_rows(qs):
+    """Header row followed by one row per lead with the resolved stage name and latest note."""
+    from crm.reference_data import get_reference_data
+
+    stage_map = get_reference_data().stage_names
+    values = _base_values(qs).annotate(export_latest_note=latest_note_subquery()).values(
+        'id', 'crm_student_id', 'first_name', 'last_name', 'mobile', 'email', 'lead_status', 'created_at',
+        'assigned_to_id', 'assigned_to__first_name', 'assigned_to__last_name', 'assigned_to__username',
+        'campaign__name', 'export_latest_note',
+    )
+
+    yield LEAD_COLUMNS
+    for row in values.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        status_raw = str(row['lead_status'] or '')
+        yield [
+            row['crm_student_id'] or row['id'],
+            f"{row['first_name'] or ''} {row['last_name'] or ''}".strip(),
+            row['mobile'] or '',
+            row['email'] or '',
+            _assignee_name(row) or '',
+            STANDARD_STATUS_NAMES.get(status_raw) or stage_map.get(status_raw) or status_raw or 'New Lead',
+            row['created_at'].strftime('%d/%m/%Y') if row['created_at'] else '',
+            row['campaign__name'] or '',
+            row['export_latest_note'] or '',
+        ]
+
+
+class Echo:
+    """File-like object whose write() just returns the line, for csv.writer."""
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows, filename, bom=False):
+    writer = csv.writer(Echo())
+
+    def content():
+        if bom:
+            # UTF-8 BOM so Excel opens it correctly
+            yield '\ufeff'
+        for row in rows:
+            yield writer.writerow(row)
+
+    response = StreamingHttpResponse(content(), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
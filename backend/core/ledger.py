@@ -0,0 +1,77 @@
+"""
+Student fee ledger.
+
+`Student.total_paid` mirrors the sum of each student's Transaction rows (the
+money received; the record-payment flow writes a MonthlyPayment alongside the
+Transaction for the same money, so MonthlyPayment amounts are not added), and
+`Student.last_payment_at` the latest Transaction or MonthlyPayment date, so fee
+screens and defaulter filters can read a column instead of aggregating payments per row.
+"""
+import datetime
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Sum, Max
+from django.utils import timezone
+
+from .models import Student, Transaction, MonthlyPayment
+
+
+def _as_datetime(value):
+    if value is None or isinstance(value, datetime.datetime):
+        return value
+    return timezone.make_aware(datetime.datetime.combine(value, datetime.time.min))
+
+
+def _ledger_rows(student_ids=None):
+    """Return {student_id: (total_paid, last_payment_at)} for students with any payment."""
+    ledger = {}
+    # (queryset, date field, whether its amounts count towards total_paid)
+    sources = [
+        (Transaction.objects.all(), 'date', True),
+        (MonthlyPayment.objects.all(), 'paid_date', False),
+    ]
+    for qs, date_field, counts_paid in sources:
+        if student_ids is not None:
+            qs = qs.filter(student_id__in=student_ids)
+        rows = qs.order_by().values('student_id').annotate(total=Sum('amount'), last=Max(date_field))
+        for row in rows:
+            total, last = ledger.get(row['student_id'], (Decimal('0.00'), None))
+            row_last = _as_datetime(row['last'])
+            if last is None or (row_last is not None and row_last > last):
+                last = row_last
+            if counts_paid:
+                total += row['total'] or 0
+            ledger[row['student_id']] = (total, last)
+    return ledger
+
+
+def refresh_fee_ledger(student_id, student=None):
+    """
+    Recompute the ledger for one student after a payment write.
+    When the in-memory `student` is passed its attributes are updated too,
+    so the caller can serialize it without another query.
+    """
+    with transaction.atomic():
+        # Lock the student row so concurrent payment writes apply one after another
+        if not Student.objects.select_for_update().filter(pk=student_id).exists():
+            return
+        total_paid, last_payment_at = _ledger_rows([student_id]).get(student_id, (Decimal('0.00'), None))
+        Student.objects.filter(pk=student_id).update(total_paid=total_paid, last_payment_at=last_payment_at)
+    if student is not None:
+        student.total_paid = total_paid
+        student.last_payment_at = last_payment_at
+
+
+def rebuild_fee_ledger(batch_size=500):
+    """Rebuild the ledger for every student. Returns the number of students with payments."""
+    with transaction.atomic():
+        ledger = _ledger_rows()
+        Student.objects.exclude(pk__in=list(ledger)).exclude(total_paid=0, last_payment_at__isnull=True).update(
+            total_paid=0, last_payment_at=None
+        )
+        students = []
+        for student_id, (total_paid, last_payment_at) in ledger.items():
+            students.append(Student(pk=student_id, total_paid=total_paid, last_payment_at=last_payment_at))
+        Student.objects.bulk_update(students, ['total_paid', 'last_payment_at'], batch_size=batch_size)
+    return len(ledger)
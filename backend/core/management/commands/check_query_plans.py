@@ -0,0 +1,70 @@
+import re
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.models import Student, Transaction, MonthlyPayment
+from crm.models import LeadInteraction, Task
+from notifications.models import Notification
+
+
+def canonical_queries():
+    """(label, queryset, table that must be read through an index) for the dashboard/list hot paths."""
+    now = timezone.now()
+    since = now - timedelta(days=30)
+    live_leads = Student.objects.filter(is_active=True).exclude(lead_status='DUPLICATE')
+    return [
+        ('StudentViewSet: rep leads', live_leads.filter(assigned_to_id=1).order_by('-created_at'), 'core_student'),
+        ('StudentViewSet: leads by status', Student.objects.filter(lead_status__in=['NEW', 'FOLLOW_UP']), 'core_student'),
+        ('StudentViewSet: leads created in range', Student.objects.filter(created_at__gte=since), 'core_student'),
+        ('BDEReportView: assigned leads', Student.objects.filter(assigned_to_id=1, is_active=True), 'core_student'),
+        ('MarketingDashboardView: campaign leads', live_leads.filter(campaign_id=1, created_at__gte=since), 'core_student'),
+        ('CampaignViewSet.report: campaign leads', Student.objects.filter(campaign_id=1, is_active=True), 'core_student'),
+        ('DashboardStatsView: rep calls', LeadInteraction.objects.filter(author_id=1, interaction_type='CALL', date__gte=since), 'crm_leadinteraction'),
+        ('CallAnalyticsView: calls in range', LeadInteraction.objects.filter(interaction_type='CALL', date__gte=since, date__lt=now), 'crm_leadinteraction'),
+        ('export_leads_csv: latest note', LeadInteraction.objects.filter(student_id=1).order_by('-date')[:1], 'crm_leadinteraction'),
+        ('DashboardStatsView: revenue', Transaction.objects.filter(date__gte=since), 'core_transaction'),
+        ('DashboardStatsView: month payments', MonthlyPayment.objects.filter(month=now.date().replace(day=1)), 'core_monthlypayment'),
+        ('BDEReportView: pending tasks', Task.objects.filter(assigned_to_id=1, status='PENDING', due_date__lte=now), 'crm_task'),
+        ('NotificationViewSet: unread count', Notification.objects.filter(user_id=1, is_read=False), 'notifications_notification'),
+    ]
+
+
+def full_scans(plan, table):
+    if connection.vendor == 'postgresql':
+        return re.findall(rf'Seq Scan on {table}\b', plan)
+    # SQLite: "SCAN <table>" without "USING ... INDEX" is a full table scan
+    return [line for line in plan.splitlines() if re.search(rf'\bSCAN {table}\b(?!.*USING)', line)]
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the canonical lead/dashboard queries and fail if any of them falls back to a full table scan'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose-plans', action='store_true', help='Print every query plan')
+
+    def handle(self, *args, **options):
+        if connection.vendor not in ['sqlite', 'postgresql']:
+            raise CommandError(f"Unsupported database vendor '{connection.vendor}'")
+
+        failures = []
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                # Small tables make the planner prefer seq scans; ask whether an index *can* serve the query
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+            for label, qs, table in canonical_queries():
+                plan = qs.explain()
+                scans = full_scans(plan, table)
+                if options['verbose_plans'] or scans:
+                    self.stdout.write(f"{label}:\n{plan}\n")
+                if scans:
+                    failures.append(label)
+                    self.stdout.write(self.style.ERROR(f"FULL SCAN  {label}"))
+                else:
+                    self.stdout.write(self.style.SUCCESS(f"OK         {label}"))
+
+        if failures:
+            raise CommandError(f"{len(failures)} canonical queries regressed to full table scans: {', '.join(failures)}")
@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from core.export_jobs import expire_export_jobs
+
+class Command(BaseCommand):
+    help = 'Delete background export files past EXPORT_JOB_TTL_HOURS and fail jobs interrupted by a restart (run from cron every few minutes)'
+
+    def handle(self, *args, **options):
+        count = expire_export_jobs()
+        self.stdout.write(self.style.SUCCESS(f"Expired or failed {count} export jobs."))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError
+from core.models import Student
+from core.search import SEARCH_FIELDS, get_search_backend, rebuild_search_index
+
+class Command(BaseCommand):
+    help = 'Build or rebuild the student search index (SQLite FTS5 / PostgreSQL pg_trgm)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--drop', action='store_true', help='Drop and recreate the index table first')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        if backend is None:
+            raise CommandError('The configured database has no student search backend; search uses icontains.')
+        try:
+            if options['drop']:
+                backend.drop_schema()
+            rows = Student.objects.values('id', *SEARCH_FIELDS).iterator(chunk_size=options['chunk_size'])
+            count = rebuild_search_index(rows, chunk_size=options['chunk_size'])
+        except DatabaseError as e:
+            raise CommandError(f"Search index build failed: {e}")
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} students ({backend.vendor})."))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from core.ledger import rebuild_fee_ledger
+
+class Command(BaseCommand):
+    help = 'Rebuild Student.total_paid (Transaction sum) / last_payment_at (latest Transaction or MonthlyPayment)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows per bulk UPDATE')
+
+    def handle(self, *args, **options):
+        count = rebuild_fee_ledger(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Fee ledger rebuilt for {count} students with payments."))
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:35
+
+import datetime
+
+from django.db import migrations, models
+from django.db.models import Max, Sum
+from django.utils import timezone
+
+
+def backfill_fee_ledger(apps, schema_editor):
+    Student = apps.get_model('core', 'Student')
+    Transaction = apps.get_model('core', 'Transaction')
+    MonthlyPayment = apps.get_model('core', 'MonthlyPayment')
+
+    ledger = {}
+    for model, date_field in ((Transaction, 'date'), (MonthlyPayment, 'paid_date')):
+        rows = model.objects.order_by().values('student_id').annotate(total=Sum('amount'), last=Max(date_field))
+        for row in rows:
+            total, last = ledger.get(row['student_id'], (0, None))
+            row_last = row['last']
+            if row_last is not None and not isinstance(row_last, datetime.datetime):
+                row_last = timezone.make_aware(datetime.datetime.combine(row_last, datetime.time.min))
+            if last is None or (row_last is not None and row_last > last):
+                last = row_last
+            ledger[row['student_id']] = (total + (row['total'] or 0), last)
+
+    students = [Student(pk=pk, total_paid=total, last_payment_at=last) for pk, (total, last) in ledger.items()]
+    Student.objects.bulk_update(students, ['total_paid', 'last_payment_at'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0039_alter_student_email'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='student',
+            name='last_payment_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='student',
+            name='total_paid',
+            field=models.DecimalField(db_index=True, decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.RunPython(backfill_fee_ledger, migrations.RunPython.noop),
+    ]
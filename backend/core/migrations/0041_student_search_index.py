@@ -0,0 +1,80 @@
+import logging
+import re
+
+from django.db import migrations, transaction, DatabaseError
+
+logger = logging.getLogger(__name__)
+
+# Frozen copy of the core.search schema and document format at the time of this migration
+SEARCH_TABLE = 'core_student_search'
+SEARCH_FIELDS = ('first_name', 'last_name', 'crm_student_id', 'mobile', 'email')
+TOKEN_RE = re.compile(r'[^\W_]+')
+
+
+def build_document(values):
+    parts = [values.get('first_name'), values.get('last_name'), values.get('crm_student_id'), values.get('email')]
+    tokens = TOKEN_RE.findall(' '.join(str(p) for p in parts if p).lower())
+    digits = ''.join(c for c in str(values.get('mobile') or '') if c.isdigit())
+    mobile = digits[-10:] if len(digits) >= 10 else digits
+    if mobile:
+        tokens.append(mobile)
+    return ' '.join(tokens)
+
+
+def create_schema(cursor, vendor):
+    if vendor == 'sqlite':
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} "
+            f"USING fts5(document, tokenize='unicode61', prefix='2 3 4')"
+        )
+        return f'INSERT INTO {SEARCH_TABLE} (rowid, document) VALUES (%s, %s)', lambda document: document
+    cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    cursor.execute(
+        f'CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} '
+        f'(student_id integer PRIMARY KEY, document text NOT NULL)'
+    )
+    cursor.execute(
+        f'CREATE INDEX IF NOT EXISTS {SEARCH_TABLE}_trgm '
+        f'ON {SEARCH_TABLE} USING gin (document gin_trgm_ops)'
+    )
+    # Leading space lets "LIKE '% term%'" anchor the first word as well
+    return f'INSERT INTO {SEARCH_TABLE} (student_id, document) VALUES (%s, %s)', lambda document: f' {document}'
+
+
+def build_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor not in ('sqlite', 'postgresql'):
+        return
+    Student = apps.get_model('core', 'Student')
+    rows = Student.objects.using(connection.alias).values_list('id', *SEARCH_FIELDS)
+    try:
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            insert, stored = create_schema(cursor, connection.vendor)
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+            chunk = []
+            for pk, *values in rows.iterator(chunk_size=1000):
+                chunk.append((pk, stored(build_document(dict(zip(SEARCH_FIELDS, values))))))
+                if len(chunk) >= 1000:
+                    cursor.executemany(insert, chunk)
+                    chunk = []
+            if chunk:
+                cursor.executemany(insert, chunk)
+    except DatabaseError as e:
+        # Search falls back to icontains; run `manage.py rebuild_search_index` once FTS5/pg_trgm is available
+        logger.warning(f"Skipped student search index: {e}")
+
+
+def drop_search_index(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0040_student_fee_ledger'),
+    ]
+
+    operations = [
+        migrations.RunPython(build_search_index, drop_search_index),
+    ]
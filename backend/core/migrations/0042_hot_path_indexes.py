@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:39
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0041_student_search_index'),
+        ('crm', '0013_campaign_google_auto_sync'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='monthlypayment',
+            index=models.Index(fields=['month'], name='monthlypayment_month_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['lead_status'], name='student_lead_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['assigned_to', 'is_active'], name='student_assignee_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['created_at'], name='student_created_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['campaign', 'is_active'], name='student_campaign_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(condition=models.Q(('is_active', True), models.Q(('lead_status', 'DUPLICATE'), _negated=True)), fields=['assigned_to', 'created_at'], name='student_live_assignee_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(condition=models.Q(('is_active', True), models.Q(('lead_status', 'DUPLICATE'), _negated=True)), fields=['campaign', 'created_at'], name='student_live_campaign_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['date'], name='transaction_date_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:06
+
+import re
+
+from django.conf import settings
+from django.db import migrations, models
+
+DURATION_RE = re.compile(r'Duration:\s*(\d+)')
+
+
+def backfill_duration(apps, schema_editor):
+    ClassSession = apps.get_model('core', 'ClassSession')
+    alias = schema_editor.connection.alias
+    pending = []
+    rows = ClassSession.objects.using(alias).filter(teacher_summary__contains='Duration:').values_list('id', 'teacher_summary')
+    for pk, summary in rows.iterator(chunk_size=2000):
+        match = DURATION_RE.search(summary)
+        if match:
+            pending.append(ClassSession(pk=pk, duration_ms=int(match.group(1))))
+    ClassSession.objects.using(alias).bulk_update(pending, ['duration_ms'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0043_export_job'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='classsession',
+            name='duration_ms',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='classsession',
+            name='started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='classsession',
+            index=models.Index(fields=['teacher', 'date'], name='session_teacher_date_idx'),
+        ),
+        migrations.RunPython(backfill_duration, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:29
+
+import core.models
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+
+
+def expire_public_exports(apps, schema_editor):
+    # Artifacts written before this migration sit under the public MEDIA_ROOT: delete them
+    ExportJob = apps.get_model('core', 'ExportJob')
+    jobs = ExportJob.objects.using(schema_editor.connection.alias).exclude(file='').exclude(file__isnull=True)
+    for name in jobs.values_list('file', flat=True):
+        if default_storage.exists(name):
+            default_storage.delete(name)
+    jobs.update(status='EXPIRED', file='')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0045_calendar_date_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exportjob',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, help_text='Last progress update from the worker thread', null=True),
+        ),
+        migrations.AlterField(
+            model_name='exportjob',
+            name='file',
+            field=models.FileField(blank=True, null=True, storage=core.models.export_storage, upload_to=core.models.export_upload_to),
+        ),
+        migrations.RunPython(expire_public_exports, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+from django.db import migrations
+from django.db.models import DecimalField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def recompute_total_paid(apps, schema_editor):
+    # total_paid briefly also summed MonthlyPayment rows, double-counting payments recorded as both
+    Student = apps.get_model('core', 'Student')
+    Transaction = apps.get_model('core', 'Transaction')
+    alias = schema_editor.connection.alias
+    paid = (
+        Transaction.objects.using(alias).filter(student=OuterRef('pk')).order_by()
+        .values('student').annotate(total=Sum('amount')).values('total')
+    )
+    Student.objects.using(alias).update(
+        total_paid=Coalesce(Subquery(paid), Value(0), output_field=DecimalField(max_digits=12, decimal_places=2))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0046_export_job_private_storage'),
+    ]
+
+    operations = [
+        migrations.RunPython(recompute_total_paid, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,66 @@
+import logging
+import re
+
+from django.db import migrations, transaction, DatabaseError
+
+logger = logging.getLogger(__name__)
+
+# Frozen copy of the core.search schema and document format at the time of this migration
+SEARCH_TABLE = 'core_student_search'
+SEARCH_FIELDS = ('first_name', 'last_name', 'crm_student_id', 'mobile', 'email')
+TOKEN_RE = re.compile(r'[^\W_]+')
+
+
+def build_document(values):
+    parts = [values.get('first_name'), values.get('last_name'), values.get('crm_student_id'), values.get('email')]
+    tokens = TOKEN_RE.findall(' '.join(str(p) for p in parts if p).lower())
+    digits = ''.join(c for c in str(values.get('mobile') or '') if c.isdigit())
+    mobile = digits[-10:] if len(digits) >= 10 else digits
+    if mobile:
+        tokens.append(mobile)
+    return ' '.join(tokens)
+
+
+def rebuild(apps, schema_editor, options):
+    # The FTS5 tokenizer is fixed at CREATE time, so the SQLite table is rebuilt.
+    # PostgreSQL's pg_trgm table already answers substring LIKE and is left alone.
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    Student = apps.get_model('core', 'Student')
+    rows = Student.objects.using(connection.alias).values_list('id', *SEARCH_FIELDS)
+    insert = f'INSERT INTO {SEARCH_TABLE} (rowid, document) VALUES (%s, %s)'
+    try:
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+            cursor.execute(f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5(document, {options})")
+            chunk = []
+            for pk, *values in rows.iterator(chunk_size=1000):
+                chunk.append((pk, build_document(dict(zip(SEARCH_FIELDS, values)))))
+                if len(chunk) >= 1000:
+                    cursor.executemany(insert, chunk)
+                    chunk = []
+            if chunk:
+                cursor.executemany(insert, chunk)
+    except DatabaseError as e:
+        # Search falls back to icontains; run `manage.py rebuild_search_index` once FTS5 trigram is available
+        logger.warning(f"Skipped student search index: {e}")
+
+
+def use_trigram_index(apps, schema_editor):
+    rebuild(apps, schema_editor, "tokenize='trigram'")
+
+
+def use_prefix_index(apps, schema_editor):
+    rebuild(apps, schema_editor, "tokenize='unicode61', prefix='2 3 4'")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0047_fee_ledger_transactions_only'),
+    ]
+
+    operations = [
+        migrations.RunPython(use_trigram_index, use_prefix_index),
+    ]
@@ -1,6 +1,8 @@
 from django.db import models
 from django.conf import settings
 import datetime
+import re
+import uuid
 
 class Program(models.Model):
     name = models.CharField(max_length=100) # e.g., Natya, Natya Career Academy
@@ -163,6 +165,29 @@ class Student(models.Model):
     fee_due_date = models.DateField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True, null=True, blank=True)
 
+    # Fee ledger maintained by core.ledger: sum of Transaction amounts, latest Transaction/MonthlyPayment date
+    total_paid = models.DecimalField(max_digits=12, decimal_places=2, default=0, db_index=True)
+    last_payment_at = models.DateTimeField(null=True, blank=True)
+
+    LEDGER_FIELDS = ('total_paid', 'last_payment_at')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['lead_status'], name='student_lead_status_idx'),
+            models.Index(fields=['assigned_to', 'is_active'], name='student_assignee_active_idx'),
+            models.Index(fields=['created_at'], name='student_created_at_idx'),
+            models.Index(fields=['campaign', 'is_active'], name='student_campaign_active_idx'),
+            # "Live" leads as sales views filter them: active and not flagged duplicate
+            models.Index(
+                fields=['assigned_to', 'created_at'], name='student_live_assignee_idx',
+                condition=models.Q(is_active=True) & ~models.Q(lead_status='DUPLICATE'),
+            ),
+            models.Index(
+                fields=['campaign', 'created_at'], name='student_live_campaign_idx',
+                condition=models.Q(is_active=True) & ~models.Q(lead_status='DUPLICATE'),
+            ),
+        ]
+
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
 
@@ -183,6 +208,11 @@ class Transaction(models.Model):
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     date = models.DateTimeField(auto_now_add=True)
     transaction_link = models.URLField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['date'], name='transaction_date_idx'),
+        ]
     
     def __str__(self):
         return f"{self.student} - {self.transaction_id}"
@@ -217,14 +247,34 @@ class ClassSession(models.Model):
     teacher = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='conducted_sessions')
     date = models.DateField()
     teacher_summary = models.TextField(blank=True, null=True)
+    # Session length in milliseconds: Wise's `duration` on sync, or the client's value from log_session
+    duration_ms = models.PositiveBigIntegerField(null=True, blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ['-date', '-created_at']
+        indexes = [
+            models.Index(fields=['teacher', 'date'], name='session_teacher_date_idx'),
+            models.Index(fields=['date'], name='session_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.batch.name} - {self.date}"
 
+
+SESSION_DURATION_RE = re.compile(r'Duration:\s*(\d+)')
+
+
+def parse_session_duration(summary):
+    """
+    Milliseconds from a legacy "Duration: N" session summary, or None. Wise
+    syncs before duration_ms existed wrote Wise's raw millisecond value there
+    (labelled "mins"); newer summaries show real minutes and set duration_ms directly.
+    """
+    match = SESSION_DURATION_RE.search(summary or '')
+    return int(match.group(1)) if match else None
+
 class Attendance(models.Model):
     session = models.ForeignKey(ClassSession, on_delete=models.CASCADE, related_name='attendances')
     student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='attendances')
@@ -263,6 +313,11 @@ class Exam(models.Model):
     is_published = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['date'], name='exam_date_idx'),
+        ]
+
     def __str__(self):
         return f"{self.batch.name} - {self.title}"
 
@@ -329,6 +384,9 @@ class MonthlyPayment(models.Model):
     class Meta:
         unique_together = ('student', 'month')
         ordering = ['-month', '-paid_date']
+        indexes = [
+            models.Index(fields=['month'], name='monthlypayment_month_idx'),
+        ]
 
     def __str__(self):
         return f"{self.student} - {self.month.strftime('%B %Y')} - {self.amount}"
@@ -373,3 +431,56 @@ class FeeEditLog(models.Model):
     def __str__(self):
         editor = self.edited_by.get_full_name() if self.edited_by else 'System'
         return f"{self.student} | {self.action} by {editor} at {self.created_at}"
+
+
+def export_storage():
+    from django.core.files.storage import storages
+    return storages['exports']
+
+
+def export_upload_to(instance, filename):
+    """Unguessable artifact name; the download action sends a readable one."""
+    suffix = '.xlsx' if filename.endswith('.xlsx') else '.csv.gz'
+    return f"exports/{datetime.date.today():%Y/%m}/{uuid.uuid4().hex}{suffix}"
+
+
+class ExportJob(models.Model):
+    """A student/lead export written in the background to the private "exports" storage, served only to its requester (see core.export_jobs)"""
+    KIND_CHOICES = [
+        ('STUDENTS', 'Students (export_csv)'),
+        ('LEADS', 'Leads (export_leads_csv)'),
+    ]
+    FORMAT_CHOICES = [
+        ('CSV', 'Gzipped CSV'),
+        ('XLSX', 'Excel Workbook'),
+    ]
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('RUNNING', 'Running'),
+        ('COMPLETED', 'Completed'),
+        ('FAILED', 'Failed'),
+        ('EXPIRED', 'Expired'),
+    ]
+    requested_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='export_jobs')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, default='STUDENTS')
+    file_format = models.CharField(max_length=10, choices=FORMAT_CHOICES, default='CSV')
+    params = models.JSONField(default=dict, blank=True, help_text="StudentViewSet query params the export was filtered with")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    total_rows = models.PositiveIntegerField(null=True, blank=True)
+    processed_rows = models.PositiveIntegerField(default=0)
+    file = models.FileField(upload_to=export_upload_to, storage=export_storage, null=True, blank=True)
+    error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True, help_text="Last progress update from the worker thread")
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'expires_at'], name='exportjob_status_expiry_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} export #{self.pk} ({self.status})"
@@ -1,6 +1,17 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import PageNumberPagination, CursorPagination
 
 class StandardResultsSetPagination(PageNumberPagination):
     page_size = 20
     page_size_query_param = 'page_size'
     max_page_size = 10000
+
+class StudentCursorPagination(CursorPagination):
+    """
+    Keyset pagination for large lead/student tables.
+    Orders by -id (created_at is nullable, id follows insertion order) and
+    returns opaque next/previous cursors without running a COUNT(*).
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    ordering = '-id'
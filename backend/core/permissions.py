@@ -1,6 +1,5 @@
 
 from rest_framework import permissions
-from django.apps import apps
 import logging
 
 logger = logging.getLogger(__name__)
@@ -23,36 +22,9 @@ class DynamicRolePermission(permissions.BasePermission):
             # If no module name is specified, we assume it's publicly available to authenticated users
             return True 
 
-        # Import model dynamically to avoid circular imports
-        RolePermission = apps.get_model('users', 'RolePermission')
-        
-        check_modules = [module_name]
-        if module_name == 'SALES':
-            check_modules.extend([
-                'CRM_DASHBOARD', 'CRM_CAMPAIGNS', 'CRM_PIPELINE', 
-                'CRM_LEADS_TABLE', 'CRM_TASKS', 'CRM_REPORTS', 'CRM_CALL_ANALYTICS'
-            ])
-
-        for mod in check_modules:
-            try:
-                perm = RolePermission.objects.get(role=request.user.role, module=mod)
-                
-                if request.method in permissions.SAFE_METHODS: # GET, HEAD, OPTIONS
-                    if perm.can_view:
-                        return True
-                elif request.method == 'POST':
-                    if perm.can_add:
-                        return True
-                elif request.method in ['PUT', 'PATCH']:
-                    if perm.can_edit:
-                        return True
-                elif request.method == 'DELETE':
-                    if perm.can_delete:
-                        return True
-            except RolePermission.DoesNotExist:
-                continue
-                
-        return False
+        # Compiled role/module matrix; no query unless RolePermission changed
+        from users.permission_matrix import has_module_permission
+        return has_module_permission(request.user.role, module_name, request.method)
 
 class IsMentorOwner(permissions.BasePermission):
     """
@@ -0,0 +1,65 @@
+"""
+Server-side response cache for dashboard and report endpoints.
+
+@cache_response() stores a GET handler's response data in Django's cache,
+keyed by the view, the caller's scope (admins share one entry per role, every
+other user gets their own) and the query parameters. The key also carries the
+version stamp of the `dashboards` family from core.conditional, which is bumped
+after any write to the models behind these reports, so a write is visible on
+the next request; DASHBOARD_CACHE_TTL bounds staleness from anything else
+(bulk updates that bypass signals, the clock moving past "today").
+"""
+import functools
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+from .conditional import resource_version
+
+RESPONSE_CACHE_KEY = 'response:{view}:{scope}:{params}:{version}'
+SHARED_SCOPE_ROLES = ('SUPER_ADMIN', 'ADMIN')
+
+
+def response_cache_ttl():
+    return getattr(settings, 'DASHBOARD_CACHE_TTL', 60)
+
+
+def response_scope(user):
+    """Who may share a cached response: admins see everything, so they share one entry per role."""
+    role = getattr(user, 'role', '') or ''
+    if user.is_superuser or role in SHARED_SCOPE_ROLES:
+        return f'role:{role or "superuser"}'
+    return f'user:{user.pk}:{role}:{getattr(user, "sales_section", "") or ""}'
+
+
+def response_cache_key(view_name, request, kwargs, families):
+    params = sorted((key, value) for key, values in request.query_params.lists() for value in values)
+    params += sorted((key, str(value)) for key, value in kwargs.items())
+    digest = hashlib.md5(repr(params).encode('utf-8')).hexdigest()
+    version = '.'.join(resource_version(family) for family in families)
+    return RESPONSE_CACHE_KEY.format(view=view_name, scope=response_scope(request.user), params=digest, version=version)
+
+
+def cache_response(families=('dashboards',), ttl=None):
+    """
+    Cache a view handler's 200 responses (see module docstring). Authentication
+    and permission checks still run on every request; only the handler is skipped.
+    """
+    def decorator(handler):
+        view_name = handler.__qualname__
+
+        @functools.wraps(handler)
+        def wrapper(self, request, *args, **kwargs):
+            key = response_cache_key(view_name, request, kwargs, families)
+            data = cache.get(key)
+            if data is not None:
+                return Response(data)
+            response = handler(self, request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                cache.set(key, response.data, response_cache_ttl() if ttl is None else ttl)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,257 @@
+"""
+Student search index.
+
+One search document per Student (names, CRM id, email, mobile digits) is kept
+in the `core_student_search` table: an FTS5 virtual table on SQLite and a
+pg_trgm GIN-indexed table on PostgreSQL. Rows are written by core.signals on
+Student save/delete and can be rebuilt with
+`python manage.py rebuild_search_index`.
+
+Matching is by substring, like the `icontains` search it replaces: both tables
+are trigram indexes (FTS5 `trigram` tokenizer, pg_trgm), so every term must
+occur somewhere in the document. "air" finds "Nair", "kumar" finds
+"Anilkumar" and a partial phone number matches anywhere in the mobile digits.
+Trigrams cannot narrow terms shorter than MIN_TERM_LENGTH, so queries with such
+a term are left to `icontains`, as are queries the backend cannot serve (other
+vendors, missing FTS5/pg_trgm, table not built yet).
+"""
+import abc
+import logging
+import re
+
+from django.db import connections, transaction, DatabaseError
+from django.db.models.expressions import RawSQL
+from rest_framework.filters import SearchFilter
+
+logger = logging.getLogger(__name__)
+
+SEARCH_TABLE = 'core_student_search'
+SEARCH_FIELDS = ('first_name', 'last_name', 'crm_student_id', 'mobile', 'email')
+
+PHONE_RE = re.compile(r'^[\d\s+\-()]+$')
+TOKEN_RE = re.compile(r'[^\W_]+')
+MIN_TERM_LENGTH = 3
+
+def _mobile_digits(value):
+    digits = ''.join(c for c in str(value or '') if c.isdigit())
+    # Same normalisation as NormalizedMobileField
+    return digits[-10:] if len(digits) >= 10 else digits
+
+
+def build_document(values):
+    """Search text for a student given a mapping of SEARCH_FIELDS."""
+    parts = [values.get('first_name'), values.get('last_name'), values.get('crm_student_id'), values.get('email')]
+    tokens = TOKEN_RE.findall(' '.join(str(p) for p in parts if p).lower())
+    mobile = _mobile_digits(values.get('mobile'))
+    if mobile:
+        tokens.append(mobile)
+    return ' '.join(tokens)
+
+
+def search_terms(search):
+    """Split a ?search= value into substring terms; phone-like input collapses to one digit run."""
+    search = (search or '').strip()
+    if not search:
+        return []
+    if PHONE_RE.match(search) and any(c.isdigit() for c in search):
+        return [_mobile_digits(search)]
+    return TOKEN_RE.findall(search.lower())
+
+
+def index_can_answer(terms):
+    """Whether the trigram index can match every term (it needs MIN_TERM_LENGTH characters)."""
+    return bool(terms) and all(len(term) >= MIN_TERM_LENGTH for term in terms)
+
+
+class BaseSearchBackend(abc.ABC):
+    vendor = None
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    @abc.abstractmethod
+    def create_schema(self):
+        pass
+
+    def drop_schema(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+        _ready.pop(self.connection.alias, None)
+
+    def is_ready(self):
+        if _ready.get(self.connection.alias):
+            return True
+        try:
+            with self.connection.cursor() as cursor:
+                ready = SEARCH_TABLE in self.connection.introspection.table_names(cursor)
+        except DatabaseError:
+            ready = False
+        if ready:
+            _ready[self.connection.alias] = True
+        return ready
+
+    @abc.abstractmethod
+    def index(self, rows):
+        """Upsert (student_id, document) pairs."""
+
+    @abc.abstractmethod
+    def remove(self, student_ids):
+        pass
+
+    def clear(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+
+    @abc.abstractmethod
+    def matching_ids(self, terms):
+        """(sql, params) selecting the ids of students matching every term."""
+
+
+class SQLiteFTSBackend(BaseSearchBackend):
+    vendor = 'sqlite'
+
+    def create_schema(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} "
+                f"USING fts5(document, tokenize='trigram')"
+            )
+
+    def index(self, rows):
+        rows = list(rows)
+        if not rows:
+            return
+        with self.connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [(pk,) for pk, _ in rows])
+            cursor.executemany(f'INSERT INTO {SEARCH_TABLE} (rowid, document) VALUES (%s, %s)', rows)
+
+    def remove(self, student_ids):
+        with self.connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [(pk,) for pk in student_ids])
+
+    def matching_ids(self, terms):
+        # Space-separated quoted strings: every term must occur as a substring
+        query = ' '.join(f'"{term}"' for term in terms)
+        return f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s', [query]
+
+
+class PostgresTrigramBackend(BaseSearchBackend):
+    vendor = 'postgresql'
+
+    def create_schema(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+            cursor.execute(
+                f'CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} '
+                f'(student_id integer PRIMARY KEY, document text NOT NULL)'
+            )
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS {SEARCH_TABLE}_trgm '
+                f'ON {SEARCH_TABLE} USING gin (document gin_trgm_ops)'
+            )
+
+    def index(self, rows):
+        rows = list(rows)
+        if not rows:
+            return
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {SEARCH_TABLE} (student_id, document) VALUES (%s, %s) '
+                f'ON CONFLICT (student_id) DO UPDATE SET document = EXCLUDED.document',
+                rows,
+            )
+
+    def remove(self, student_ids):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE student_id = ANY(%s)', [list(student_ids)])
+
+    def matching_ids(self, terms):
+        # pg_trgm's GIN index serves unanchored LIKE for terms of 3+ characters
+        where = ' AND '.join(['document LIKE %s'] * len(terms))
+        return f'SELECT student_id FROM {SEARCH_TABLE} WHERE {where}', [f'%{term}%' for term in terms]
+
+
+SEARCH_BACKENDS = {
+    SQLiteFTSBackend.vendor: SQLiteFTSBackend,
+    PostgresTrigramBackend.vendor: PostgresTrigramBackend,
+}
+
+_ready = {}
+
+
+def get_search_backend(using='default'):
+    connection = connections[using]
+    backend_class = SEARCH_BACKENDS.get(connection.vendor)
+    return backend_class(connection) if backend_class else None
+
+
+def student_search_subquery(search, using='default'):
+    """
+    Subquery of Student ids matching `search`, for use as `id__in=` / `student_id__in=`.
+    Returns None when the index cannot answer and the caller should use icontains.
+    """
+    terms = search_terms(search)
+    if not index_can_answer(terms):
+        return None
+    backend = get_search_backend(using)
+    if backend is None or not backend.is_ready():
+        return None
+    sql, params = backend.matching_ids(terms)
+    return RawSQL(sql, params)
+
+
+def update_search_index(students, using='default'):
+    """Re-index the given Student instances; failures are logged, never raised into the save."""
+    backend = get_search_backend(using)
+    if backend is None or not backend.is_ready():
+        return
+    rows = [(s.pk, build_document({f: getattr(s, f) for f in SEARCH_FIELDS})) for s in students]
+    try:
+        with transaction.atomic(using=using):
+            backend.index(rows)
+    except DatabaseError as e:
+        logger.warning(f"Student search index update failed: {e}")
+
+
+def remove_from_search_index(student_ids, using='default'):
+    backend = get_search_backend(using)
+    if backend is None or not backend.is_ready():
+        return
+    try:
+        with transaction.atomic(using=using):
+            backend.remove(student_ids)
+    except DatabaseError as e:
+        logger.warning(f"Student search index delete failed: {e}")
+
+
+def rebuild_search_index(values_iter, using='default', chunk_size=1000):
+    """(Re)create the index table and fill it from an iterable of SEARCH_FIELDS dicts with 'id'."""
+    backend = get_search_backend(using)
+    if backend is None:
+        raise DatabaseError(f"No student search backend for database vendor '{connections[using].vendor}'")
+    count = 0
+    with transaction.atomic(using=using):
+        # Recreate rather than reuse, so a table built with an older tokenizer is replaced
+        backend.drop_schema()
+        backend.create_schema()
+        backend.clear()
+        chunk = []
+        for values in values_iter:
+            chunk.append((values['id'], build_document(values)))
+            if len(chunk) >= chunk_size:
+                backend.index(chunk)
+                count += len(chunk)
+                chunk = []
+        backend.index(chunk)
+        count += len(chunk)
+    return count
+
+
+class IndexedSearchFilter(SearchFilter):
+    """SearchFilter that answers ?search= from the student search index, falling back to search_fields."""
+
+    def filter_queryset(self, request, queryset, view):
+        matching_ids = student_search_subquery(request.query_params.get(self.search_param, ''))
+        if matching_ids is None:
+            return super().filter_queryset(request, queryset, view)
+        return queryset.filter(id__in=matching_ids)
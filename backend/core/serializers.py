@@ -3,11 +3,21 @@ from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.apps import apps
 from django.db import transaction as db_transaction
-from django.db.models import Sum, Count
-from .models import Program, SubProgram, Course, Batch, Student, Transaction, Document, SyllabusPart, ClassSession, Attendance, BatchResource, Exam, ExamResult, Question, QuestionOption, StudentSubmission, MonthlyPayment, StudentTeacherHandover
+from .models import Program, SubProgram, Course, Batch, Student, Transaction, Document, SyllabusPart, ClassSession, Attendance, BatchResource, Exam, ExamResult, Question, QuestionOption, StudentSubmission, MonthlyPayment, StudentTeacherHandover, ExportJob
 
 User = get_user_model()
 
+class DynamicFieldsModelSerializer(serializers.ModelSerializer):
+    """
+    ModelSerializer that accepts an optional `fields` kwarg to emit only a subset of its fields.
+    """
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
+
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
@@ -210,7 +220,7 @@ class StudentTeacherHandoverSerializer(serializers.ModelSerializer):
             return f"{obj.changed_by.first_name} {obj.changed_by.last_name}".strip() or obj.changed_by.username
         return "System"
 
-class StudentSerializer(serializers.ModelSerializer):
+class StudentSerializer(DynamicFieldsModelSerializer):
     # Field to accept dynamic values as a JSON string or dict
     dynamic_values = serializers.JSONField(required=False, write_only=True)
     # Transactions and Documents can be handled separately if complex, but let's try to include transaction info
@@ -254,14 +264,41 @@ class StudentSerializer(serializers.ModelSerializer):
     course_id = serializers.IntegerField(source='course.id', read_only=True, allow_null=True)
     batch_id = serializers.IntegerField(source='batch.id', read_only=True, allow_null=True)
 
+    # Relations each read field depends on, so StudentViewSet can prune select/prefetch for ?fields=
+    select_related_fields = {
+        'username': ['user'],
+        'created_at': ['user'],
+        'program_name': ['program_type'],
+        'program_slug': ['program_type'],
+        'program_type_id': ['program_type'],
+        'sub_program_name': ['sub_program'],
+        'sub_program_id': ['sub_program'],
+        'course_name': ['course'],
+        'course_id': ['course'],
+        'total_due': ['course'],
+        'batch_name': ['batch'],
+        'batch_id': ['batch'],
+        'teacher_name': ['batch__teacher'],
+        'assigned_to_name': ['assigned_to'],
+        'campaign_name': ['campaign'],
+    }
+    prefetch_related_fields = {
+        'dynamic_values_list': ['dynamic_values__field'],
+        'documents_list': ['documents'],
+        'transactions_list': ['transactions'],
+        'monthly_payments_list': ['monthly_payments__marked_by'],
+        'monthly_payment_months': ['monthly_payments'],
+        'teacher_handovers_list': ['teacher_handovers__previous_teacher', 'teacher_handovers__current_teacher', 'teacher_handovers__changed_by'],
+    }
 
     class Meta:
         model = Student
         fields = '__all__'
-        read_only_fields = ('user', 'crm_student_id')
+        read_only_fields = ('user', 'crm_student_id', 'last_payment_at')
 
     def get_total_paid(self, obj):
-        return obj.transactions.aggregate(total=Sum('amount'))['total'] or 0
+        # Maintained ledger column (core.ledger), no per-row aggregate
+        return obj.total_paid
 
     def get_assigned_to_name(self, obj):
         if obj.assigned_to:
@@ -480,3 +517,65 @@ class StudentSerializer(serializers.ModelSerializer):
                     pass
 
         return instance
+
+
+class StudentListSerializer(DynamicFieldsModelSerializer):
+    """Lightweight read-only row for lead/student grids (?view=compact)."""
+    program_name = serializers.CharField(source='program_type.name', read_only=True)
+    batch_name = serializers.CharField(source='batch.name', read_only=True)
+    campaign_name = serializers.CharField(source='campaign.name', read_only=True)
+    created_at = serializers.DateTimeField(source='user.date_joined', read_only=True)
+    assigned_to_name = serializers.SerializerMethodField()
+
+    select_related_fields = {
+        'program_name': ['program_type'],
+        'batch_name': ['batch'],
+        'campaign_name': ['campaign'],
+        'created_at': ['user'],
+        'assigned_to_name': ['assigned_to'],
+    }
+    prefetch_related_fields = {}
+
+    class Meta:
+        model = Student
+        fields = (
+            'id', 'crm_student_id', 'first_name', 'last_name', 'mobile', 'email',
+            'lead_status', 'lead_quality', 'academic_status', 'sales_section', 'is_active',
+            'program_type', 'program_name', 'batch', 'batch_name', 'campaign', 'campaign_name',
+            'assigned_to', 'assigned_to_name', 'created_at',
+        )
+        read_only_fields = fields
+
+    def get_assigned_to_name(self, obj):
+        if obj.assigned_to:
+            return f"{obj.assigned_to.first_name} {obj.assigned_to.last_name}".strip() or obj.assigned_to.username
+        return None
+
+
+class ExportJobSerializer(serializers.ModelSerializer):
+    download_url = serializers.SerializerMethodField()
+    progress = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ExportJob
+        fields = (
+            'id', 'kind', 'file_format', 'params', 'status', 'total_rows', 'processed_rows', 'progress',
+            'download_url', 'error', 'created_at', 'started_at', 'finished_at', 'expires_at',
+        )
+        read_only_fields = fields
+
+    def get_progress(self, obj):
+        if obj.status == 'COMPLETED':
+            return 100
+        if not obj.total_rows:
+            return 0
+        return min(99, int(obj.processed_rows * 100 / obj.total_rows))
+
+    def get_download_url(self, obj):
+        if obj.status != 'COMPLETED' or not obj.file:
+            return None
+        # Served by ExportJobViewSet.download (authenticated, requester only), never from the storage directly
+        from django.urls import reverse
+        url = reverse('core-export-job-download', args=[obj.pk])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
@@ -0,0 +1,53 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from .models import Student, Transaction, MonthlyPayment
+from .ledger import refresh_fee_ledger
+from .search import SEARCH_FIELDS, update_search_index, remove_from_search_index
+from .conditional import connect_version_signals
+
+
+@receiver(pre_save, sender=Transaction)
+@receiver(pre_save, sender=MonthlyPayment)
+def remember_payment_student(sender, instance, **kwargs):
+    # A payment moved to another student must also refresh the previous student's ledger
+    if instance.pk:
+        instance._previous_student_id = sender.objects.filter(pk=instance.pk).values_list('student_id', flat=True).first()
+
+
+@receiver(pre_save, sender=Student)
+def keep_fee_ledger(sender, instance, raw=False, update_fields=None, **kwargs):
+    # A full save() of an instance loaded before a payment was written must not clobber
+    # the ledger, which only core.ledger writes (with update()), so take the stored values
+    if raw or instance._state.adding or update_fields is not None:
+        return
+    stored = sender.objects.filter(pk=instance.pk).values_list(*Student.LEDGER_FIELDS).first()
+    for name, value in zip(Student.LEDGER_FIELDS, stored or ()):
+        setattr(instance, name, value)
+
+
+@receiver(post_save, sender=Transaction)
+@receiver(post_save, sender=MonthlyPayment)
+@receiver(post_delete, sender=Transaction)
+@receiver(post_delete, sender=MonthlyPayment)
+def update_fee_ledger(sender, instance, **kwargs):
+    student = instance.student if sender.student.is_cached(instance) else None
+    refresh_fee_ledger(instance.student_id, student=student)
+    previous_student_id = getattr(instance, '_previous_student_id', None)
+    if previous_student_id and previous_student_id != instance.student_id:
+        refresh_fee_ledger(previous_student_id)
+
+
+@receiver(post_save, sender=Student)
+def index_student(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not set(update_fields) & set(SEARCH_FIELDS):
+        return
+    update_search_index([instance])
+
+
+@receiver(post_delete, sender=Student)
+def unindex_student(sender, instance, **kwargs):
+    remove_from_search_index([instance.pk])
+
+
+# Version stamps behind ConditionalGetMixin ETags
+connect_version_signals()
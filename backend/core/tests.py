@@ -1,3 +1,177 @@
-from django.test import TestCase
+import datetime
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Sum
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .conditional import resource_version
+from .ledger import rebuild_fee_ledger
+from .models import MonthlyPayment, Program, Student, Transaction
+from .search import get_search_backend, index_can_answer, search_terms, student_search_subquery
+
+
+User = get_user_model()
+
+
+def make_student(username, program=None, **fields):
+    program = program or Program.objects.get_or_create(name='Natya', slug='natya')[0]
+    user = User.objects.create_user(username, f'{username}@example.com', 'x', role='STUDENT')
+    fields.setdefault('crm_student_id', f'TEST-{username}')
+    return Student.objects.create(user=user, program_type=program, email=f'{username}@example.com', **fields)
+
+
+class StudentSearchIndexTests(TestCase):
+    def setUp(self):
+        self.anil = make_student('anil', first_name='Anilkumar', last_name='Nair', mobile='9876565000')
+        self.beena = make_student('beena', first_name='Beena', last_name='Thomas', mobile='9123400000')
+
+    def search(self, query):
+        matching_ids = student_search_subquery(query)
+        self.assertIsNotNone(matching_ids, f'{query!r} should be answered by the index')
+        return set(Student.objects.filter(id__in=matching_ids).values_list('id', flat=True))
+
+    def test_index_is_built(self):
+        self.assertTrue(get_search_backend().is_ready())
+
+    def test_terms_match_anywhere_in_a_word(self):
+        self.assertEqual(self.search('air'), {self.anil.pk})
+        self.assertEqual(self.search('kumar'), {self.anil.pk})
+        self.assertEqual(self.search('ANIL'), {self.anil.pk})
+
+    def test_every_term_must_match(self):
+        self.assertEqual(self.search('anil thomas'), set())
+        self.assertEqual(self.search('beena thom'), {self.beena.pk})
+
+    def test_phone_digits_match_by_prefix_and_substring(self):
+        self.assertEqual(self.search('98765'), {self.anil.pk})
+        self.assertEqual(self.search('65000'), {self.anil.pk})
+        self.assertEqual(self.search('+91 98765 65000'), {self.anil.pk})
+
+    def test_index_follows_saves_and_deletes(self):
+        self.beena.last_name = 'Varghese'
+        self.beena.save()
+        self.assertEqual(self.search('varghese'), {self.beena.pk})
+        self.assertEqual(self.search('thomas'), set())
+        self.beena.delete()
+        self.assertEqual(self.search('varghese'), set())
+
+    def test_short_terms_fall_back_to_icontains(self):
+        self.assertEqual(search_terms('an nair'), ['an', 'nair'])
+        self.assertFalse(index_can_answer(['an', 'nair']))
+        self.assertIsNone(student_search_subquery('an nair'))
+        self.assertIsNone(student_search_subquery('   '))
+
+
+class FeeLedgerTests(TestCase):
+    def setUp(self):
+        self.student = make_student('ledger')
+        self.other = make_student('ledger2')
+
+    def assertLedgerMatchesTransactions(self):
+        for student in Student.objects.all():
+            expected = Transaction.objects.filter(student=student).aggregate(total=Sum('amount'))['total'] or 0
+            self.assertEqual(student.total_paid, expected, student)
+
+    def test_total_paid_follows_transaction_writes(self):
+        payment = Transaction.objects.create(student=self.student, transaction_id='T1', amount=Decimal('250'))
+        Transaction.objects.create(student=self.student, transaction_id='T2', amount=Decimal('100'))
+        self.assertLedgerMatchesTransactions()
+
+        payment.amount = Decimal('300')
+        payment.save()
+        self.assertLedgerMatchesTransactions()
+
+        payment.student = self.other
+        payment.save()
+        self.assertLedgerMatchesTransactions()
+
+        payment.delete()
+        self.assertLedgerMatchesTransactions()
+
+    def test_monthly_payment_only_moves_last_payment_at(self):
+        MonthlyPayment.objects.create(
+            student=self.student, month=datetime.date(2025, 3, 1), amount=Decimal('700'), paid_date=datetime.date(2025, 3, 5),
+        )
+        self.student.refresh_from_db()
+        self.assertEqual(self.student.total_paid, 0)
+        self.assertEqual(self.student.last_payment_at.date(), datetime.date(2025, 3, 5))
+
+    def test_stale_instance_save_keeps_the_ledger(self):
+        stale = Student.objects.get(pk=self.student.pk)
+        Transaction.objects.create(student=self.student, transaction_id='T1', amount=Decimal('250'))
+        stale.first_name = 'Renamed'
+        stale.save()
+        self.student.refresh_from_db()
+        self.assertEqual(self.student.first_name, 'Renamed')
+        self.assertEqual(self.student.total_paid, Decimal('250'))
+
+    def test_save_still_has_plain_model_semantics(self):
+        stale = Student.objects.get(pk=self.student.pk)
+        Student.objects.filter(pk=stale.pk).delete()
+        stale.save()
+        self.assertTrue(Student.objects.filter(pk=stale.pk).exists())
+
+    def test_rebuild_matches_transaction_sums(self):
+        Transaction.objects.create(student=self.student, transaction_id='T1', amount=Decimal('250'))
+        MonthlyPayment.objects.create(student=self.other, month=datetime.date(2025, 3, 1), amount=Decimal('700'))
+        Student.objects.update(total_paid=Decimal('999'), last_payment_at=None)
+        self.assertEqual(rebuild_fee_ledger(), 2)
+        self.assertLedgerMatchesTransactions()
+        self.assertIsNotNone(Student.objects.get(pk=self.other.pk).last_payment_at)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.program = Program.objects.create(name='Natya', slug='natya')
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'x', role='SUPER_ADMIN')
+        self.mentor = User.objects.create_user('mentor', 'mentor@example.com', 'x', role='MENTOR')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def get(self, url, etag=None):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag) if etag else self.client.get(url)
+
+    def test_unchanged_resource_answers_304(self):
+        response = self.get('/api/programs/')
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertIn('no-cache', response['Cache-Control'])
+        not_modified = self.get('/api/programs/', etag)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified['ETag'], etag)
+
+    def test_writes_change_the_etag_after_commit(self):
+        etag = self.get('/api/programs/')['ETag']
+        self.program.name = 'Natya Academy'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.program.save()
+        response = self.get('/api/programs/', etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()[0]['name'], 'Natya Academy')
+
+    def test_etag_is_per_user_and_query(self):
+        etag = self.get('/api/auth/mentors/')['ETag']
+        self.assertNotEqual(self.get('/api/auth/mentors/?x=1')['ETag'], etag)
+        self.client.force_authenticate(self.mentor)
+        self.assertEqual(self.get('/api/auth/mentors/', etag).status_code, 200)
+
+    def test_logins_do_not_bump_the_users_family(self):
+        version = resource_version('users')
+        self.mentor.last_login = timezone.now()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.mentor.save(update_fields=['last_login'])
+        self.assertEqual(resource_version('users'), version)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.mentor.save()
+        self.assertNotEqual(resource_version('users'), version)
+
+    @override_settings(LOCAL_CACHE_MAX_AGE=0)
+    def test_stamps_expire_under_a_per_process_cache(self):
+        etag = self.get('/api/programs/')['ETag']
+        self.assertEqual(self.get('/api/programs/', etag).status_code, 200)
@@ -6,7 +6,7 @@ from .views import (
     BatchViewSet, StudentViewSet, TransactionViewSet, DocumentViewSet,
     SyllabusPartViewSet, ClassSessionViewSet, AttendanceViewSet, BatchResourceViewSet,
     ExamViewSet, ExamResultViewSet, QuestionViewSet, DashboardStatsView, AnalyticsDetailView,
-    StudentSubmissionViewSet, CalendarEventsView, StudentTeacherHandoverViewSet
+    StudentSubmissionViewSet, CalendarEventsView, StudentTeacherHandoverViewSet, ExportJobViewSet
 )
 from .bulk_views import BulkUploadView
 
@@ -27,6 +27,7 @@ router.register(r'exam-results', ExamResultViewSet, basename='core-result')
 router.register(r'questions', QuestionViewSet, basename='core-question')
 router.register(r'student-submissions', StudentSubmissionViewSet, basename='core-submission')
 router.register(r'teacher-handovers', StudentTeacherHandoverViewSet, basename='core-teacher-handover')
+router.register(r'export-jobs', ExportJobViewSet, basename='core-export-job')
 
 
 urlpatterns = [
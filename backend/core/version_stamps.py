@@ -0,0 +1,93 @@
+"""
+Version stamps in Django's cache, for data that processes keep locally.
+
+A stamp is a random token stored under a cache key. Writers replace it
+(bump_version) and readers compare it with the token they loaded under
+(LocalCopy, or any cache keyed by current_version), so a bump made by one worker
+is seen by every worker sharing the cache on its next lookup.
+
+That only holds when CACHES['default'] is shared between processes (redis, file).
+LocMemCache and DummyCache are per process, so a bump never leaves the worker
+that made it: there stamps are stored with a LOCAL_CACHE_MAX_AGE timeout and
+local copies are dropped after that long, which bounds how stale another worker
+can be. `manage.py check --deploy` warns about such a backend.
+"""
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import cache
+
+PROCESS_LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def shared_cache():
+    """Whether every process sees the same default cache."""
+    return settings.CACHES.get('default', {}).get('BACKEND') not in PROCESS_LOCAL_BACKENDS
+
+
+def local_max_age():
+    """Seconds a stamp or local copy may live, or None when the cache is shared."""
+    if shared_cache():
+        return None
+    return getattr(settings, 'LOCAL_CACHE_MAX_AGE', 30)
+
+
+def current_version(key):
+    version = cache.get(key)
+    if version is None:
+        new = uuid.uuid4().hex
+        cache.add(key, new, local_max_age())
+        # DummyCache stores nothing: a fresh token means "reload"
+        version = cache.get(key) or new
+    return version
+
+
+def bump_version(*keys):
+    cache.set_many({key: uuid.uuid4().hex for key in keys}, local_max_age())
+
+
+class LocalCopy:
+    """
+    A value built from the database and kept in this process until the stamp
+    under `version_key` changes (or, with a process-local cache, max age passes).
+    """
+    def __init__(self, version_key):
+        self.version_key = version_key
+        self._lock = threading.Lock()
+        self._loaded = {'version': None, 'value': None, 'at': 0.0}
+
+    def get(self, build):
+        version = current_version(self.version_key)
+        loaded = self._loaded
+        max_age = local_max_age()
+        if (
+            loaded['value'] is not None and loaded['version'] == version
+            and (max_age is None or time.monotonic() - loaded['at'] < max_age)
+        ):
+            return loaded['value']
+        with self._lock:
+            value = build()
+            self._loaded = {'version': version, 'value': value, 'at': time.monotonic()}
+        return value
+
+    def invalidate(self):
+        bump_version(self.version_key)
+        self._loaded = {'version': None, 'value': None, 'at': 0.0}
+
+
+@checks.register(checks.Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    if shared_cache():
+        return []
+    return [checks.Warning(
+        "CACHES['default'] is process-local, so permission, reference data, token "
+        "and ETag invalidations only reach other workers after LOCAL_CACHE_MAX_AGE seconds.",
+        hint='Set CACHE_BACKEND=redis (or file) when running more than one worker.',
+        id='core.W001',
+    )]
@@ -4,21 +4,23 @@ from rest_framework.filters import SearchFilter
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.db.models import Q, Sum, Count, F
-from django.http import HttpResponse
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from decimal import Decimal, InvalidOperation
-import pandas as pd
 
 from .models import Program, SubProgram, Course, Batch, Student, Transaction, Document, SyllabusPart, ClassSession, Attendance, BatchResource, Exam, ExamResult, Question, QuestionOption, StudentSubmission, MonthlyPayment, StudentTeacherHandover
 from .serializers import (
     ProgramSerializer, SubProgramSerializer, CourseSerializer, 
-    BatchSerializer, StudentSerializer, TransactionSerializer, DocumentSerializer,
+    BatchSerializer, StudentSerializer, StudentListSerializer, TransactionSerializer, DocumentSerializer,
     ProgramHierarchySerializer, SyllabusPartSerializer, ClassSessionSerializer, AttendanceSerializer, BatchResourceSerializer,
     ExamSerializer, ExamResultSerializer, QuestionSerializer, StudentSubmissionSerializer, MonthlyPaymentSerializer, StudentTeacherHandoverSerializer
 )
 from rest_framework.views import APIView
 from .permissions import DynamicRolePermission, IsMentorOwner
+from .pagination import StandardResultsSetPagination, StudentCursorPagination
+from .search import IndexedSearchFilter
+from .conditional import ConditionalGetMixin, bump_resource_version
+from crm.rollups import mark_students_dirty
 
 class IsAdminOrReadOnly(permissions.BasePermission):
     def has_permission(self, request, view):
@@ -26,11 +28,13 @@ class IsAdminOrReadOnly(permissions.BasePermission):
             return True
         return request.user.is_authenticated and request.user.role in ['ADMIN', 'SUPER_ADMIN']
 
-class ProgramViewSet(viewsets.ModelViewSet):
+class ProgramViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Program.objects.all()
     serializer_class = ProgramSerializer
     permission_classes = [DynamicRolePermission]
     module_name = 'ACADEMIC'
+    conditional_families = ('programs',)
+    conditional_actions = ('list', 'retrieve', 'hierarchy')
     pagination_class = None
     filter_backends = [SearchFilter]
     search_fields = ['name', 'description']
@@ -88,6 +92,19 @@ class CourseViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(sub_program_id=sub_program_id)
         return queryset
 
+def visible_batches(user, qs=None):
+    """`qs` (default all batches) narrowed to the batches `user` may see."""
+    qs = Batch.objects.all() if qs is None else qs
+    if user.role in ['ADMIN', 'SUPER_ADMIN', 'ACADEMIC', 'ACADEMIC_COORDINATOR', 'SALES']:
+        return qs
+    if user.role in ['MENTOR', 'TEACHER']:
+        # User can see their own batches AND their subordinates' batches
+        users_to_check = user.subordinate_ids(include_self=True)
+        return qs.filter(Q(primary_mentor__in=users_to_check) | Q(secondary_mentors__in=users_to_check) | Q(teacher__in=users_to_check)).distinct()
+    if user.role == 'STUDENT':
+        return qs.filter(students__user=user).distinct()
+    return qs.none()
+
 class BatchViewSet(viewsets.ModelViewSet):
     serializer_class = BatchSerializer
     queryset = Batch.objects.all()
@@ -113,21 +130,7 @@ class BatchViewSet(viewsets.ModelViewSet):
         qs = Batch.objects.select_related('primary_mentor', 'course').prefetch_related('secondary_mentors')
         qs = qs.annotate(student_count_annotated=Count('students'))
         
-        if user.role in ['ADMIN', 'SUPER_ADMIN', 'ACADEMIC', 'ACADEMIC_COORDINATOR', 'SALES']:
-            pass
-        elif user.role in ['MENTOR', 'TEACHER']:
-            # Include subordinates if any
-            subordinates = user.get_all_subordinates()
-            if subordinates:
-                # User can see their own batches AND their subordinates' batches
-                users_to_check = [user] + subordinates
-                qs = qs.filter(Q(primary_mentor__in=users_to_check) | Q(secondary_mentors__in=users_to_check) | Q(teacher__in=users_to_check)).distinct()
-            else:
-                qs = qs.filter(Q(primary_mentor=user) | Q(secondary_mentors=user) | Q(teacher=user)).distinct()
-        elif user.role == 'STUDENT':
-            qs = qs.filter(students__user=user).distinct()
-        else:
-            return Batch.objects.none()
+        qs = visible_batches(user, qs)
             
         mentor_id = self.request.query_params.get('mentor_id')
         if mentor_id:
@@ -283,7 +286,21 @@ class BatchViewSet(viewsets.ModelViewSet):
         if not date:
             return Response({'error': 'Date is required'}, status=status.HTTP_400_BAD_REQUEST)
             
-        session = ClassSession.objects.create(batch=batch, date=date, teacher_summary=summary)
+        from django.utils.dateparse import parse_datetime
+        duration_ms = request.data.get('duration_ms')
+        try:
+            duration_ms = int(duration_ms) if duration_ms not in (None, '') else None
+            if duration_ms is not None and duration_ms < 0:
+                raise ValueError(duration_ms)
+        except (TypeError, ValueError):
+            return Response({'error': 'duration_ms must be a non-negative integer'}, status=status.HTTP_400_BAD_REQUEST)
+        started_at = parse_datetime(request.data.get('started_at') or '')
+        if started_at and timezone.is_naive(started_at):
+            started_at = timezone.make_aware(started_at)
+
+        session = ClassSession.objects.create(
+            batch=batch, date=date, teacher_summary=summary, duration_ms=duration_ms, started_at=started_at,
+        )
         
         if completed_parts:
             SyllabusPart.objects.filter(id__in=completed_parts, batch=batch).update(is_completed=True)
@@ -299,11 +316,60 @@ class BatchViewSet(viewsets.ModelViewSet):
 class StudentViewSet(viewsets.ModelViewSet):
     queryset = Student.objects.all()
     serializer_class = StudentSerializer
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [IndexedSearchFilter, filters.OrderingFilter]
     search_fields = ['first_name', 'last_name', 'crm_student_id', 'mobile', 'email']
     ordering_fields = ['created_at', 'id']
     permission_classes = [DynamicRolePermission]
     module_name = 'SALES'
+    # Actions that render student rows and honour ?fields= / ?view=compact
+    read_actions = ['list', 'retrieve', 'due_students']
+
+    @property
+    def pagination_class(self):
+        # Opt-in keyset pagination (?pagination=cursor) for deep scrolling without COUNT/OFFSET
+        if hasattr(self, 'request') and self.request.query_params.get('pagination') == 'cursor':
+            return StudentCursorPagination
+        return StandardResultsSetPagination
+
+    def get_serializer_class(self):
+        # ?view=compact serves a slim row for list grids instead of the full nested profile
+        if self.action in ['list', 'due_students'] and self.request.query_params.get('view') == 'compact':
+            return StudentListSerializer
+        return StudentSerializer
+
+    def get_read_fields(self):
+        """Field names requested via ?fields=a,b,c on read actions, or None for every field."""
+        if self.action not in self.read_actions:
+            return None
+        fields = self.request.query_params.get('fields')
+        if not fields:
+            return None
+        return [f.strip() for f in fields.split(',') if f.strip()]
+
+    def get_serializer(self, *args, **kwargs):
+        fields = self.get_read_fields()
+        if fields is not None:
+            kwargs.setdefault('fields', fields)
+        return super().get_serializer(*args, **kwargs)
+
+    def get_related_lookups(self):
+        """select_related/prefetch_related lookups needed by the fields this request will render."""
+        if self.action not in self.read_actions:
+            return (
+                ['user', 'program_type', 'sub_program', 'course', 'batch'],
+                ['dynamic_values__field', 'documents', 'transactions', 'monthly_payments'],
+            )
+        serializer_class = self.get_serializer_class()
+        field_names = self.get_read_fields() or list(serializer_class().fields)
+        select, prefetch = [], []
+        for name in field_names:
+            for lookup in serializer_class.select_related_fields.get(name, []):
+                if lookup not in select:
+                    select.append(lookup)
+            for lookup in serializer_class.prefetch_related_fields.get(name, []):
+                if lookup not in prefetch:
+                    prefetch.append(lookup)
+        return select, prefetch
 
     def filter_queryset(self, queryset):
         ordering = self.request.query_params.get('ordering')
@@ -325,8 +391,9 @@ class StudentViewSet(viewsets.ModelViewSet):
         
         if old_status != new_status:
             try:
-                from crm.models import PipelineStage, LeadInteraction
-                stages_map = {str(stage.id): stage.name for stage in PipelineStage.objects.all()}
+                from crm.models import LeadInteraction
+                from crm.reference_data import get_reference_data
+                stages_map = get_reference_data().stage_names
                 old_name = stages_map.get(str(old_status), str(old_status))
                 new_name = stages_map.get(str(new_status), str(new_status))
                 
@@ -403,20 +470,17 @@ class StudentViewSet(viewsets.ModelViewSet):
             return Student.objects.filter(is_active=True)
         
         # Staff/Internal View
-        qs = Student.objects.select_related(
-            'user', 'program_type', 'sub_program', 'course', 'batch'
-        ).prefetch_related('dynamic_values__field', 'documents', 'transactions', 'monthly_payments').all()
+        select, prefetch = self.get_related_lookups()
+        qs = Student.objects.all()
+        if select:
+            # select_related() with no arguments would follow every FK
+            qs = qs.select_related(*select)
+        if prefetch:
+            qs = qs.prefetch_related(*prefetch)
             
         # Resolve 'CONVERTED' to its IDs (handle 'converted', 'enrolled', etc.)
-        converted_stage_ids = ['CONVERTED', 'ENROLLED']
-        try:
-            from crm.models import PipelineStage
-            from django.db.models import Q
-            stages = PipelineStage.objects.filter(Q(name__icontains='convert') | Q(name__icontains='enroll'))
-            for stage in stages:
-                converted_stage_ids.append(str(stage.id))
-        except Exception:
-            pass
+        from crm.reference_data import get_reference_data
+        converted_stage_ids = ['CONVERTED', 'ENROLLED'] + get_reference_data().converted_stage_ids
 
         if user.role in ['ADMIN', 'SUPER_ADMIN']:
             # Restrict duplicate leads access to SUPER_ADMIN only
@@ -461,20 +525,13 @@ class StudentViewSet(viewsets.ModelViewSet):
         elif user.role in ['ACADEMIC', 'ACADEMIC_COORDINATOR'] or self.request.query_params.get('group', '').upper() == 'ACADEMIC':
             qs = qs.filter(lead_status__in=converted_stage_ids)
         elif user.role in ['MENTOR', 'TEACHER']:
-            subordinates = user.get_all_subordinates()
-            if subordinates:
-                users_to_check = [user] + subordinates
-                qs = qs.filter(
-                    Q(batch__primary_mentor__in=users_to_check) | 
-                    Q(batch__secondary_mentors__in=users_to_check) |
-                    Q(batch__teacher__in=users_to_check)
-                ).filter(lead_status__in=converted_stage_ids).distinct()
-            else:
-                qs = qs.filter(
-                    Q(batch__primary_mentor=user) | 
-                    Q(batch__secondary_mentors=user) |
-                    Q(batch__teacher=user)
-                ).filter(lead_status__in=converted_stage_ids).distinct()
+            from django.db.models import Q
+            users_to_check = user.subordinate_ids(include_self=True)
+            qs = qs.filter(
+                Q(batch__primary_mentor__in=users_to_check) | 
+                Q(batch__secondary_mentors__in=users_to_check) |
+                Q(batch__teacher__in=users_to_check)
+            ).filter(lead_status__in=converted_stage_ids).distinct()
         elif user.role == 'STUDENT':
             qs = Student.objects.filter(user=user)
         
@@ -576,9 +633,8 @@ class StudentViewSet(viewsets.ModelViewSet):
         if mentor_id:
             if user.role in ['SUPER_ADMIN', 'ADMIN', 'ACADEMIC', 'ACADEMIC_COORDINATOR']:
                 qs = qs.filter(batch__primary_mentor_id=mentor_id)
-            elif user.role in ['MENTOR', 'TEACHER'] and hasattr(user, 'get_all_subordinates'):
-                subordinates = user.get_all_subordinates()
-                if str(mentor_id) == str(user.id) or any(str(sub.id) == str(mentor_id) for sub in subordinates):
+            elif user.role in ['MENTOR', 'TEACHER'] and hasattr(user, 'subordinate_ids'):
+                if str(mentor_id).isdigit() and user.subordinate_ids(include_self=True).filter(descendant_id=mentor_id).exists():
                     qs = qs.filter(batch__primary_mentor_id=mentor_id)
 
         lead_status = self.request.query_params.get('lead_status')
@@ -664,6 +720,12 @@ class StudentViewSet(viewsets.ModelViewSet):
 
     def list(self, request, *args, **kwargs):
         queryset = self.filter_queryset(self.get_queryset())
+
+        if isinstance(self.paginator, StudentCursorPagination):
+            # Keyset mode: skip the COUNT(*) based academic stats, return the page with next/previous cursors
+            page = self.paginate_queryset(queryset)
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
         
         # Calculate full queryset stats before pagination
         total_count = queryset.count()
@@ -699,135 +761,88 @@ class StudentViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def export_csv(self, request):
+        from .exports import student_export_rows, stream_csv
         qs = self.filter_queryset(self.get_queryset())
-        data = []
-        for s in qs:
-            total_paid = s.transactions.aggregate(total=Sum('amount'))['total'] or 0
-            
-            # Map dynamic values list to a dictionary for simple lookup
-            dyn_values = {val.field.label: val.value for val in s.dynamic_values.all()}
-            
-            row = {
-                'CRM Student ID': s.crm_student_id,
-                'First Name': s.first_name,
-                'Last Name': s.last_name,
-                'Mobile': s.mobile,
-                'Email': s.email,
-                'Program': s.program_type.name if s.program_type else 'N/A',
-                'Sub Program': s.sub_program.name if s.sub_program else 'N/A',
-                'Course': s.course.name if s.course else 'N/A',
-                'Batch': s.batch.name if s.batch else 'N/A',
-                'Lead Status': s.lead_status,
-                'Academic Status': s.academic_status,
-                'Assigned To': f"{s.assigned_to.first_name} {s.assigned_to.last_name}".strip() or s.assigned_to.username if s.assigned_to else 'Unassigned',
-                'Campaign': s.campaign.name if s.campaign else 'N/A',
-                'Father/Husband Name': s.father_husband_name or '',
-                'Mother Name': s.mother_name or '',
-                'Date of Birth': s.dob or '',
-                'Gender': s.gender or '',
-                'Marital Status': s.marital_status or '',
-                'Permanent Address': s.perm_address or '',
-                'Correspondence Address': s.corr_address or '',
-                'Total Paid (CRM)': total_paid,
-                'Total Fee (Synced)': s.total_fee,
-                'Paid Fee (Synced)': s.paid_fee,
-                'Fee Due Date': s.fee_due_date or '',
-                'Monthly Payments (Paid Months)': ", ".join([p.month.strftime('%Y-%m-%d') for p in s.monthly_payments.all()]),
-            }
-            
-            # Add dynamic field values as additional columns
-            for label, value in dyn_values.items():
-                row[label] = value
-                
-            data.append(row)
-            
-        if data:
-            df = pd.DataFrame(data)
-        else:
-            # Empty fallback dataframe with basic headers
-            df = pd.DataFrame(columns=[
-                'CRM Student ID', 'First Name', 'Last Name', 'Mobile', 'Email', 
-                'Program', 'Sub Program', 'Course', 'Batch', 'Lead Status', 
-                'Academic Status', 'Assigned To', 'Campaign', 'Father/Husband Name', 
-                'Mother Name', 'Date of Birth', 'Gender', 'Marital Status', 
-                'Permanent Address', 'Correspondence Address', 'Total Paid (CRM)', 
-                'Total Fee (Synced)', 'Paid Fee (Synced)', 'Fee Due Date', 'Monthly Payments (Paid Months)'
-            ])
-            
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="students.csv"'
-        df.to_csv(path_or_buf=response, index=False)
-        return response
+        return stream_csv(student_export_rows(qs), 'students.csv')
 
     @action(detail=False, methods=['get'])
     def export_leads_csv(self, request):
         """Export ALL filtered leads (no pagination) with required CRM columns + latest note."""
-        from crm.models import PipelineStage, LeadInteraction
-        import csv
+        from .exports import lead_export_rows, stream_csv
 
         # Reuse the same queryset filtering logic (get_queryset handles filters via query_params)
         qs = self.filter_queryset(self.get_queryset())
+        return stream_csv(lead_export_rows(qs), f'Leads_Export_{timezone.now().strftime("%Y-%m-%d")}.csv', bom=True)
 
-        # Build a dynamic stage name map
-        stage_map = {str(s.id): s.name for s in PipelineStage.objects.all()}
-        standard_map = {
-            'NEW': 'New Lead',
-            'FOLLOW_UP': 'Follow-up',
-            'PAYMENT_PENDING': 'Payment Pending',
-            'ENROLLED': 'Enrolled',
-            'DROPPED': 'Dropped',
-            'CONVERTED': 'Converted',
-            'DUPLICATE': 'Duplicate',
-        }
-
-        response = HttpResponse(content_type='text/csv; charset=utf-8')
-        response['Content-Disposition'] = f'attachment; filename="Leads_Export_{timezone.now().strftime("%Y-%m-%d")}.csv"'
-        # Write UTF-8 BOM so Excel opens it correctly
-        response.write('\ufeff')
-
-        writer = csv.writer(response)
-        writer.writerow(['Lead ID', 'Lead Name', 'Mobile', 'Email', 'Assigned To', 'Status', 'Date Created', 'Campaign', 'Note'])
-
-        for s in qs.select_related('assigned_to', 'campaign').prefetch_related('crm_interactions'):
-            # Resolve status name
-            status_raw = str(s.lead_status or '')
-            status_name = standard_map.get(status_raw) or stage_map.get(status_raw) or status_raw or 'New Lead'
 
-            assigned_name = ''
-            if s.assigned_to:
-                assigned_name = f"{s.assigned_to.first_name} {s.assigned_to.last_name}".strip() or s.assigned_to.username
-
-            campaign_name = s.campaign.name if s.campaign else ''
-
-            # Latest note from crm_interactions
-            latest_interaction = s.crm_interactions.order_by('-date').first()
-            note_text = latest_interaction.notes if latest_interaction and latest_interaction.notes else ''
-
-            writer.writerow([
-                s.crm_student_id or s.id,
-                f"{s.first_name or ''} {s.last_name or ''}".strip(),
-                s.mobile or '',
-                s.email or '',
-                assigned_name,
-                status_name,
-                s.created_at.strftime('%d/%m/%Y') if s.created_at else '',
-                campaign_name,
-                note_text,
-            ])
-
-        return response
+    @action(detail=False, methods=['post'])
+    def export_async(self, request):
+        """Queue export_csv / export_leads_csv for the current filters; poll /export-jobs/<id>/ for the file."""
+        from .models import ExportJob
+        from .export_jobs import start_export_job
+        from .serializers import ExportJobSerializer
+
+        kind = str(request.data.get('kind', 'STUDENTS')).upper()
+        file_format = str(request.data.get('format', 'CSV')).upper()
+        if kind not in dict(ExportJob.KIND_CHOICES) or file_format not in dict(ExportJob.FORMAT_CHOICES):
+            return Response({'error': 'kind must be STUDENTS or LEADS and format CSV or XLSX'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Validate the filters now so a bad request fails here rather than in the worker
+        self.filter_queryset(self.get_queryset())
+
+        params = {key: values if len(values) > 1 else values[0] for key, values in request.query_params.lists()}
+        job = ExportJob.objects.create(requested_by=request.user, kind=kind, file_format=file_format, params=params)
+        start_export_job(job)
+        return Response(ExportJobSerializer(job, context={'request': request}).data, status=status.HTTP_202_ACCEPTED)
+
+    def fee_due_groups(self, qs, group_by, due_amount):
+        """One aggregate row per batch or primary mentor of the students in `qs`, summing `due_amount`."""
+        # Re-select by pk so role-scoping joins/DISTINCT cannot inflate the sums
+        qs = Student.objects.filter(pk__in=qs.order_by().values('pk')).annotate(due_amount=due_amount)
+        if group_by == 'batch':
+            keys = ['batch_id', 'batch__name']
+        else:
+            keys = ['batch__primary_mentor_id', 'batch__primary_mentor__first_name', 'batch__primary_mentor__last_name', 'batch__primary_mentor__username']
+        rows = qs.order_by().values(*keys).annotate(
+            student_count=Count('id'),
+            due_total=Sum('due_amount'),
+        ).order_by('-due_total')
+
+        groups = []
+        for row in rows:
+            if group_by == 'batch':
+                group = {'batch_id': row['batch_id'], 'batch_name': row['batch__name'] or 'Unassigned'}
+            else:
+                name = f"{row['batch__primary_mentor__first_name'] or ''} {row['batch__primary_mentor__last_name'] or ''}".strip()
+                group = {
+                    'mentor_id': row['batch__primary_mentor_id'],
+                    'mentor_name': (name or row['batch__primary_mentor__username']) if row['batch__primary_mentor_id'] else 'Not Assigned',
+                }
+            group.update({'student_count': row['student_count'], 'due_total': row['due_total']})
+            groups.append(group)
+        return groups
 
+    def paginate_fee_dues(self, qs):
+        """Page in SQL when ?page/?page_size is given; otherwise return every row as before."""
+        if 'page' in self.request.query_params or 'page_size' in self.request.query_params:
+            paginator = StandardResultsSetPagination()
+            return paginator, paginator.paginate_queryset(qs, self.request, view=self)
+        return None, qs
 
     @action(detail=False, methods=['get'])
     def due_students(self, request):
-        students = self.get_queryset().filter(course__isnull=False)
-        due_list = []
-        for s in students:
-            total_paid = s.transactions.aggregate(total=Sum('amount'))['total'] or 0
-            fee = s.course.fee_amount
-            if total_paid < fee:
-                due_list.append(s)
-        serializer = self.get_serializer(due_list, many=True)
+        from django.db.models import ExpressionWrapper, DecimalField
+        due_amount = ExpressionWrapper(F('course__fee_amount') - F('total_paid'), output_field=DecimalField(max_digits=12, decimal_places=2))
+        qs = self.get_queryset().filter(course__isnull=False).annotate(due_amount=due_amount).filter(due_amount__gt=0)
+
+        group_by = request.query_params.get('group_by')
+        if group_by in ['batch', 'mentor']:
+            return Response(self.fee_due_groups(qs, group_by, due_amount))
+
+        paginator, page = self.paginate_fee_dues(qs.order_by('-due_amount', '-id'))
+        serializer = self.get_serializer(page, many=True)
+        if paginator:
+            return paginator.get_paginated_response(serializer.data)
         return Response(serializer.data)
 
     @action(detail=True, methods=['post'])
@@ -1144,12 +1159,17 @@ class StudentViewSet(viewsets.ModelViewSet):
             try:
                 assigned_user = get_user_model().objects.get(id=user_id)
                 students.update(assigned_to=assigned_user)
+                # .update() fires no signals: re-roll the closed days these leads count towards
+                mark_students_dirty(student_ids)
+                bump_resource_version('lead_assignment', 'dashboards')
                 return Response({'status': f'Leads assigned to {assigned_user.first_name or assigned_user.username}'})
             except get_user_model().DoesNotExist:
                 return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
         else:
             # Unassign
             students.update(assigned_to=None)
+            mark_students_dirty(student_ids)
+            bump_resource_version('lead_assignment', 'dashboards')
             return Response({'status': 'Leads unassigned'})
 
     @action(detail=True, methods=['post'])
@@ -1235,12 +1255,14 @@ class StudentViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def break_metrics(self, request):
         from core.models import StudentBreakHistory
+        from django.db.models import Exists, OuterRef, Subquery
         from datetime import datetime, date
         
         start_date_str = request.query_params.get('start_date')
         end_date_str = request.query_params.get('end_date')
         
-        qs = self.get_queryset()
+        # Plain pk subquery so role-scoping joins/DISTINCT don't leak into the aggregates below
+        students = Student.objects.filter(pk__in=self.get_queryset().order_by().values('pk'))
         
         # Parse dates if provided
         start_date = None
@@ -1252,30 +1274,30 @@ class StudentViewSet(viewsets.ModelViewSet):
                 end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
         except ValueError:
             pass
-        # Students on break filtering
-        on_break_qs = qs.filter(academic_status='ON_BREAK')
-        # To filter by when they took the break, we can look at the StudentBreakHistory
-        
-        # Rejoined filtering
-        rejoined_qs = StudentBreakHistory.objects.filter(
-            student__in=qs,
-            is_active_break=False
+
+        def in_window(field):
+            bounds = {}
+            if start_date:
+                bounds[f'{field}__gte'] = start_date
+            if end_date:
+                bounds[f'{field}__lte'] = end_date
+            return bounds
+
+        # The student's open break (first by id, as before) supplies reason/date for the on-break bucket
+        active_breaks = StudentBreakHistory.objects.filter(student=OuterRef('pk'), is_active_break=True).order_by('id')
+        on_break_qs = students.filter(academic_status='ON_BREAK').annotate(
+            break_reason=Subquery(active_breaks.values('reason')[:1]),
+            break_date=Subquery(active_breaks.values('break_start_date')[:1]),
         )
-        
-        # Discontinued filtering
-        discontinued_qs = qs.filter(academic_status='DISCONTINUED')
-        
-        if start_date and end_date:
-            on_break_qs = on_break_qs.filter(
-                studentbreakhistory__break_start_date__gte=start_date,
-                studentbreakhistory__break_start_date__lte=end_date,
-                studentbreakhistory__is_active_break=True
-            ).distinct()
-            
-            rejoined_qs = rejoined_qs.filter(
-                rejoin_date__gte=start_date,
-                rejoin_date__lte=end_date
-            )
+        rejoined_qs = StudentBreakHistory.objects.filter(student__in=students, is_active_break=False)
+        discontinued_qs = students.filter(academic_status='DISCONTINUED')
+
+        if start_date or end_date:
+            on_break_qs = on_break_qs.filter(Exists(
+                StudentBreakHistory.objects.filter(student=OuterRef('pk'), is_active_break=True, **in_window('break_start_date'))
+            ))
+            rejoined_qs = rejoined_qs.filter(**in_window('rejoin_date'))
+            discontinued_qs = discontinued_qs.filter(**in_window('discontinued_date'))
         else:
             # Default behavior if no dates: Rejoined this month
             today = date.today()
@@ -1285,59 +1307,84 @@ class StudentViewSet(viewsets.ModelViewSet):
             )
 
         # Build responses
-        on_break_data = []
-        for s in on_break_qs:
-            history = StudentBreakHistory.objects.filter(student=s, is_active_break=True).first()
-            on_break_data.append({
-                'id': s.id,
-                'name': f"{s.first_name} {s.last_name}",
-                'crm_student_id': s.crm_student_id,
-                'mobile': s.mobile,
-                'email': s.email,
-                'reason': history.reason if history else '',
-                'date': history.break_start_date.strftime('%Y-%m-%d') if history and history.break_start_date else ''
-            })
+        on_break_data = [{
+            'id': s['id'],
+            'name': f"{s['first_name']} {s['last_name']}",
+            'crm_student_id': s['crm_student_id'],
+            'mobile': s['mobile'],
+            'email': s['email'],
+            'reason': s['break_reason'] or '',
+            'date': s['break_date'].strftime('%Y-%m-%d') if s['break_date'] else ''
+        } for s in on_break_qs.values('id', 'first_name', 'last_name', 'crm_student_id', 'mobile', 'email', 'break_reason', 'break_date')]
             
-        rejoined_data = []
-        for history in rejoined_qs:
-            s = history.student
-            rejoined_data.append({
-                'id': s.id,
-                'name': f"{s.first_name} {s.last_name}",
-                'crm_student_id': s.crm_student_id,
-                'mobile': s.mobile,
-                'email': s.email,
-                'reason': history.reason,
-                'break_date': history.break_start_date.strftime('%Y-%m-%d') if history.break_start_date else '',
-                'rejoin_date': history.rejoin_date.strftime('%Y-%m-%d') if history.rejoin_date else ''
-            })
+        rejoined_data = [{
+            'id': h['student_id'],
+            'name': f"{h['student__first_name']} {h['student__last_name']}",
+            'crm_student_id': h['student__crm_student_id'],
+            'mobile': h['student__mobile'],
+            'email': h['student__email'],
+            'reason': h['reason'],
+            'break_date': h['break_start_date'].strftime('%Y-%m-%d') if h['break_start_date'] else '',
+            'rejoin_date': h['rejoin_date'].strftime('%Y-%m-%d') if h['rejoin_date'] else ''
+        } for h in rejoined_qs.values(
+            'student_id', 'student__first_name', 'student__last_name', 'student__crm_student_id',
+            'student__mobile', 'student__email', 'reason', 'break_start_date', 'rejoin_date',
+        )]
             
-        discontinued_data = []
-        for s in discontinued_qs:
-            discontinued_data.append({
-                'id': s.id,
-                'name': f"{s.first_name} {s.last_name}",
-                'crm_student_id': s.crm_student_id,
-                'mobile': s.mobile,
-                'email': s.email,
-                'reason': 'Discontinued',
-                'date': s.discontinued_date.strftime('%Y-%m-%d') if s.discontinued_date else ''
-            })
+        discontinued_data = [{
+            'id': s['id'],
+            'name': f"{s['first_name']} {s['last_name']}",
+            'crm_student_id': s['crm_student_id'],
+            'mobile': s['mobile'],
+            'email': s['email'],
+            'reason': 'Discontinued',
+            'date': s['discontinued_date'].strftime('%Y-%m-%d') if s['discontinued_date'] else ''
+        } for s in discontinued_qs.values('id', 'first_name', 'last_name', 'crm_student_id', 'mobile', 'email', 'discontinued_date')]
             
-        return Response({
+        data = {
             'on_break': on_break_data,
             'rejoined': rejoined_data,
             'discontinued': discontinued_data,
             'on_break_count': len(on_break_data),
             'rejoined_count': len(rejoined_data),
             'discontinued_count': len(discontinued_data)
-        })
+        }
+
+        # Optional per-batch / per-mentor counts: one grouped query per bucket
+        group_by = request.query_params.get('group_by')
+        if group_by in ['batch', 'mentor']:
+            if group_by == 'batch':
+                key, label_fields = 'batch_id', ['batch__name']
+            else:
+                key, label_fields = 'batch__primary_mentor_id', ['batch__primary_mentor__first_name', 'batch__primary_mentor__last_name', 'batch__primary_mentor__username']
+            groups = {}
+            buckets = [
+                ('on_break', on_break_qs, ''),
+                ('rejoined', rejoined_qs, 'student__'),
+                ('discontinued', discontinued_qs, ''),
+            ]
+            for bucket, bucket_qs, prefix in buckets:
+                fields = [prefix + f for f in [key] + label_fields]
+                for row in bucket_qs.order_by().values(*fields).annotate(n=Count('id')):
+                    group_id = row[prefix + key]
+                    if group_id not in groups:
+                        if group_by == 'batch':
+                            name = row[prefix + 'batch__name'] or 'Unassigned'
+                        else:
+                            full = f"{row[prefix + 'batch__primary_mentor__first_name'] or ''} {row[prefix + 'batch__primary_mentor__last_name'] or ''}".strip()
+                            name = (full or row[prefix + 'batch__primary_mentor__username']) if group_id else 'Not Assigned'
+                        groups[group_id] = {f'{group_by}_id': group_id, f'{group_by}_name': name, 'on_break': 0, 'rejoined': 0, 'discontinued': 0}
+                    groups[group_id][bucket] = row['n']
+            data['breakdown'] = sorted(groups.values(), key=lambda g: g[f'{group_by}_name'])
+
+        return Response(data)
 
     @action(detail=False, methods=['get'])
     def fee_defaulters(self, request):
-        from django.db.models import F
+        from django.db.models import ExpressionWrapper, DecimalField
         # Students where paid_fee < total_fee
-        qs = self.get_queryset().filter(paid_fee__lt=F('total_fee'))
+        due_amount = ExpressionWrapper(F('total_fee') - F('paid_fee'), output_field=DecimalField(max_digits=12, decimal_places=2))
+        qs = self.get_queryset().annotate(due_amount=due_amount).filter(due_amount__gt=0)
         
         # Support optional date range filtering on fee_due_date
         start_date = request.query_params.get('start_date')
@@ -1346,28 +1393,41 @@ class StudentViewSet(viewsets.ModelViewSet):
             qs = qs.filter(fee_due_date__gte=start_date)
         if end_date:
             qs = qs.filter(fee_due_date__lte=end_date)
-        
+
+        group_by = request.query_params.get('group_by')
+        if group_by in ['batch', 'mentor']:
+            return Response(self.fee_due_groups(qs, group_by, due_amount))
+
+        rows = qs.select_related(None).prefetch_related(None).order_by('-due_amount', '-id').values(
+            'id', 'first_name', 'last_name', 'crm_student_id', 'mobile', 'email', 'total_fee', 'paid_fee',
+            'due_amount', 'fee_due_date', 'lms_student_id', 'batch_id', 'batch__name', 'batch__primary_mentor_id',
+            'batch__primary_mentor__first_name', 'batch__primary_mentor__last_name', 'batch__primary_mentor__username',
+        )
+        paginator, page = self.paginate_fee_dues(rows)
+
         data = []
-        for s in qs:
+        for s in page:
             mentor_name = 'Not Assigned'
-            if s.batch and s.batch.primary_mentor:
-                mentor_name = f"{s.batch.primary_mentor.first_name} {s.batch.primary_mentor.last_name}".strip() or s.batch.primary_mentor.username
+            if s['batch__primary_mentor_id']:
+                mentor_name = f"{s['batch__primary_mentor__first_name']} {s['batch__primary_mentor__last_name']}".strip() or s['batch__primary_mentor__username']
                 
             data.append({
-                'id': s.id,
-                'name': f"{s.first_name} {s.last_name}",
-                'crm_student_id': s.crm_student_id,
-                'mobile': s.mobile,
-                'email': s.email,
-                'total_fee': s.total_fee,
-                'paid_fee': s.paid_fee,
-                'due_amount': s.total_fee - s.paid_fee,
-                'fee_due_date': s.fee_due_date.strftime('%Y-%m-%d') if s.fee_due_date else '',
-                'is_wise_integrated': bool(s.lms_student_id),
-                'batch_name': s.batch.name if s.batch else 'Unassigned',
+                'id': s['id'],
+                'name': f"{s['first_name']} {s['last_name']}",
+                'crm_student_id': s['crm_student_id'],
+                'mobile': s['mobile'],
+                'email': s['email'],
+                'total_fee': s['total_fee'],
+                'paid_fee': s['paid_fee'],
+                'due_amount': s['due_amount'],
+                'fee_due_date': s['fee_due_date'].strftime('%Y-%m-%d') if s['fee_due_date'] else '',
+                'is_wise_integrated': bool(s['lms_student_id']),
+                'batch_name': s['batch__name'] if s['batch_id'] else 'Unassigned',
                 'mentor_name': mentor_name
             })
-            
+
+        if paginator:
+            return paginator.get_paginated_response(data)
         return Response(data)
 
     @action(detail=True, methods=['post'])
@@ -1458,9 +1518,10 @@ class StudentViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def collected_fees(self, request):
-        from django.db.models import Q
+        from django.db.models import Q, Value, CharField, DateField, DecimalField, IntegerField
+        from django.db.models.functions import Cast, Concat, TruncDate
         from core.models import Transaction, MonthlyPayment, Student
-        from integrations.utils import WiseService
+        from integrations.models import WiseTransaction
         user = request.user
         
         start_date = request.query_params.get('start_date')
@@ -1473,148 +1534,104 @@ class StudentViewSet(viewsets.ModelViewSet):
         if not end_date or end_date == '':
             import datetime
             end_date = datetime.date.today().strftime('%Y-%m-%d')
-        
-        # 1. Query Transactions
-        tx_qs = Transaction.objects.all().select_related('student', 'student__batch', 'student__batch__primary_mentor')
-        if user.role in ['MENTOR', 'TEACHER']:
-            tx_qs = tx_qs.filter(
-                Q(student__batch__primary_mentor=user) | 
-                Q(student__batch__secondary_mentors=user) | 
-                Q(student__batch__teacher=user)
-            ).distinct()
-            
-        if start_date:
-            tx_qs = tx_qs.filter(date__date__gte=start_date)
-        if end_date:
-            tx_qs = tx_qs.filter(date__date__lte=end_date)
-            
-        # 2. Query MonthlyPayments
-        mp_qs = MonthlyPayment.objects.all().select_related('student', 'student__batch', 'student__batch__primary_mentor')
-        if user.role in ['MENTOR', 'TEACHER']:
-            mp_qs = mp_qs.filter(
-                Q(student__batch__primary_mentor=user) | 
-                Q(student__batch__secondary_mentors=user) | 
-                Q(student__batch__teacher=user)
-            ).distinct()
-            
-        if start_date:
-            mp_qs = mp_qs.filter(paid_date__gte=start_date)
-        if end_date:
-            mp_qs = mp_qs.filter(paid_date__lte=end_date)
-            
-        # 3. Query Wise LMS Live Transactions
-        wise = WiseService()
-        wise_txs = []
-        try:
-            if wise.api_key:
-                wise_tx_data = wise.get_institute_transactions(start_date=start_date, end_date=end_date)
-                if wise_tx_data and isinstance(wise_tx_data, dict):
-                    wise_txs = wise_tx_data.get('transactions') or []
-        except Exception as e:
-            print(f"Error fetching live Wise transactions: {e}")
-
-        # Build list of scoped students for matching and role-based filtering
-        students_qs = Student.objects.all()
+
+        # Role scoping as a pk subquery (no DISTINCT needed inside the UNION)
+        scoped_students = None
         if user.role in ['MENTOR', 'TEACHER']:
-            students_qs = students_qs.filter(
+            scoped_students = Student.objects.filter(
                 Q(batch__primary_mentor=user) | 
                 Q(batch__secondary_mentors=user) | 
                 Q(batch__teacher=user)
-            ).distinct()
-            
-        lms_to_student = {}
-        for s in students_qs.select_related('batch', 'batch__primary_mentor'):
-            if s.lms_student_id:
-                lms_to_student[str(s.lms_student_id)] = s
+            ).values('pk')
+
+        # Every branch selects the same columns, in the same order, so they can be UNIONed
+        def columns(qs, kind, row_id, date, month, ref_id, prefix='student__', fallback_name=None, fallback_batch=None):
+            if scoped_students is not None:
+                qs = qs.filter(student__in=scoped_students)
+            return qs.order_by().annotate(
+                row_id=row_id,
+                kind=Value(kind, output_field=CharField()),
+                row_student_id=F('student_id'),
+                row_first_name=F(prefix + 'first_name'),
+                row_last_name=F(prefix + 'last_name'),
+                row_fallback_name=fallback_name or Value(None, output_field=CharField()),
+                row_crm_student_id=F(prefix + 'crm_student_id'),
+                row_batch_name=F(prefix + 'batch__name'),
+                row_fallback_batch=fallback_batch or Value(None, output_field=CharField()),
+                row_mentor_id=Cast(prefix + 'batch__primary_mentor_id', IntegerField()),
+                row_mentor_first=F(prefix + 'batch__primary_mentor__first_name'),
+                row_mentor_last=F(prefix + 'batch__primary_mentor__last_name'),
+                row_mentor_username=F(prefix + 'batch__primary_mentor__username'),
+                row_amount=Cast('amount', DecimalField(max_digits=12, decimal_places=2)),
+                row_date=date,
+                row_month=month,
+                row_ref_id=ref_id,
+            ).values(
+                'row_id', 'kind', 'row_student_id', 'row_first_name', 'row_last_name', 'row_fallback_name',
+                'row_crm_student_id', 'row_batch_name', 'row_fallback_batch', 'row_mentor_id', 'row_mentor_first',
+                'row_mentor_last', 'row_mentor_username', 'row_amount', 'row_date', 'row_month', 'row_ref_id',
+            )
 
-        # 4. Format & Merge
-        data = []
-        for t in tx_qs:
-            mentor_name = 'Not Assigned'
-            if t.student.batch and t.student.batch.primary_mentor:
-                mentor_name = f"{t.student.batch.primary_mentor.first_name} {t.student.batch.primary_mentor.last_name}".strip() or t.student.batch.primary_mentor.username
-                
-            data.append({
-                'id': f"tx_{t.id}",
-                'student_name': f"{t.student.first_name} {t.student.last_name}",
-                'crm_student_id': t.student.crm_student_id,
-                'batch_name': t.student.batch.name if t.student.batch else 'Unassigned',
-                'mentor_name': mentor_name,
-                'amount': float(t.amount),
-                'date': t.date.strftime('%Y-%m-%d'),
-                'type': 'LMS / Razorpay Sync',
-                'ref_id': t.transaction_id
-            })
-            
-        for p in mp_qs:
-            mentor_name = 'Not Assigned'
-            if p.student.batch and p.student.batch.primary_mentor:
-                mentor_name = f"{p.student.batch.primary_mentor.first_name} {p.student.batch.primary_mentor.last_name}".strip() or p.student.batch.primary_mentor.username
-                
-            data.append({
-                'id': f"mp_{p.id}",
-                'student_name': f"{p.student.first_name} {p.student.last_name}",
-                'crm_student_id': p.student.crm_student_id,
-                'batch_name': p.student.batch.name if p.student.batch else 'Unassigned',
-                'mentor_name': mentor_name,
-                'amount': float(p.amount),
-                'date': p.paid_date.strftime('%Y-%m-%d') if p.paid_date else '',
-                'type': f"Manual ({p.month.strftime('%b %Y')})",
-                'ref_id': p.notes or 'N/A'
-            })
+        no_month = Value(None, output_field=DateField())
+        tx_rows = columns(
+            Transaction.objects.filter(date__date__gte=start_date, date__date__lte=end_date), 'TX',
+            row_id=Concat(Value('tx_'), Cast('id', CharField()), output_field=CharField()),
+            date=TruncDate('date'), month=no_month, ref_id=F('transaction_id'),
+        )
+        mp_rows = columns(
+            MonthlyPayment.objects.filter(paid_date__gte=start_date, paid_date__lte=end_date), 'MP',
+            row_id=Concat(Value('mp_'), Cast('id', CharField()), output_field=CharField()),
+            date=F('paid_date'), month=F('month'), ref_id=F('notes'),
+        )
+        # Wise LMS transactions come from the local mirror (integrations.wise_sync), never the live API
+        wise_rows = columns(
+            WiseTransaction.objects.filter(charged_at__date__gte=start_date, charged_at__date__lte=end_date), 'WISE',
+            row_id=Concat(Value('wise_'), 'wise_id', output_field=CharField()),
+            date=TruncDate('charged_at'), month=no_month, ref_id=F('wise_id'),
+            fallback_name=F('student_name'), fallback_batch=F('classroom_name'),
+        )
+        rows = tx_rows.union(mp_rows, wise_rows, all=True).order_by('-row_date', 'row_id')
 
-        for wtx in wise_txs:
-            w_student_id = str(wtx.get('studentId') or '')
-            
-            # Role-based filtering: if MENTOR/TEACHER, only show if student is in our scoped mapping
-            if user.role in ['MENTOR', 'TEACHER'] and w_student_id not in lms_to_student:
-                continue
-            
-            # Resolve student details
-            local_student = lms_to_student.get(w_student_id)
-            if local_student:
-                student_name = f"{local_student.first_name} {local_student.last_name}"
-                crm_student_id = local_student.crm_student_id
-                batch_name = local_student.batch.name if local_student.batch else 'Unassigned'
-                mentor_name = 'Not Assigned'
-                if local_student.batch and local_student.batch.primary_mentor:
-                    mentor_name = f"{local_student.batch.primary_mentor.first_name} {local_student.batch.primary_mentor.last_name}".strip() or local_student.batch.primary_mentor.username
+        paginator = None
+        if 'page' in request.query_params or 'page_size' in request.query_params:
+            paginator = StandardResultsSetPagination()
+            rows = paginator.paginate_queryset(rows, request, view=self)
+
+        type_labels = {'TX': 'LMS / Razorpay Sync', 'WISE': 'Wise LMS Sync'}
+        data = []
+        for r in rows:
+            if r['row_student_id']:
+                student_name = f"{r['row_first_name']} {r['row_last_name']}"
+                crm_student_id = r['row_crm_student_id']
+                batch_name = r['row_batch_name'] or 'Unassigned'
             else:
-                # Fallback to Wise API transaction data if we are an admin and student is not in CRM
-                student_name = wtx.get('student', {}).get('name') or 'Unknown Student'
+                # Wise transaction for a student not in the CRM (admins only; mentors are scoped to linked students)
+                student_name = r['row_fallback_name'] or 'Unknown Student'
                 crm_student_id = 'N/A'
-                batch_name = wtx.get('classroom', {}).get('name') or 'Wise Class'
-                mentor_name = 'Not Assigned'
-            
-            amount_obj = wtx.get('amount') or {}
-            if isinstance(amount_obj, dict):
-                amount_val = float(amount_obj.get('value', 0)) / 100.0
+                batch_name = r['row_fallback_batch'] or 'Wise Class'
+            mentor_name = 'Not Assigned'
+            if r['row_mentor_id']:
+                mentor_name = f"{r['row_mentor_first']} {r['row_mentor_last']}".strip() or r['row_mentor_username']
+            if r['kind'] == 'MP':
+                row_type = f"Manual ({r['row_month'].strftime('%b %Y')})" if r['row_month'] else 'Manual'
+                ref_id = r['row_ref_id'] or 'N/A'
             else:
-                amount_val = float(amount_obj) / 100.0
-                
-            # Format chargedAt
-            charged_at_str = wtx.get('chargedAt') or wtx.get('createdAt') or ''
-            formatted_date = ''
-            if charged_at_str:
-                try:
-                    formatted_date = charged_at_str.split('T')[0]
-                except Exception:
-                    formatted_date = charged_at_str
-                    
+                row_type = type_labels[r['kind']]
+                ref_id = r['row_ref_id']
             data.append({
-                'id': f"wise_{wtx.get('_id') or wtx.get('id')}",
+                'id': r['row_id'],
                 'student_name': student_name,
                 'crm_student_id': crm_student_id,
                 'batch_name': batch_name,
                 'mentor_name': mentor_name,
-                'amount': amount_val,
-                'date': formatted_date,
-                'type': 'Wise LMS Sync',
-                'ref_id': wtx.get('_id') or wtx.get('id') or 'N/A'
+                'amount': float(r['row_amount'] or 0),
+                'date': r['row_date'].strftime('%Y-%m-%d') if r['row_date'] else '',
+                'type': row_type,
+                'ref_id': ref_id
             })
-            
-        # Sort by date descending
-        data.sort(key=lambda x: x.get('date') or '', reverse=True)
+
+        if paginator:
+            return paginator.get_paginated_response(data)
         return Response(data)
 
     @action(detail=True, methods=['post'])
@@ -2007,42 +2024,36 @@ class DashboardStatsView(APIView):
         from decimal import Decimal
         
         # Base querysets
-        converted_stage_ids = ['CONVERTED', 'ENROLLED']
-        try:
-            from crm.models import PipelineStage
-            stages = PipelineStage.objects.filter(Q(name__icontains='convert') | Q(name__icontains='enroll'))
-            for stage in stages:
-                converted_stage_ids.append(str(stage.id))
-        except Exception:
-            pass
+        from crm.reference_data import get_reference_data
+        converted_stage_ids = ['CONVERTED', 'ENROLLED'] + get_reference_data().converted_stage_ids
 
         student_qs = Student.objects.filter(is_active=True, lead_status__in=converted_stage_ids)
         batch_qs = Batch.objects.all()
         trans_qs = Transaction.objects.all()
+        # Closed days of revenue come from the daily rollups, the rest is summed live
+        from crm.models import DailyRevenueMetrics
+        revenue_facts = DailyRevenueMetrics.objects.all()
         
-        # Import RolePermission to check for ANALYTICS access for revenue
-        from users.models import RolePermission
+        # Check for ANALYTICS access for revenue
+        from users.permission_matrix import role_masks, VIEW
         has_analytics = user.role == 'SUPER_ADMIN' or user.is_superuser or \
-                        RolePermission.objects.filter(role=user.role, module='ANALYTICS', can_view=True).exists()
+                        bool(role_masks(user.role).get('ANALYTICS', 0) & VIEW)
         
         if user.role in ['MENTOR', 'TEACHER']:
             # Include subordinates if any
-            subordinates = user.get_all_subordinates()
-            if subordinates:
-                users_to_check = [user] + subordinates
-                student_qs = student_qs.filter(Q(batch__primary_mentor__in=users_to_check) | Q(batch__secondary_mentors__in=users_to_check) | Q(batch__teacher__in=users_to_check)).distinct()
-                batch_qs = batch_qs.filter(Q(primary_mentor__in=users_to_check) | Q(secondary_mentors__in=users_to_check) | Q(teacher__in=users_to_check)).distinct()
-            else:
-                student_qs = student_qs.filter(Q(batch__primary_mentor=user) | Q(batch__secondary_mentors=user) | Q(batch__teacher=user)).distinct()
-                batch_qs = batch_qs.filter(Q(primary_mentor=user) | Q(secondary_mentors=user) | Q(teacher=user)).distinct()
+            users_to_check = user.subordinate_ids(include_self=True)
+            student_qs = student_qs.filter(Q(batch__primary_mentor__in=users_to_check) | Q(batch__secondary_mentors__in=users_to_check) | Q(batch__teacher__in=users_to_check)).distinct()
+            batch_qs = batch_qs.filter(Q(primary_mentor__in=users_to_check) | Q(secondary_mentors__in=users_to_check) | Q(teacher__in=users_to_check)).distinct()
             # Mentors generally don't see revenue unless they have explicit analytical perms
             if not has_analytics:
                 trans_qs = Transaction.objects.none()
+                revenue_facts = DailyRevenueMetrics.objects.none()
         
         elif user.role == 'SALES':
             # Sales may see all active leads/students, but revenue might be restricted
             if not has_analytics:
                 trans_qs = Transaction.objects.none()
+                revenue_facts = DailyRevenueMetrics.objects.none()
         
         elif user.role == 'STUDENT':
             # Students are redirected, but for safety: 
@@ -2055,28 +2066,33 @@ class DashboardStatsView(APIView):
                 # Admins can filter by any mentor
                 student_qs = student_qs.filter(batch__primary_mentor_id=mentor_id).distinct()
                 batch_qs = batch_qs.filter(primary_mentor_id=mentor_id).distinct()
-            elif user.role in ['MENTOR', 'TEACHER'] and hasattr(user, 'get_all_subordinates'):
-                subordinates = user.get_all_subordinates()
+            elif user.role in ['MENTOR', 'TEACHER'] and hasattr(user, 'subordinate_ids'):
                 # Verify requested mentor is a subordinate or self
-                if str(mentor_id) == str(user.id) or any(str(sub.id) == str(mentor_id) for sub in subordinates):
+                if str(mentor_id).isdigit() and user.subordinate_ids(include_self=True).filter(descendant_id=mentor_id).exists():
                     student_qs = student_qs.filter(batch__primary_mentor_id=mentor_id).distinct()
                     batch_qs = batch_qs.filter(primary_mentor_id=mentor_id).distinct()
 
         # Finance Integration
         from finance.models import Expense
-        from datetime import datetime
-        today = datetime.now()
-        first_day = today.replace(day=1)
+        from datetime import datetime, timedelta
+
+        # Fee/expense figures are for ?month=YYYY-MM (default: the current month)
+        first_day_date = datetime.now().date().replace(day=1)
+        month_param = request.query_params.get('month')
+        if month_param:
+            try:
+                first_day_date = datetime.strptime(month_param[:7], '%Y-%m').date()
+            except ValueError:
+                return Response({'error': 'month must be YYYY-MM'}, status=status.HTTP_400_BAD_REQUEST)
+        next_month_date = (first_day_date.replace(day=28) + timedelta(days=4)).replace(day=1)
         
-        monthly_expenses = Expense.objects.filter(date__gte=first_day).aggregate(total=Sum('amount'))['total'] or 0
+        monthly_expenses = Expense.objects.filter(date__gte=first_day_date, date__lt=next_month_date).aggregate(total=Sum('amount'))['total'] or 0
         total_expenses = Expense.objects.aggregate(total=Sum('amount'))['total'] or 0
 
         # Calculate monthly expected, collected, due fee metrics
         from core.models import MonthlyPayment
         
-        first_day_date = today.date().replace(day=1)
-        
-        # Subquery to calculate MonthlyPayment sum for current month for each student
+        # Subquery to calculate MonthlyPayment sum for the month for each student
         monthly_pay_subquery = MonthlyPayment.objects.filter(
             student=OuterRef('pk'),
             month=first_day_date
@@ -2084,8 +2100,8 @@ class DashboardStatsView(APIView):
             total=Sum('amount')
         ).values('total')
         
-        # Annotate student_qs with fallback calculations
-        student_fees_qs = student_qs.annotate(
+        # Annotate the scoped students (re-selected by pk so scoping joins can't duplicate rows) with fallback calculations
+        student_fees_qs = Student.objects.filter(pk__in=student_qs.order_by().values('pk')).annotate(
             current_month_collected=Coalesce(
                 Subquery(monthly_pay_subquery),
                 Decimal('0.00'),
@@ -2102,40 +2118,57 @@ class DashboardStatsView(APIView):
                 output_field=models.DecimalField(max_digits=10, decimal_places=2)
             )
         )
-        
-        expected_monthly_revenue = student_fees_qs.aggregate(total=Sum('expected_fee'))['total'] or Decimal('0.00')
-        collected_monthly_revenue = student_fees_qs.aggregate(total=Sum('collected_fee'))['total'] or Decimal('0.00')
+
+        # One grouped query gives every batch's figures; the overall totals are their sum
+        fees_by_batch = {
+            row['batch']: row for row in student_fees_qs.order_by().values('batch').annotate(
+                student_count=Count('id'),
+                expected=Sum('expected_fee'),
+                collected=Sum('collected_fee'),
+            )
+        }
+        expected_monthly_revenue = sum((row['expected'] or Decimal('0.00') for row in fees_by_batch.values()), Decimal('0.00'))
+        collected_monthly_revenue = sum((row['collected'] or Decimal('0.00') for row in fees_by_batch.values()), Decimal('0.00'))
         due_monthly_revenue = max(Decimal('0.00'), expected_monthly_revenue - collected_monthly_revenue)
 
         # Batch fees breakdown
         batch_fees = []
-        for b in batch_qs:
-            batch_students = student_fees_qs.filter(batch=b)
-            b_expected = batch_students.aggregate(total=Sum('expected_fee'))['total'] or Decimal('0.00')
-            b_collected = batch_students.aggregate(total=Sum('collected_fee'))['total'] or Decimal('0.00')
+        for b in batch_qs.values('id', 'name'):
+            row = fees_by_batch.get(b['id'], {})
+            b_expected = row.get('expected') or Decimal('0.00')
+            b_collected = row.get('collected') or Decimal('0.00')
             b_due = max(Decimal('0.00'), b_expected - b_collected)
             
             batch_fees.append({
-                "id": b.id,
-                "name": b.name,
-                "student_count": batch_students.count(),
+                "id": b['id'],
+                "name": b['name'],
+                "student_count": row.get('student_count', 0),
                 "expected": float(b_expected),
                 "collected": float(b_collected),
                 "due": float(b_due)
             })
 
+        from crm.rollups import RollupWindow, merge_rows
+        from itertools import chain
+        revenue_window = RollupWindow()
+        revenue_by_program = merge_rows(chain(
+            revenue_window.facts(revenue_facts).values(name=F('program_type__name')).annotate(value=Sum('amount')).order_by(),
+            revenue_window.live(trans_qs, 'date').values(name=F('student__program_type__name')).annotate(value=Sum('amount')).order_by(),
+        ), 'name')
+
         stats = {
             "students": student_qs.count(),
             "batches": batch_qs.count(),
-            "revenue": trans_qs.aggregate(total=Sum('amount'))['total'] or 0,
+            "revenue": sum(row['value'] for row in revenue_by_program.values()) or 0,
             "leads": Student.objects.filter(is_active=True, batch__isnull=True).count(),
             "distribution": list(student_qs.values(name=F('program_type__name')).annotate(value=Count('id'))),
-            "revenue_distribution": list(trans_qs.values(name=F('student__program_type__name')).annotate(value=Sum('amount'))),
+            "revenue_distribution": [{'name': name, 'value': row['value']} for name, row in revenue_by_program.items()],
             "expenses": float(monthly_expenses),
             "total_expenses": float(total_expenses),
             "this_month_expected": float(expected_monthly_revenue),
             "this_month_collected": float(collected_monthly_revenue),
             "this_month_due": float(due_monthly_revenue),
+            "month": first_day_date.strftime('%Y-%m'),
             "batch_fees": batch_fees
         }
         
@@ -2175,84 +2208,100 @@ class AnalyticsDetailView(APIView):
         batch_stats = batches.values('id', 'name', 'course__name', 'student_count')
         
         total_potential = Student.objects.filter(is_active=True).aggregate(sum=Sum('course__fee_amount'))['sum'] or 0
-        total_collected = Transaction.objects.all().aggregate(sum=Sum('amount'))['sum'] or 0
+        # Revenue by month: closed days from the daily rollups, the rest live
+        from crm.models import DailyRevenueMetrics
+        from crm.rollups import RollupWindow
+        from django.db.models.functions import TruncMonth
+        from datetime import datetime
+        from itertools import chain
+        revenue_window = RollupWindow()
+        revenue_by_month = {}
+        for rt in chain(
+            revenue_window.facts(DailyRevenueMetrics.objects.all()).annotate(month_trunc=TruncMonth('date')).values('month_trunc').annotate(total=Sum('amount')).order_by(),
+            revenue_window.live(Transaction.objects.all(), 'date').annotate(month_trunc=TruncMonth('date')).values('month_trunc').annotate(total=Sum('amount')).order_by(),
+        ):
+            month_start = rt['month_trunc'].date() if isinstance(rt['month_trunc'], datetime) else rt['month_trunc']
+            revenue_by_month[month_start] = revenue_by_month.get(month_start, 0) + (rt['total'] or 0)
+        total_collected = sum(revenue_by_month.values()) or 0
         total_due = total_potential - total_collected
 
-        from core.models import ClassSession
-        import re
+        from core.models import ClassSession, Attendance
         
         month = request.query_params.get('month')
         year = request.query_params.get('year')
-        
+
+        sessions = ClassSession.objects.filter(teacher__in=teachers)
+        if month and year:
+            sessions = sessions.filter(date__month=month, date__year=year)
+
+        # Batches taught or mentored, per teacher (a batch counts once even if both)
+        teacher_batches = {}
+        for batch_id, teacher_id, mentor_id in Batch.objects.filter(
+            Q(teacher__in=teachers) | Q(primary_mentor__in=teachers)
+        ).values_list('id', 'teacher_id', 'primary_mentor_id'):
+            for user_id in {teacher_id, mentor_id} - {None}:
+                teacher_batches.setdefault(user_id, set()).add(batch_id)
+
+        # Session counts and logged time per teacher, and per teacher x batch for sessions with a duration
+        teacher_totals = {
+            row['teacher_id']: row
+            for row in sessions.values('teacher_id').annotate(sessions=Count('id'), ms=Sum('duration_ms')).order_by()
+        }
+        timed_sessions = sessions.filter(duration_ms__isnull=False)
+        batch_totals = {
+            (row['teacher_id'], row['batch_id']): row
+            for row in timed_sessions.values('teacher_id', 'batch_id', 'batch__name').annotate(sessions=Count('id'), ms=Sum('duration_ms')).order_by()
+        }
+
+        # Per-session detail rows with their attendance names, in two queries
+        session_rows = list(timed_sessions.values('id', 'teacher_id', 'batch_id', 'date', 'duration_ms'))
+        attendance_names = {}
+        for a in Attendance.objects.filter(session__in=timed_sessions).values(
+            'session_id', 'is_present', 'student__first_name', 'student__last_name', 'student__user__username'
+        ).order_by('id'):
+            name = f"{a['student__first_name'] or ''} {a['student__last_name'] or ''}".strip()
+            if not name: name = a['student__user__username']
+            present, absent = attendance_names.setdefault(a['session_id'], ([], []))
+            (present if a['is_present'] else absent).append(name)
+
+        session_dates = {}
+        for session in session_rows:
+            s_mins = round(session['duration_ms'] / (1000 * 60))
+            s_h = s_mins // 60
+            s_m = s_mins % 60
+            s_duration = f"{s_h}h {s_m}m" if s_h > 0 else f"{s_m}m"
+            present_students, absent_students = attendance_names.get(session['id'], ([], []))
+            session_dates.setdefault((session['teacher_id'], session['batch_id']), []).append({
+                'date': session['date'].strftime("%d %b %Y"),
+                'duration': s_duration,
+                'present_count': len(present_students),
+                'absent_count': len(absent_students),
+                'present_students': present_students,
+                'absent_students': absent_students
+            })
+
         # Annotate teachers with their session counts, batch counts, and calculated hours
         teacher_stats = []
         for teacher in teachers:
-            b_count = Batch.objects.filter(Q(teacher=teacher) | Q(primary_mentor=teacher)).distinct().count()
-            
-            sessions = ClassSession.objects.filter(teacher=teacher)
-            if month and year:
-                sessions = sessions.filter(date__month=month, date__year=year)
-                
-            s_count = sessions.count()
-            
-            total_milliseconds = 0
-            batch_breakdown = {}
-            for session in sessions:
-                if session.teacher_summary:
-                    match = re.search(r'Duration:\s*(\d+)', session.teacher_summary)
-                    if match:
-                        ms = int(match.group(1))
-                        total_milliseconds += ms
-                        
-                        # Add to batch breakdown
-                        b_id = session.batch.id
-                        if b_id not in batch_breakdown:
-                            batch_breakdown[b_id] = {
-                                'batch_name': session.batch.name,
-                                'sessions': 0,
-                                'ms': 0,
-                                'dates': []
-                            }
-                        batch_breakdown[b_id]['sessions'] += 1
-                        batch_breakdown[b_id]['ms'] += ms
-                        
-                        s_mins = round(ms / (1000 * 60))
-                        s_h = s_mins // 60
-                        s_m = s_mins % 60
-                        s_duration = f"{s_h}h {s_m}m" if s_h > 0 else f"{s_m}m"
-                        
-                        attendances = session.attendances.select_related('student').all()
-                        present_students = []
-                        absent_students = []
-                        for a in attendances:
-                            name = f"{a.student.first_name} {a.student.last_name}".strip()
-                            if not name: name = a.student.username
-                            if a.is_present:
-                                present_students.append(name)
-                            else:
-                                absent_students.append(name)
-                        
-                        batch_breakdown[b_id]['dates'].append({
-                            'date': session.date.strftime("%d %b %Y"),
-                            'duration': s_duration,
-                            'present_count': len(present_students),
-                            'absent_count': len(absent_students),
-                            'present_students': present_students,
-                            'absent_students': absent_students
-                        })
+            b_count = len(teacher_batches.get(teacher.id, ()))
+            totals = teacher_totals.get(teacher.id) or {}
+            s_count = totals.get('sessions', 0)
+            total_milliseconds = totals.get('ms') or 0
 
-            
             # format batch breakdown
             classes_breakdown = []
-            for b_id, b_data in batch_breakdown.items():
+            for (teacher_id, b_id), dates in session_dates.items():
+                if teacher_id != teacher.id:
+                    continue
+                b_data = batch_totals[(teacher_id, b_id)]
                 b_mins = round(b_data['ms'] / (1000 * 60))
                 b_h = b_mins // 60
                 b_m = b_mins % 60
                 classes_breakdown.append({
-                    'batch_name': b_data['batch_name'],
+                    'batch_name': b_data['batch__name'],
                     'sessions': b_data['sessions'],
                     'formatted_time': f"{b_h}h {b_m}m",
-                    'dates': b_data['dates']
+                    'dates': dates
                 })
             
             # sort breakdown by sessions descending
@@ -2278,15 +2327,12 @@ class AnalyticsDetailView(APIView):
         teacher_stats = sorted(teacher_stats, key=lambda x: x['hours'], reverse=True)
 
         # Advanced Charting Data
-        from django.db.models.functions import TruncMonth
-        
         program_dist = list(Student.objects.values(name=F('program_type__name')).annotate(value=Count('id')))
         
         # Lead statuses are enum codes like 'NEW', map them for UI if needed, but UI can handle it.
         lead_dist = list(Student.objects.values(name=F('lead_status')).annotate(value=Count('id')))
         
-        revenue_time = list(Transaction.objects.annotate(month_trunc=TruncMonth('date')).values('month_trunc').annotate(total=Sum('amount')).order_by('month_trunc'))
-        revenue_timeline = [{'name': rt['month_trunc'].strftime('%b %Y') if rt['month_trunc'] else 'Unknown', 'revenue': rt['total']} for rt in revenue_time]
+        revenue_timeline = [{'name': month.strftime('%b %Y'), 'revenue': total} for month, total in sorted(revenue_by_month.items())]
 
         return Response({
             'teachers_count': teachers.count(),
@@ -2305,41 +2351,67 @@ class AnalyticsDetailView(APIView):
         })
 
 class CalendarEventsView(APIView):
+    """
+    Exams and class sessions of the batches the user can see. `?start=&end=`
+    (YYYY-MM-DD, `end` exclusive as sent by the calendar widget) limit the
+    window; the response carries an ETag so unchanged months come back as 304.
+    """
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
         from core.models import Exam, ClassSession
-        
+        from django.utils.dateparse import parse_date
+        from .conditional import conditional_response
+
+        window = {}
+        for param, lookup in (('start', 'date__gte'), ('end', 'date__lt')):
+            value = request.query_params.get(param)
+            if value:
+                # Accept full ISO timestamps too; only the day matters for all-day events
+                day = parse_date(value[:10])
+                if day is None:
+                    return Response({'error': f'{param} must be YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+                window[lookup] = day
+
+        exams = Exam.objects.filter(**window)
+        sessions = ClassSession.objects.filter(**window)
+        if request.user.role not in ['ADMIN', 'SUPER_ADMIN', 'ACADEMIC', 'ACADEMIC_COORDINATOR', 'SALES']:
+            batch_ids = visible_batches(request.user).values('pk')
+            exams = exams.filter(batch__in=batch_ids)
+            sessions = sessions.filter(batch__in=batch_ids)
+
         events = []
         
         # Exams
-        exams = Exam.objects.all().select_related('batch')
-        for exam in exams:
+        exam_types = dict(Exam.EXAM_TYPES)
+        for exam in exams.order_by('date', 'id').values('id', 'title', 'exam_type', 'date', 'batch_id', 'batch__name'):
             events.append({
-                'id': f"exam_{exam.id}",
-                'title': f"{exam.batch.name} - {exam.title} ({exam.get_exam_type_display()})",
-                'start': exam.date.isoformat(),
-                'end': exam.date.isoformat(),
+                'id': f"exam_{exam['id']}",
+                'title': f"{exam['batch__name']} - {exam['title']} ({exam_types.get(exam['exam_type'], exam['exam_type'])})",
+                'start': exam['date'].isoformat(),
+                'end': exam['date'].isoformat(),
                 'allDay': True,
                 'type': 'exam',
-                'resourceId': exam.batch.id
+                'resourceId': exam['batch_id']
             })
             
         # Class Sessions
-        sessions = ClassSession.objects.all().select_related('batch', 'teacher')
-        for session in sessions:
-            teacher_name = f"{session.teacher.first_name} {session.teacher.last_name}".strip() if session.teacher else "Unknown Teacher"
+        for session in sessions.values('id', 'date', 'batch_id', 'batch__name', 'teacher_id', 'teacher__first_name', 'teacher__last_name'):
+            if session['teacher_id']:
+                teacher_name = f"{session['teacher__first_name']} {session['teacher__last_name']}".strip()
+            else:
+                teacher_name = "Unknown Teacher"
             events.append({
-                'id': f"class_{session.id}",
-                'title': f"{session.batch.name} - Class ({teacher_name})",
-                'start': session.date.isoformat(),
-                'end': session.date.isoformat(),
+                'id': f"class_{session['id']}",
+                'title': f"{session['batch__name']} - Class ({teacher_name})",
+                'start': session['date'].isoformat(),
+                'end': session['date'].isoformat(),
                 'allDay': True,
                 'type': 'class',
-                'resourceId': session.batch.id
+                'resourceId': session['batch_id']
             })
             
-        return Response(events)
+        return conditional_response(request, events)
 
 class StudentTeacherHandoverViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = StudentTeacherHandover.objects.select_related('student', 'previous_teacher', 'current_teacher', 'changed_by').all()
@@ -2353,3 +2425,32 @@ class StudentTeacherHandoverViewSet(viewsets.ReadOnlyModelViewSet):
             qs = qs.filter(student_id=student_id)
         return qs
 
+
+
+class ExportJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """Status and download link of background exports queued via /students/export_async/."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_serializer_class(self):
+        from .serializers import ExportJobSerializer
+        return ExportJobSerializer
+
+    def get_queryset(self):
+        from .models import ExportJob
+        qs = ExportJob.objects.all()
+        user = self.request.user
+        if not (user.role in ['ADMIN', 'SUPER_ADMIN'] or user.is_superuser):
+            qs = qs.filter(requested_by=user)
+        return qs
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        """The finished file, for the user who requested it only."""
+        from django.http import FileResponse
+        from .export_jobs import export_filename
+        job = self.get_object()
+        if job.requested_by_id != request.user.id:
+            return Response({'error': 'Only the user who requested this export can download it'}, status=status.HTTP_403_FORBIDDEN)
+        if job.status != 'COMPLETED' or not job.file:
+            return Response({'error': 'Export file is not available'}, status=status.HTTP_404_NOT_FOUND)
+        return FileResponse(job.file.open('rb'), as_attachment=True, filename=export_filename(job))
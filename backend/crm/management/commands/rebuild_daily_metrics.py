@@ -0,0 +1,49 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from crm.models import RollupState
+from crm.rollups import STATE_NAME, TABLES, earliest_day, rebuild, rebuild_dirty_days, set_built_through
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily lead/call/revenue rollups through yesterday, re-roll days edited since, and advance the watermark (run nightly from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=7, help='Also re-roll this many closed days before yesterday, to pick up bulk updates that bypass signals (default 7)')
+        parser.add_argument('--all', action='store_true', help='Rebuild everything from the first lead, call or transaction')
+        parser.add_argument('--start', help='First day to rebuild (YYYY-MM-DD)')
+        parser.add_argument('--end', help='Last day to rebuild (YYYY-MM-DD, default yesterday)')
+
+    def handle(self, *args, **options):
+        yesterday = timezone.localdate() - timedelta(days=1)
+        start = parse_date(options['start']) if options['start'] else None
+        end = parse_date(options['end']) if options['end'] else yesterday
+        if (options['start'] and start is None) or end is None:
+            raise CommandError('Dates must be YYYY-MM-DD')
+        if end > yesterday:
+            raise CommandError('Only closed days (up to yesterday) can be rolled up')
+
+        through = RollupState.objects.filter(name=STATE_NAME).values_list('built_through', flat=True).first()
+        if options['all'] or (through is None and start is None):
+            start = earliest_day() or end
+        elif start is None:
+            start = min(through + timedelta(days=1), end - timedelta(days=max(options['days'], 1) - 1))
+        if start > end:
+            raise CommandError('--start is after --end')
+
+        for table in TABLES:
+            rows = rebuild(table, start, end)
+            self.stdout.write(f"{table}: {rows} rows for {start} .. {end}")
+
+        dirty = rebuild_dirty_days()
+        if dirty:
+            self.stdout.write(f"re-rolled {dirty} edited days")
+
+        # Only advance the watermark over a contiguous range of rebuilt days
+        if through is None and (options['all'] or not options['start']):
+            set_built_through(end)
+        elif through is not None and start <= through + timedelta(days=1) and end > through:
+            set_built_through(end)
+        self.stdout.write(self.style.SUCCESS(f"Daily metrics rebuilt for {start} .. {end}."))
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:39
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0042_hot_path_indexes'),
+        ('crm', '0013_campaign_google_auto_sync'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='leadinteraction',
+            index=models.Index(fields=['author', 'interaction_type', 'date'], name='leadint_author_type_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leadinteraction',
+            index=models.Index(fields=['interaction_type', 'date'], name='leadint_type_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leadinteraction',
+            index=models.Index(fields=['student', '-date'], name='leadint_student_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['assigned_to', 'status', 'due_date'], name='crmtask_assignee_status_due'),
+        ),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:01
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0043_export_job'),
+        ('crm', '0014_hot_path_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('built_through', models.DateField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyCallMetrics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('sales_section', models.CharField(max_length=20)),
+                ('lead_status', models.CharField(max_length=50)),
+                ('calls', models.PositiveIntegerField(default=0)),
+                ('connected', models.PositiveIntegerField(default=0)),
+                ('missed', models.PositiveIntegerField(default=0)),
+                ('incoming', models.PositiveIntegerField(default=0)),
+                ('outgoing', models.PositiveIntegerField(default=0)),
+                ('duration_sec', models.BigIntegerField(default=0)),
+                ('author', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('campaign', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='crm.campaign')),
+                ('program_type', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.program')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date'], name='daily_call_date_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyLeadMetrics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('sales_section', models.CharField(max_length=20)),
+                ('lead_status', models.CharField(max_length=50)),
+                ('leads', models.PositiveIntegerField(default=0)),
+                ('contacted', models.PositiveIntegerField(default=0, help_text='Leads with at least one interaction')),
+                ('assigned_to', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('campaign', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='crm.campaign')),
+                ('program_type', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.program')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date'], name='daily_lead_date_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyRevenueMetrics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('sales_section', models.CharField(max_length=20)),
+                ('lead_status', models.CharField(max_length=50)),
+                ('transactions', models.PositiveIntegerField(default=0)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('assigned_to', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('campaign', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='crm.campaign')),
+                ('program_type', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.program')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date'], name='daily_revenue_date_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,56 @@
+import re
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import migrations
+from django.utils import timezone
+
+CALL_DURATION_RE = re.compile(r'(?:Duration:\s*)?(\d+):(\d{2})(?::(\d{2}))?', re.IGNORECASE)
+
+
+def parse_notes(notes):
+    match = CALL_DURATION_RE.search(notes or '')
+    if not match:
+        return 0
+    if match.group(3):
+        return int(match.group(1)) * 3600 + int(match.group(2)) * 60 + int(match.group(3))
+    return int(match.group(1)) * 60 + int(match.group(2))
+
+
+def backfill_call_duration(apps, schema_editor):
+    LeadInteraction = apps.get_model('crm', 'LeadInteraction')
+    RollupState = apps.get_model('crm', 'RollupState')
+    alias = schema_editor.connection.alias
+    pending = []
+    first_day = None
+    rows = (
+        LeadInteraction.objects.using(alias)
+        .filter(interaction_type='CALL', call_duration__lte=0, notes__contains=':')
+        .values_list('id', 'notes', 'date')
+    )
+    for pk, notes, date in rows.iterator(chunk_size=2000):
+        seconds = parse_notes(notes)
+        if seconds:
+            pending.append(LeadInteraction(pk=pk, call_duration=seconds))
+            day = timezone.localdate(date) if date else None
+            if day and (first_day is None or day < first_day):
+                first_day = day
+    LeadInteraction.objects.using(alias).bulk_update(pending, ['call_duration'], batch_size=1000)
+
+    # Rolled-up call days now disagree with the rows: move the watermark back so
+    # they are read live until the nightly rebuild_daily_metrics re-rolls them.
+    if first_day is not None:
+        state = RollupState.objects.using(alias).filter(name='daily_metrics', built_through__gte=first_day)
+        state.update(built_through=first_day - timedelta(days=1))
+        cache.delete('crm:rollups:built_through')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0015_daily_metrics'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_call_duration, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,4 @@
+import re
 import uuid
 from django.db import models
 from django.conf import settings
@@ -35,10 +36,33 @@ class LeadInteraction(models.Model):
 
     class Meta:
         ordering = ['-date']
+        indexes = [
+            models.Index(fields=['author', 'interaction_type', 'date'], name='leadint_author_type_date_idx'),
+            models.Index(fields=['interaction_type', 'date'], name='leadint_type_date_idx'),
+            models.Index(fields=['student', '-date'], name='leadint_student_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.interaction_type} with {self.student.first_name} on {self.date.strftime('%Y-%m-%d')}"
 
+CALL_DURATION_RE = re.compile(r'(?:Duration:\s*)?(\d+):(\d{2})(?::(\d{2}))?', re.IGNORECASE)
+
+
+def parse_duration_sec(call_duration, notes):
+    """Seconds for a call: `call_duration` if set, else an "m:ss"/"h:mm:ss" found in the notes, else 0."""
+    if call_duration and call_duration > 0:
+        return call_duration
+    if notes:
+        match = CALL_DURATION_RE.search(str(notes))
+        if match:
+            if match.group(3):
+                h, m, s = int(match.group(1)), int(match.group(2)), int(match.group(3))
+                return h * 3600 + m * 60 + s
+            else:
+                m, s = int(match.group(1)), int(match.group(2))
+                return m * 60 + s
+    return 0
+
 class Campaign(models.Model):
     STATUS_CHOICES = (
         ('ACTIVE', 'Active'),
@@ -125,6 +149,9 @@ class Task(models.Model):
 
     class Meta:
         ordering = ['due_date']
+        indexes = [
+            models.Index(fields=['assigned_to', 'status', 'due_date'], name='crmtask_assignee_status_due'),
+        ]
 
     def __str__(self):
         return f"{self.title} - {self.status}"
@@ -156,3 +183,79 @@ class WebhookLog(models.Model):
 
     def __str__(self):
         return f"{self.endpoint.name} - {self.status} at {self.timestamp}"
+
+
+# Daily rollups (see crm/rollups.py). Dimension columns carry the same names as
+# the Student fields they are copied from, so dashboard scoping filters apply
+# to the fact rows unchanged.
+
+class DailyLeadMetrics(models.Model):
+    """Active leads created on `date`, by their current rep, campaign, section, program and stage."""
+    date = models.DateField()
+    assigned_to = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='+')
+    campaign = models.ForeignKey(Campaign, on_delete=models.SET_NULL, null=True, related_name='+')
+    sales_section = models.CharField(max_length=20)
+    program_type = models.ForeignKey('core.Program', on_delete=models.SET_NULL, null=True, related_name='+')
+    lead_status = models.CharField(max_length=50)
+    leads = models.PositiveIntegerField(default=0)
+    contacted = models.PositiveIntegerField(default=0, help_text="Leads with at least one interaction")
+
+    class Meta:
+        indexes = [models.Index(fields=['date'], name='daily_lead_date_idx')]
+
+
+class DailyCallMetrics(models.Model):
+    """CALL interactions logged on `date`, by author and the called student's campaign, section, program and stage."""
+    date = models.DateField()
+    author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='+')
+    campaign = models.ForeignKey(Campaign, on_delete=models.SET_NULL, null=True, related_name='+')
+    sales_section = models.CharField(max_length=20)
+    program_type = models.ForeignKey('core.Program', on_delete=models.SET_NULL, null=True, related_name='+')
+    lead_status = models.CharField(max_length=50)
+    calls = models.PositiveIntegerField(default=0)
+    connected = models.PositiveIntegerField(default=0)
+    missed = models.PositiveIntegerField(default=0)
+    incoming = models.PositiveIntegerField(default=0)
+    outgoing = models.PositiveIntegerField(default=0)
+    duration_sec = models.BigIntegerField(default=0)
+
+    class Meta:
+        indexes = [models.Index(fields=['date'], name='daily_call_date_idx')]
+
+
+class DailyRevenueMetrics(models.Model):
+    """Transactions dated `date`, by the paying student's rep, campaign, section, program and stage."""
+    date = models.DateField()
+    assigned_to = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='+')
+    campaign = models.ForeignKey(Campaign, on_delete=models.SET_NULL, null=True, related_name='+')
+    sales_section = models.CharField(max_length=20)
+    program_type = models.ForeignKey('core.Program', on_delete=models.SET_NULL, null=True, related_name='+')
+    lead_status = models.CharField(max_length=50)
+    transactions = models.PositiveIntegerField(default=0)
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        indexes = [models.Index(fields=['date'], name='daily_revenue_date_idx')]
+
+
+class RollupState(models.Model):
+    """Days up to and including `built_through` are fully covered by the daily rollup tables."""
+    name = models.CharField(max_length=50, unique=True)
+    built_through = models.DateField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} through {self.built_through}"
+
+
+class DirtyRollupDay(models.Model):
+    """A rolled-up day of `table` whose rows changed since; read live until rebuild_daily_metrics re-rolls it."""
+    table = models.CharField(max_length=20)
+    date = models.DateField()
+    marked_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('table', 'date')
+
+    def __str__(self):
+        return f"{self.table} {self.date}"
@@ -0,0 +1,92 @@
+"""
+Process-local registry of slow-changing reference data: pipeline stages and programs.
+
+Each process loads the registry once and keeps it until the shared version stamp in
+Django's cache changes (see core.version_stamps). crm.signals bump the stamp on
+any PipelineStage/Program save or delete, so every worker reloads on its next
+lookup instead of re-querying the tables on every request.
+"""
+from core.version_stamps import LocalCopy
+
+VERSION_CACHE_KEY = 'crm:reference_data:version'
+
+CONVERTED_KEYWORDS = ('convert', 'enroll')
+# MarketingDashboardView counts a wider set of "positive" outcomes as conversions
+POSITIVE_KEYWORDS = ('convert', 'enroll', 'positive', 'paid', 'join')
+LOST_KEYWORDS = ('drop', 'busy', 'not answer', 'lost')
+
+EXCLUDED_FALLBACK_PROGRAM = 'Wise Import'
+SECTION_PROGRAM_NAMES = {
+    'CAREER_ACADEMY': 'Natya Career Academy',
+    'REGULAR': 'Natya',
+}
+
+
+def _matches(name, keywords):
+    name = (name or '').lower()
+    return any(kw in name for kw in keywords)
+
+
+class ReferenceData:
+    def __init__(self, stages, programs):
+        # Stages arrive in PipelineStage.Meta.ordering, so "first" matches `.filter(...).first()`
+        self.stage_names = {str(s.id): s.name for s in stages}
+        self.stage_ids_by_name = {}
+        for s in stages:
+            self.stage_ids_by_name.setdefault((s.name or '').lower(), str(s.id))
+        default_stage = next((s for s in stages if s.is_default), None)
+        self.default_stage_id = str(default_stage.id) if default_stage else None
+
+        self.converted_stages = [s for s in stages if _matches(s.name, CONVERTED_KEYWORDS)]
+        self.positive_stages = [s for s in stages if _matches(s.name, POSITIVE_KEYWORDS)]
+        self.lost_stages = [s for s in stages if _matches(s.name, LOST_KEYWORDS)]
+        self.converted_stage_ids = [str(s.id) for s in self.converted_stages]
+        # Student.lead_status values counted as converted by the sales dashboard and campaign reports
+        converted_statuses = ['ENROLLED', 'CONVERTED', 'enrolled', 'converted', 'Enrolled', 'Converted']
+        for s in self.converted_stages:
+            converted_statuses.append(str(s.id))
+            if s.name:
+                converted_statuses.append(s.name)
+        self.converted_statuses = tuple(converted_statuses)
+        self.lost_stage_ids = [str(s.id) for s in self.lost_stages]
+
+        # Programs arrive in pk order, matching `.first()`
+        self.programs_by_id = {p.id: p for p in programs}
+        self.programs_by_name = {}
+        for p in programs:
+            self.programs_by_name.setdefault(p.name, p)
+        self.fallback_program = next(
+            (p for p in programs if p.name != EXCLUDED_FALLBACK_PROGRAM), programs[0] if programs else None
+        )
+
+    def stage_id(self, name, default=None):
+        """Id (as str) of the first stage whose name equals `name` case-insensitively."""
+        return self.stage_ids_by_name.get((name or '').lower(), default)
+
+    def program(self, program_id):
+        try:
+            return self.programs_by_id.get(int(program_id))
+        except (TypeError, ValueError):
+            return None
+
+    def program_for_section(self, section):
+        """Program for a campaign/sales section, falling back to the first non "Wise Import" program."""
+        name = SECTION_PROGRAM_NAMES.get(section)
+        return (self.programs_by_name.get(name) if name else None) or self.fallback_program
+
+
+_registry = LocalCopy(VERSION_CACHE_KEY)
+
+
+def _load():
+    from core.models import Program
+    from .models import PipelineStage
+    return ReferenceData(list(PipelineStage.objects.all()), list(Program.objects.order_by('pk')))
+
+
+def get_reference_data():
+    return _registry.get(_load)
+
+
+def invalidate_reference_data():
+    _registry.invalidate()
@@ -0,0 +1,316 @@
+"""
+Daily lead/call/revenue rollups for the dashboards.
+
+DailyLeadMetrics, DailyCallMetrics and DailyRevenueMetrics hold one row per
+local day x rep x campaign x section x program x stage. Each day is rebuilt
+as a unit (delete the day's rows, insert one grouped query), so a rebuild is
+always exact whatever changed.
+
+RollupState records `built_through`, the last day the nightly
+`rebuild_daily_metrics` command has covered; later days (today) are never
+rolled up and dashboards read them live through RollupWindow. Writes to
+students, interactions and transactions on or before that day only record a
+DirtyRollupDay once the transaction commits (one small INSERT, never a rebuild
+on the request thread). RollupWindow reads dirty days live as well, so totals
+stay exact, and the nightly command re-rolls them and clears the marks.
+"""
+import threading
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Exists, F, Min, OuterRef, Q, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import DailyCallMetrics, DailyLeadMetrics, DailyRevenueMetrics, DirtyRollupDay, LeadInteraction, RollupState
+
+STATE_NAME = 'daily_metrics'
+WATERMARK_CACHE_KEY = 'crm:rollups:built_through'
+WATERMARK_CACHE_TTL = 300
+
+CONNECTED = Q(call_status='CONNECTED') | Q(call_duration__gt=0)
+MISSED = Q(call_status='MISSED') | Q(call_duration=0, call_status__isnull=True)
+
+
+def day_start(day):
+    """Aware midnight starting `day`. Filtering the raw column (not `__date`) lets date indexes be used."""
+    import datetime as dt
+    return timezone.make_aware(dt.datetime.combine(day, dt.time.min))
+
+
+def day_end(day):
+    """Exclusive upper bound for `day`: midnight of the following day."""
+    return day_start(day + timedelta(days=1))
+
+
+def lead_date():
+    """When a lead counts as created: Student.created_at, or the user's date_joined for older rows without it."""
+    return Coalesce('created_at', 'user__date_joined')
+
+
+# Aggregates over raw rows and the matching sums over fact rows, so live and
+# rolled-up values() rows can be added together column by column.
+
+def live_lead_metrics():
+    contacted = Exists(LeadInteraction.objects.filter(student=OuterRef('pk')))
+    return {'leads': Count('id'), 'contacted': Count('id', filter=Q(contacted))}
+
+
+def fact_lead_metrics():
+    return {'leads': Sum('leads'), 'contacted': Sum('contacted')}
+
+
+def live_call_metrics():
+    return {
+        'calls': Count('id'),
+        'connected': Count('id', filter=CONNECTED),
+        'missed': Count('id', filter=MISSED),
+        'incoming': Count('id', filter=Q(call_direction='INCOMING')),
+        'outgoing': Count('id', filter=Q(call_direction='OUTGOING')),
+        'duration_sec': Coalesce(Sum('call_duration'), 0),
+    }
+
+
+def fact_call_metrics():
+    return {name: Sum(name) for name in ('calls', 'connected', 'missed', 'incoming', 'outgoing', 'duration_sec')}
+
+
+def live_revenue_metrics():
+    return {'transactions': Count('id'), 'amount': Sum('amount')}
+
+
+def fact_revenue_metrics():
+    return {'transactions': Sum('transactions'), 'amount': Sum('amount')}
+
+
+def merge_rows(rows, key):
+    """
+    {key value: {metric: total}} summing values() rows (e.g. facts + live)
+    that share `key`, a field name or a tuple of them.
+    """
+    keys = (key,) if isinstance(key, str) else tuple(key)
+    merged = {}
+    for row in rows:
+        bucket = merged.setdefault(row[key] if isinstance(key, str) else tuple(row[k] for k in keys), {})
+        for name, value in row.items():
+            if name not in keys:
+                bucket[name] = bucket.get(name, 0) + (value or 0)
+    return merged
+
+
+def _lead_rows(start, end):
+    from core.models import Student
+    return (
+        Student.objects.filter(is_active=True).annotate(metric_at=lead_date())
+        .filter(metric_at__gte=day_start(start), metric_at__lt=day_end(end))
+        .values('assigned_to_id', 'campaign_id', 'sales_section', 'program_type_id', 'lead_status', day=TruncDate('metric_at'))
+        .annotate(**live_lead_metrics()).order_by()
+    )
+
+
+def _student_dimensions(prefix):
+    return {
+        'campaign_id': F(f'{prefix}campaign'),
+        'sales_section': F(f'{prefix}sales_section'),
+        'program_type_id': F(f'{prefix}program_type'),
+        'lead_status': F(f'{prefix}lead_status'),
+    }
+
+
+def _call_rows(start, end):
+    return (
+        LeadInteraction.objects.filter(interaction_type='CALL', date__gte=day_start(start), date__lt=day_end(end))
+        .values('author_id', day=TruncDate('date'), **_student_dimensions('student__'))
+        .annotate(**live_call_metrics()).order_by()
+    )
+
+
+def _revenue_rows(start, end):
+    from core.models import Transaction
+    return (
+        Transaction.objects.filter(date__gte=day_start(start), date__lt=day_end(end))
+        .values(day=TruncDate('date'), assigned_to_id=F('student__assigned_to'), **_student_dimensions('student__'))
+        .annotate(**live_revenue_metrics()).order_by()
+    )
+
+
+TABLES = {
+    'leads': (DailyLeadMetrics, _lead_rows),
+    'calls': (DailyCallMetrics, _call_rows),
+    'revenue': (DailyRevenueMetrics, _revenue_rows),
+}
+# Model label of the fact table or of the raw rows it rolls up -> table name
+TABLE_BY_MODEL = {
+    'crm.DailyLeadMetrics': 'leads', 'core.Student': 'leads',
+    'crm.DailyCallMetrics': 'calls', 'crm.LeadInteraction': 'calls',
+    'crm.DailyRevenueMetrics': 'revenue', 'core.Transaction': 'revenue',
+}
+
+
+def rebuild(table, start, end):
+    """Replace `table`'s rows for the inclusive day range [start, end]. Returns the number of rows written."""
+    model, rows = TABLES[table]
+    facts = [model(date=row.pop('day'), **row) for row in rows(start, end)]
+    with transaction.atomic():
+        model.objects.filter(date__gte=start, date__lte=end).delete()
+        model.objects.bulk_create(facts, batch_size=1000)
+    return len(facts)
+
+
+def earliest_day():
+    """First local day with any lead, call or transaction (None on an empty database)."""
+    from core.models import Student, Transaction
+    firsts = [
+        Student.objects.filter(is_active=True).aggregate(first=Min(lead_date()))['first'],
+        LeadInteraction.objects.filter(interaction_type='CALL').aggregate(first=Min('date'))['first'],
+        Transaction.objects.aggregate(first=Min('date'))['first'],
+    ]
+    firsts = [timezone.localdate(first) for first in firsts if first]
+    return min(firsts) if firsts else None
+
+
+def built_through():
+    """Last day covered by the rollups, or None before the first nightly build."""
+    value = cache.get(WATERMARK_CACHE_KEY)
+    if value is None:
+        through = RollupState.objects.filter(name=STATE_NAME).values_list('built_through', flat=True).first()
+        value = through.isoformat() if through else ''
+        cache.set(WATERMARK_CACHE_KEY, value, WATERMARK_CACHE_TTL)
+    return parse_date(value) if value else None
+
+
+def set_built_through(day):
+    RollupState.objects.update_or_create(name=STATE_NAME, defaults={'built_through': day})
+    cache.set(WATERMARK_CACHE_KEY, day.isoformat() if day else '', WATERMARK_CACHE_TTL)
+
+
+class RollupWindow:
+    """
+    Splits the inclusive day range [start, end] (None = unbounded) into the
+    closed days served from the fact tables and the days after `built_through`
+    that are read live.
+    """
+
+    def __init__(self, start=None, end=None):
+        self.start = start
+        self.end = end
+        through = built_through()
+        if through is not None and end is not None:
+            through = min(through, end)
+        if through is not None and start is not None and start > through:
+            through = None
+        self.through = through
+        self.dirty = {}
+        if through is not None:
+            dirty = DirtyRollupDay.objects.filter(date__lte=through)
+            if start is not None:
+                dirty = dirty.filter(date__gte=start)
+            for table, day in dirty.values_list('table', 'date'):
+                self.dirty.setdefault(table, []).append(day)
+
+    def dirty_days(self, qs):
+        return self.dirty.get(TABLE_BY_MODEL.get(qs.model._meta.label), [])
+
+    @property
+    def live_start(self):
+        return self.through + timedelta(days=1) if self.through else self.start
+
+    def facts(self, qs):
+        if self.through is None:
+            return qs.none()
+        qs = qs.filter(date__lte=self.through).exclude(date__in=self.dirty_days(qs))
+        return qs.filter(date__gte=self.start) if self.start else qs
+
+    def span(self, qs, field):
+        """`qs` restricted to the whole range, for metrics that cannot be added up across days."""
+        if self.start:
+            qs = qs.filter(**{f'{field}__gte': day_start(self.start)})
+        if self.end:
+            qs = qs.filter(**{f'{field}__lt': day_end(self.end)})
+        return qs
+
+    def live(self, qs, field):
+        """`qs` restricted to the live days, `field` being its datetime column (or annotation)."""
+        days = Q(pk__in=[])
+        start = self.live_start
+        if not (start and self.end and start > self.end):
+            days = Q()
+            if start:
+                days &= Q(**{f'{field}__gte': day_start(start)})
+            if self.end:
+                days &= Q(**{f'{field}__lt': day_end(self.end)})
+        # Dirty days only exist with a watermark, so `days` above is never the unbounded Q() here
+        if self.through is not None:
+            for day in self.dirty_days(qs):
+                days |= Q(**{f'{field}__gte': day_start(day), f'{field}__lt': day_end(day)})
+        return qs.filter(days)
+
+
+# Incremental maintenance from signals
+
+_pending = threading.local()
+
+
+def mark_dirty(table, day):
+    """Record `table`'s `day` as dirty once the current transaction commits, if that day is already rolled up."""
+    through = built_through()
+    if day is None or through is None or day > through:
+        return
+    pending = getattr(_pending, 'days', None)
+    if pending is None:
+        pending = _pending.days = set()
+    pending.add((table, day))
+    transaction.on_commit(flush_dirty)
+
+
+def flush_dirty():
+    pending = getattr(_pending, 'days', None)
+    if not pending:
+        return
+    _pending.days = set()
+    DirtyRollupDay.objects.bulk_create(
+        [DirtyRollupDay(table=table, date=day) for table, day in pending], ignore_conflicts=True,
+    )
+
+
+def rebuild_dirty_days():
+    """Re-roll every day marked dirty and clear its mark. Returns the number of days re-rolled."""
+    count = 0
+    for pk, table, day in DirtyRollupDay.objects.order_by('date').values_list('pk', 'table', 'date'):
+        with transaction.atomic():
+            # Clear the mark first: a write committed during the rebuild marks the day again
+            DirtyRollupDay.objects.filter(pk=pk).delete()
+            rebuild(table, day, day)
+        count += 1
+    return count
+
+
+def mark_lead_dirty(student_id):
+    from core.models import Student
+    if built_through() is None:
+        return
+    created = Student.objects.filter(pk=student_id).annotate(metric_at=lead_date()).values_list('metric_at', flat=True).first()
+    if created:
+        mark_dirty('leads', timezone.localdate(created))
+
+
+def mark_students_dirty(student_ids):
+    """Re-roll every closed day touched by these students (after a rep/campaign/section/program/stage change)."""
+    from core.models import Student, Transaction
+    through = built_through()
+    if through is None:
+        return
+    student_ids = list(student_ids)
+    created = (
+        Student.objects.filter(pk__in=student_ids).annotate(metric_at=lead_date())
+        .filter(metric_at__lt=day_end(through)).values_list('metric_at', flat=True)
+    )
+    for day in {timezone.localdate(value) for value in created if value}:
+        mark_dirty('leads', day)
+    calls = LeadInteraction.objects.filter(student_id__in=student_ids, interaction_type='CALL', date__lt=day_end(through))
+    for day in calls.dates('date', 'day'):
+        mark_dirty('calls', day)
+    for day in Transaction.objects.filter(student_id__in=student_ids, date__lt=day_end(through)).dates('date', 'day'):
+        mark_dirty('revenue', day)
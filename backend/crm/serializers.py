@@ -39,35 +39,57 @@ class LeadInteractionSerializer(serializers.ModelSerializer):
         parts.append(f"{s}s")
         return " ".join(parts)
 
-class CampaignSerializer(serializers.ModelSerializer):
+class CampaignStatsMixin:
+    """
+    lead_count/converted_count and the budget ratios. CampaignViewSet annotates
+    the counts on list/retrieve; other callers fall back to counting per campaign.
+    """
+
+    def _counts(self, obj):
+        if not hasattr(obj, 'lead_count') or not hasattr(obj, 'converted_count'):
+            from .reference_data import get_reference_data
+            leads = obj.leads.filter(is_active=True).exclude(lead_status='DUPLICATE')
+            obj.lead_count = leads.count()
+            obj.converted_count = leads.filter(lead_status__in=get_reference_data().converted_statuses).count()
+        return obj.lead_count, obj.converted_count
+
+    def get_lead_count(self, obj):
+        return self._counts(obj)[0]
+
+    def get_converted_count(self, obj):
+        return self._counts(obj)[1]
+
+    def get_cost_per_lead(self, obj):
+        count = self._counts(obj)[0]
+        if count > 0 and obj.budget > 0:
+            return round(obj.budget / count, 2)
+        return 0
+
+    def get_cost_per_conversion(self, obj):
+        count = self._counts(obj)[1]
+        if count > 0 and obj.budget > 0:
+            return round(obj.budget / count, 2)
+        return 0
+
+
+class CampaignSerializer(CampaignStatsMixin, serializers.ModelSerializer):
     lead_count = serializers.SerializerMethodField()
+    converted_count = serializers.SerializerMethodField()
     cost_per_lead = serializers.SerializerMethodField()
+    cost_per_conversion = serializers.SerializerMethodField()
     created_by_name = serializers.SerializerMethodField()
+    # The queryset is re-evaluated on every validation, so new users are always accepted
     auto_assign_to = serializers.PrimaryKeyRelatedField(
         many=True, queryset=get_user_model().objects.all(), required=False
     )
 
     webhook_url = serializers.SerializerMethodField()
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        from django.contrib.auth import get_user_model
-        self.fields['auto_assign_to'].queryset = get_user_model().objects.all()
-
     class Meta:
         model = Campaign
         fields = '__all__'
         read_only_fields = ['created_by']
 
-    def get_lead_count(self, obj):
-        return obj.leads.filter(is_active=True).exclude(lead_status='DUPLICATE').count()
-
-    def get_cost_per_lead(self, obj):
-        count = self.get_lead_count(obj)
-        if count > 0 and obj.budget > 0:
-            return round(obj.budget / count, 2)
-        return 0
-
     def get_created_by_name(self, obj):
         if obj.created_by:
             return f"{obj.created_by.first_name} {obj.created_by.last_name}".strip() or obj.created_by.username
@@ -81,6 +103,21 @@ class CampaignSerializer(serializers.ModelSerializer):
             return request.build_absolute_uri(f'/api/crm/webhooks/campaign/{obj.secret_token}/lead/')
         return f'/api/crm/webhooks/campaign/{obj.secret_token}/lead/'
 
+class CampaignListSerializer(CampaignStatsMixin, serializers.ModelSerializer):
+    """Slim read-only campaign row for the campaigns grid (?view=compact)."""
+    lead_count = serializers.SerializerMethodField()
+    converted_count = serializers.SerializerMethodField()
+    cost_per_lead = serializers.SerializerMethodField()
+    cost_per_conversion = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Campaign
+        fields = (
+            'id', 'name', 'status', 'platform', 'section', 'start_date', 'end_date', 'budget', 'created_at',
+            'lead_count', 'converted_count', 'cost_per_lead', 'cost_per_conversion',
+        )
+        read_only_fields = fields
+
 class TaskSerializer(serializers.ModelSerializer):
     student_name = serializers.SerializerMethodField()
     assigned_to_name = serializers.SerializerMethodField()
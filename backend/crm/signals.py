@@ -0,0 +1,97 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from core.conditional import bump_resource_version
+from core.models import Program, Student, Transaction
+from .models import PipelineStage, LeadInteraction, parse_duration_sec
+from .reference_data import invalidate_reference_data
+from . import rollups
+
+# Student fields the daily rollups are keyed on
+ROLLUP_KEY_FIELDS = ('assigned_to_id', 'campaign_id', 'sales_section', 'program_type_id', 'lead_status', 'is_active')
+
+
+@receiver(post_save, sender=PipelineStage)
+@receiver(post_delete, sender=PipelineStage)
+@receiver(post_save, sender=Program)
+@receiver(post_delete, sender=Program)
+def reference_data_changed(sender, **kwargs):
+    # After commit, so no worker can reload the old rows under the new version stamp
+    transaction.on_commit(invalidate_reference_data)
+
+
+def _rollup_key(instance):
+    return tuple(getattr(instance, name) for name in ROLLUP_KEY_FIELDS)
+
+
+def _touches_rollup_key(update_fields):
+    if update_fields is None:
+        return True
+    # update_fields may name a foreign key by field name or attname
+    return any(Student._meta.get_field(name).attname in ROLLUP_KEY_FIELDS for name in update_fields)
+
+
+@receiver(pre_save, sender=Student)
+def remember_rollup_key(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Only the row being saved is read, and only when the save can change its key
+    instance._previous_rollup_key = None
+    if not raw and not instance._state.adding and _touches_rollup_key(update_fields):
+        instance._previous_rollup_key = sender.objects.filter(pk=instance.pk).values_list(*ROLLUP_KEY_FIELDS).first()
+
+
+@receiver(post_save, sender=Student)
+def student_saved(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous_rollup_key', None)
+    if created:
+        if instance.assigned_to_id:
+            # SalesUserListView also lists users who merely hold leads
+            bump_resource_version('lead_assignment')
+        if instance.created_at:
+            rollups.mark_dirty('leads', timezone.localdate(instance.created_at))
+    elif previous is not None:
+        key = _rollup_key(instance)
+        if key[0] != previous[0]:
+            bump_resource_version('lead_assignment')
+        if key != previous:
+            rollups.mark_students_dirty([instance.pk])
+
+
+@receiver(post_delete, sender=Student)
+def student_deleted(sender, instance, **kwargs):
+    if instance.assigned_to_id:
+        bump_resource_version('lead_assignment')
+    if instance.created_at:
+        rollups.mark_dirty('leads', timezone.localdate(instance.created_at))
+    else:
+        rollups.mark_dirty('leads', timezone.localdate(instance.user.date_joined))
+
+
+@receiver(pre_save, sender=LeadInteraction)
+def parse_call_duration(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Calls logged with the duration only in the notes ("Duration: 2:35") get it parsed into
+    # call_duration on every full save, so notes edited by a PATCH are picked up as well
+    if raw or update_fields is not None or instance.interaction_type != 'CALL':
+        return
+    if not instance._state.adding:
+        previous = sender.objects.filter(pk=instance.pk).values_list('notes', 'call_duration').first()
+        if previous and previous[0] != instance.notes and previous[1] == instance.call_duration:
+            # The notes changed but call_duration was not set explicitly: the notes win
+            instance.call_duration = parse_duration_sec(0, instance.notes) or instance.call_duration
+            return
+    instance.call_duration = parse_duration_sec(instance.call_duration, instance.notes)
+
+
+@receiver(post_save, sender=LeadInteraction)
+@receiver(post_delete, sender=LeadInteraction)
+def interaction_rollups(sender, instance, created=False, **kwargs):
+    rollups.mark_dirty('calls', timezone.localdate(instance.date))
+    if created or kwargs['signal'] is post_delete:
+        # The lead's "contacted" flag may have flipped
+        rollups.mark_lead_dirty(instance.student_id)
+
+
+@receiver(post_save, sender=Transaction)
+@receiver(post_delete, sender=Transaction)
+def transaction_rollups(sender, instance, **kwargs):
+    rollups.mark_dirty('revenue', timezone.localdate(instance.date))
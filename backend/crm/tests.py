@@ -1,3 +1,248 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from itertools import chain
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models import Count, F, Sum
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core.models import Program, Student, Transaction
+from core.version_stamps import bump_version
+from . import reference_data, rollups
+from .models import (
+    DailyCallMetrics, DailyLeadMetrics, DailyRevenueMetrics, DirtyRollupDay, LeadInteraction, PipelineStage,
+)
+
+User = get_user_model()
+
+
+def make_lead(username, **fields):
+    program = Program.objects.get_or_create(name='Natya', slug='natya')[0]
+    user = User.objects.create_user(username, f'{username}@example.com', 'x', role='STUDENT')
+    fields.setdefault('crm_student_id', f'TEST-{username}')
+    return Student.objects.create(user=user, program_type=program, first_name=username.title(), **fields)
+
+
+class CallDurationTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'x', role='SUPER_ADMIN')
+        self.lead = make_lead('lead')
+
+    def log_call(self, **fields):
+        return LeadInteraction.objects.create(student=self.lead, author=self.admin, interaction_type='CALL', **fields)
+
+    def test_duration_is_parsed_from_notes_on_create(self):
+        self.assertEqual(self.log_call(notes='Spoke to parent. Duration: 2:35').call_duration, 155)
+        self.assertEqual(self.log_call(notes='Duration: 1:02:03').call_duration, 3723)
+        self.assertEqual(self.log_call(notes='No answer').call_duration, 0)
+
+    def test_explicit_duration_wins_over_notes(self):
+        self.assertEqual(self.log_call(notes='Duration: 2:35', call_duration=40).call_duration, 40)
+
+    def test_notes_are_not_parsed_for_other_interaction_types(self):
+        note = LeadInteraction.objects.create(student=self.lead, author=self.admin, interaction_type='NOTE', notes='Meet at 4:30')
+        self.assertEqual(note.call_duration, 0)
+
+    def test_edited_notes_update_the_duration(self):
+        call = self.log_call(notes='Callback later')
+        call.notes = 'Duration: 3:10'
+        call.save()
+        call.refresh_from_db()
+        self.assertEqual(call.call_duration, 190)
+
+        call.notes = 'Duration: 4:00 (corrected)'
+        call.save()
+        call.refresh_from_db()
+        self.assertEqual(call.call_duration, 240)
+
+    def test_patch_with_duration_in_notes(self):
+        call = self.log_call(notes='Callback later')
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        response = client.patch(f'/api/crm/interactions/{call.pk}/', {'notes': 'Duration: 5:05'}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        call.refresh_from_db()
+        self.assertEqual(call.call_duration, 305)
+
+
+class DailyRollupTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.today = timezone.localdate()
+        self.rep1 = User.objects.create_user('rep1', 'rep1@example.com', 'x', role='SALES')
+        self.rep2 = User.objects.create_user('rep2', 'rep2@example.com', 'x', role='SALES')
+        self.leads = []
+        for i in range(6):
+            days_ago = i % 3 + 1
+            lead = make_lead(f'lead{i}', assigned_to=self.rep1 if i % 2 else self.rep2)
+            Student.objects.filter(pk=lead.pk).update(created_at=self.at(days_ago))
+            call = LeadInteraction.objects.create(
+                student=lead, author=lead.assigned_to, interaction_type='CALL', notes=f'Duration: {i}:00',
+            )
+            LeadInteraction.objects.filter(pk=call.pk).update(date=self.at(days_ago))
+            payment = Transaction.objects.create(student=lead, transaction_id=f'T{i}', amount=Decimal('100') * (i + 1))
+            Transaction.objects.filter(pk=payment.pk).update(date=self.at(days_ago))
+            self.leads.append(lead)
+        # Today's rows are never rolled up and must be read live
+        make_lead('today', assigned_to=self.rep1)
+
+    def at(self, days_ago):
+        return timezone.now() - timedelta(days=days_ago)
+
+    def windowed(self, window):
+        leads = merge_rows_for(
+            window.facts(DailyLeadMetrics.objects.all()).values('assigned_to_id').annotate(**rollups.fact_lead_metrics()),
+            window.live(Student.objects.filter(is_active=True).annotate(metric_at=rollups.lead_date()), 'metric_at')
+            .values('assigned_to_id').annotate(**rollups.live_lead_metrics()),
+            'assigned_to_id',
+        )
+        calls = merge_rows_for(
+            window.facts(DailyCallMetrics.objects.all()).values('author_id').annotate(**rollups.fact_call_metrics()),
+            window.live(LeadInteraction.objects.filter(interaction_type='CALL'), 'date')
+            .values('author_id').annotate(**rollups.live_call_metrics()),
+            'author_id',
+        )
+        revenue = merge_rows_for(
+            window.facts(DailyRevenueMetrics.objects.all()).values('assigned_to_id').annotate(**rollups.fact_revenue_metrics()),
+            window.live(Transaction.objects.all(), 'date')
+            .values(assigned_to_id=F('student__assigned_to')).annotate(**rollups.live_revenue_metrics()),
+            'assigned_to_id',
+        )
+        return leads, calls, revenue
+
+    def raw(self):
+        leads = {
+            row['assigned_to_id']: row['leads']
+            for row in Student.objects.filter(is_active=True).values('assigned_to_id').annotate(leads=Count('id')).order_by()
+        }
+        calls = {
+            row['author_id']: (row['calls'], row['duration_sec'])
+            for row in LeadInteraction.objects.filter(interaction_type='CALL').values('author_id')
+            .annotate(calls=Count('id'), duration_sec=Sum('call_duration')).order_by()
+        }
+        revenue = {
+            row['rep']: row['amount']
+            for row in Transaction.objects.values(rep=F('student__assigned_to')).annotate(amount=Sum('amount')).order_by()
+        }
+        return leads, calls, revenue
+
+    def assertWindowMatchesRawRows(self):
+        leads, calls, revenue = self.windowed(rollups.RollupWindow())
+        raw_leads, raw_calls, raw_revenue = self.raw()
+        self.assertEqual({rep: row['leads'] for rep, row in leads.items()}, raw_leads)
+        self.assertEqual({rep: (row['calls'], row['duration_sec']) for rep, row in calls.items()}, raw_calls)
+        self.assertEqual({rep: row['amount'] for rep, row in revenue.items()}, raw_revenue)
+
+    def test_rollups_match_live_counts(self):
+        self.assertWindowMatchesRawRows()
+        call_command('rebuild_daily_metrics', '--all', stdout=StringIO())
+        self.assertEqual(rollups.built_through(), self.today - timedelta(days=1))
+        self.assertTrue(DailyCallMetrics.objects.exists())
+        self.assertWindowMatchesRawRows()
+
+    def test_window_splits_at_the_watermark(self):
+        rollups.set_built_through(self.today - timedelta(days=2))
+        window = rollups.RollupWindow(self.today - timedelta(days=5), self.today)
+        self.assertEqual(window.through, self.today - timedelta(days=2))
+        self.assertEqual(window.live_start, self.today - timedelta(days=1))
+
+        later = rollups.RollupWindow(self.today - timedelta(days=1), self.today)
+        self.assertIsNone(later.through)
+        self.assertFalse(later.facts(DailyLeadMetrics.objects.all()).exists())
+
+        earlier = rollups.RollupWindow(self.today - timedelta(days=5), self.today - timedelta(days=4))
+        self.assertEqual(earlier.through, self.today - timedelta(days=4))
+        self.assertFalse(earlier.live(Transaction.objects.all(), 'date').exists())
+
+    def test_edits_to_rolled_up_days_are_read_live_until_rerolled(self):
+        call_command('rebuild_daily_metrics', '--all', stdout=StringIO())
+        lead = Student.objects.get(pk=self.leads[0].pk)
+        lead.assigned_to = self.rep1
+        with self.captureOnCommitCallbacks(execute=True):
+            lead.save()
+        day = timezone.localdate(lead.created_at)
+        self.assertTrue(DirtyRollupDay.objects.filter(table='leads', date=day).exists())
+        self.assertTrue(DirtyRollupDay.objects.filter(table='revenue').exists())
+        self.assertWindowMatchesRawRows()
+
+        marked = DirtyRollupDay.objects.count()
+        self.assertEqual(rollups.rebuild_dirty_days(), marked)
+        self.assertFalse(DirtyRollupDay.objects.exists())
+        self.assertWindowMatchesRawRows()
+        self.assertEqual(
+            DailyLeadMetrics.objects.filter(date=day, assigned_to=self.rep1).aggregate(n=Sum('leads'))['n'],
+            Student.objects.filter(assigned_to=self.rep1, created_at__date=day).count(),
+        )
+
+    def test_bulk_assignment_marks_days_dirty(self):
+        call_command('rebuild_daily_metrics', '--all', stdout=StringIO())
+        ids = [lead.pk for lead in self.leads]
+        with self.captureOnCommitCallbacks(execute=True):
+            Student.objects.filter(pk__in=ids).update(assigned_to=self.rep2)
+            rollups.mark_students_dirty(ids)
+        self.assertWindowMatchesRawRows()
+
+    def test_saves_that_keep_the_key_mark_nothing(self):
+        call_command('rebuild_daily_metrics', '--all', stdout=StringIO())
+        lead = Student.objects.get(pk=self.leads[0].pk)
+        lead.first_name = 'Renamed'
+        with self.captureOnCommitCallbacks(execute=True):
+            lead.save()
+            lead.save(update_fields=['first_name'])
+        self.assertFalse(DirtyRollupDay.objects.exists())
+
+
+class ReferenceDataTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        reference_data.invalidate_reference_data()
+        self.new = PipelineStage.objects.create(name='New Lead', order=1, is_default=True)
+        self.enrolled = PipelineStage.objects.create(name='Enrolled', order=2)
+        self.natya = Program.objects.create(name='Natya', slug='natya')
+
+    def test_registry_is_loaded_once(self):
+        reference_data.get_reference_data()
+        with self.assertNumQueries(0):
+            reference = reference_data.get_reference_data()
+            self.assertEqual(reference.default_stage_id, str(self.new.pk))
+            self.assertEqual(reference.stage_id('enrolled'), str(self.enrolled.pk))
+            self.assertIn(str(self.enrolled.pk), reference.converted_statuses)
+            self.assertEqual(reference.program_for_section('REGULAR'), self.natya)
+
+    def test_stage_and_program_writes_invalidate_after_commit(self):
+        self.assertIsNone(reference_data.get_reference_data().stage_id('dropped'))
+        with self.captureOnCommitCallbacks(execute=True):
+            dropped = PipelineStage.objects.create(name='Dropped', order=3)
+        self.assertEqual(reference_data.get_reference_data().lost_stage_ids, [str(dropped.pk)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            academy = Program.objects.create(name='Natya Career Academy', slug='career')
+        self.assertEqual(reference_data.get_reference_data().program_for_section('CAREER_ACADEMY'), academy)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.enrolled.delete()
+        self.assertEqual(reference_data.get_reference_data().converted_stage_ids, [])
+
+    def test_bump_from_another_worker_reloads(self):
+        reference_data.get_reference_data()
+        PipelineStage.objects.filter(pk=self.enrolled.pk).update(name='Converted')
+        self.assertEqual(reference_data.get_reference_data().stage_id('enrolled'), str(self.enrolled.pk))
+        # What another worker's invalidate_reference_data leaves in the shared cache
+        bump_version(reference_data.VERSION_CACHE_KEY)
+        self.assertIsNone(reference_data.get_reference_data().stage_id('enrolled'))
+        self.assertEqual(reference_data.get_reference_data().stage_id('converted'), str(self.enrolled.pk))
+
+    @override_settings(LOCAL_CACHE_MAX_AGE=0)
+    def test_local_copy_expires_under_a_per_process_cache(self):
+        reference_data.get_reference_data()
+        PipelineStage.objects.filter(pk=self.enrolled.pk).update(name='Converted')
+        self.assertEqual(reference_data.get_reference_data().stage_id('converted'), str(self.enrolled.pk))
+
+
+def merge_rows_for(facts, live, key):
+    return rollups.merge_rows(chain(facts.order_by(), live.order_by()), key)
@@ -5,10 +5,15 @@ from rest_framework.response import Response
 from django.contrib.auth import get_user_model
 from django.db import transaction
 from django.db.models import Sum
+import re
 import traceback
-from core.models import Student, Program, Transaction
-from .models import PipelineStage, LeadInteraction, Campaign, WebhookEndpoint, WebhookLog, Task
-from .serializers import PipelineStageSerializer, LeadInteractionSerializer, CampaignSerializer, TaskSerializer
+from core.models import Student, Transaction
+from .models import PipelineStage, LeadInteraction, Campaign, WebhookEndpoint, WebhookLog, Task, parse_duration_sec
+from .serializers import PipelineStageSerializer, LeadInteractionSerializer, CampaignSerializer, CampaignListSerializer, TaskSerializer
+from .reference_data import get_reference_data
+from .rollups import day_start, day_end, mark_students_dirty
+from core.conditional import ConditionalGetMixin, bump_resource_version
+from core.response_cache import cache_response
 
 User = get_user_model()
 from django.shortcuts import get_object_or_404
@@ -30,25 +35,33 @@ def format_duration_seconds(seconds):
 class DashboardStatsView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
+    @cache_response()
     def get(self, request):
         try:
             from django.db.models import Count, Sum, Q
             from django.utils.dateparse import parse_date
+            from itertools import chain
             import datetime
             from datetime import timedelta
             from django.utils import timezone
-            
-            students = Student.objects.filter(is_active=True).exclude(lead_status='DUPLICATE')
+            from .models import DailyLeadMetrics, DailyCallMetrics, DailyRevenueMetrics
+            from .rollups import (
+                RollupWindow, merge_rows, lead_date,
+                live_lead_metrics, fact_lead_metrics, live_call_metrics, fact_call_metrics,
+            )
+
+            # Lead scoping; DailyLeadMetrics names its columns like Student, so it applies to both
+            lead_scope = Q()
             
             # Super Admin / Admin section filter (optional, if they want to drill down)
             section_filter = request.query_params.get('sales_section')
             if section_filter and request.user.role in ['SUPER_ADMIN', 'ADMIN']:
-                students = students.filter(Q(sales_section=section_filter) | Q(assigned_to__sales_section=section_filter))
+                lead_scope &= Q(sales_section=section_filter) | Q(assigned_to__sales_section=section_filter)
 
             if request.user.role in ['SALES', 'SALES_HEAD', 'SALES_MANAGER', 'MANAGER', 'SALES_LEAD']:
                 user_section = getattr(request.user, 'sales_section', 'BOTH')
                 if user_section and user_section != 'BOTH':
-                    students = students.filter(
+                    lead_scope &= (
                         Q(assigned_to__sales_section=user_section) |
                         Q(sales_section=user_section)
                     )
@@ -66,20 +79,20 @@ class DashboardStatsView(APIView):
                         is_sales_manager = True
                 
                 if not is_sales_manager:
-                    students = students.filter(assigned_to=request.user)
+                    lead_scope &= Q(assigned_to=request.user)
             
             assigned_to_param = request.query_params.get('assigned_to')
             if assigned_to_param:
                 if assigned_to_param == 'unassigned':
-                    students = students.filter(assigned_to__isnull=True)
+                    lead_scope &= Q(assigned_to__isnull=True)
                 elif assigned_to_param != 'assigned':
-                    students = students.filter(assigned_to_id=assigned_to_param)
+                    lead_scope &= Q(assigned_to_id=assigned_to_param)
                 else:
-                    students = students.filter(assigned_to__isnull=False)
+                    lead_scope &= Q(assigned_to__isnull=False)
 
             campaign_id = request.query_params.get('campaign_id')
             if campaign_id:
-                students = students.filter(campaign_id=campaign_id)
+                lead_scope &= Q(campaign_id=campaign_id)
 
             # Date Presets (today, yesterday, this_week, this_month, custom)
             date_preset = request.query_params.get('date_preset')
@@ -100,47 +113,42 @@ class DashboardStatsView(APIView):
             elif date_preset == 'this_month':
                 start_date = str(today.replace(day=1))
                 end_date = str(today)
-            
-            # Snapshot students BEFORE date filter for total assigned counts in leaderboard
-            all_time_students = students
-            
-            if start_date:
-                parsed_start = parse_date(start_date)
-                if parsed_start:
-                    students = students.filter(Q(created_at__date__gte=parsed_start) | Q(user__date_joined__date__gte=parsed_start))
-            
-            if end_date:
-                parsed_end = parse_date(end_date)
-                if parsed_end:
-                    students = students.filter(Q(created_at__date__lte=parsed_end) | Q(user__date_joined__date__lte=parsed_end))
-            
-            # Identify converted/enrolled leads to exclude them from active totals
-            converted_stages = ['ENROLLED', 'CONVERTED', 'enrolled', 'converted', 'Enrolled', 'Converted']
-            try:
-                from .models import PipelineStage
-                for stage in PipelineStage.objects.filter(name__icontains='convert') | PipelineStage.objects.filter(name__icontains='enroll'):
-                    converted_stages.append(str(stage.id))
-                    if stage.name:
-                        converted_stages.append(stage.name)
-            except Exception:
-                pass
-
-            # Total leads matching filters (inclusive of all statuses)
-            total_leads = students.count()
 
-            # Converted Leads count
-            converted_leads = students.filter(lead_status__in=converted_stages).count()
+            # Closed days come from the daily rollups, the rest (today) is counted live
+            window = RollupWindow(parse_date(start_date) if start_date else None, parse_date(end_date) if end_date else None)
 
-            # Assignment metrics
-            unassigned_leads = students.filter(assigned_to__isnull=True).count()
-            assigned_leads = students.filter(assigned_to__isnull=False).count()
+            students = Student.objects.filter(is_active=True).exclude(lead_status='DUPLICATE').filter(lead_scope)
+            lead_facts = window.facts(DailyLeadMetrics.objects.exclude(lead_status='DUPLICATE').filter(lead_scope))
+            live_leads = window.live(students.annotate(metric_at=lead_date()), 'metric_at')
+            lead_rows = merge_rows(chain(
+                lead_facts.values('lead_status', 'assigned_to_id').annotate(**fact_lead_metrics()).order_by(),
+                live_leads.values('lead_status', 'assigned_to_id').annotate(**live_lead_metrics()).order_by(),
+            ), ('lead_status', 'assigned_to_id'))
             
-            # Contacted vs Pending
-            contacted_leads = students.filter(crm_interactions__isnull=False).distinct().count()
+            # Identify converted/enrolled leads to exclude them from active totals
+            reference = get_reference_data()
+            converted_stages = reference.converted_statuses
+
+            # Lead totals, assignment, contacted and per-stage counts from the merged rows
+            total_leads = converted_leads = assigned_leads = contacted_leads = 0
+            status_counts = {}
+            rep_assigned = {}
+            for (status_val, rep_id), metrics in lead_rows.items():
+                total_leads += metrics['leads']
+                contacted_leads += metrics['contacted']
+                if status_val in converted_stages:
+                    converted_leads += metrics['leads']
+                if rep_id:
+                    assigned_leads += metrics['leads']
+                    rep_assigned[rep_id] = rep_assigned.get(rep_id, 0) + metrics['leads']
+                status_counts[status_val] = status_counts.get(status_val, 0) + metrics['leads']
+            unassigned_leads = total_leads - assigned_leads
             pending_leads = max(0, total_leads - contacted_leads)
             
-            # Leaderboard & Call Duration per Sales Rep
-            sales_reps = User.objects.filter(Q(role__in=['SALES', 'SALES_HEAD', 'SALES_MANAGER', 'SALES_LEAD', 'MANAGER']) | Q(assigned_leads__isnull=False), is_active=True).distinct()
+            # Leaderboard & Call Duration per Sales Rep (EXISTS rather than a DISTINCT join over every lead)
+            from django.db.models import Exists, OuterRef
+            has_leads = Exists(Student.objects.filter(assigned_to=OuterRef('pk')))
+            sales_reps = User.objects.filter(Q(role__in=['SALES', 'SALES_HEAD', 'SALES_MANAGER', 'SALES_LEAD', 'MANAGER']) | Q(has_leads), is_active=True)
             if request.user.role in ['SALES', 'SALES_HEAD', 'SALES_MANAGER', 'MANAGER', 'SALES_LEAD']:
                 user_section = getattr(request.user, 'sales_section', 'BOTH')
                 if user_section and user_section != 'BOTH':
@@ -152,22 +160,25 @@ class DashboardStatsView(APIView):
 
             # Call Duration Metrics for department calls (strictly matching the sales reps in the leaderboard)
             interactions_qs = LeadInteraction.objects.filter(author__in=sales_reps, interaction_type='CALL')
-            if start_date:
-                parsed_start = parse_date(start_date)
-                if parsed_start:
-                    interactions_qs = interactions_qs.filter(date__date__gte=parsed_start)
-            if end_date:
-                parsed_end = parse_date(end_date)
-                if parsed_end:
-                    interactions_qs = interactions_qs.filter(date__date__lte=parsed_end)
+            call_rows = merge_rows(chain(
+                window.facts(DailyCallMetrics.objects.filter(author__in=sales_reps)).values('author_id').annotate(**fact_call_metrics()).order_by(),
+                window.live(interactions_qs, 'date').values('author_id').annotate(**live_call_metrics()).order_by(),
+            ), 'author_id')
+            # Distinct leads called cannot be added up across days, so it is always counted live
+            rep_contacted = dict(
+                window.span(interactions_qs, 'date').values('author_id')
+                .annotate(contacted=Count('student', distinct=True)).order_by().values_list('author_id', 'contacted')
+            )
 
-            total_call_duration_sec = interactions_qs.aggregate(total_sec=Sum('call_duration'))['total_sec'] or 0
-            formatted_total_call_duration = format_duration_seconds(total_call_duration_sec)
+            def call_total(name):
+                return sum(metrics[name] for metrics in call_rows.values())
 
-            connected_calls = interactions_qs.filter(Q(call_status='CONNECTED') | Q(call_duration__gt=0)).count()
-            missed_calls = interactions_qs.filter(Q(call_status='MISSED') | Q(call_duration=0, call_status__isnull=True)).count()
-            incoming_calls = interactions_qs.filter(call_direction='INCOMING').count()
-            outgoing_calls = interactions_qs.filter(call_direction='OUTGOING').count()
+            total_call_duration_sec = call_total('duration_sec')
+            formatted_total_call_duration = format_duration_seconds(total_call_duration_sec)
+            connected_calls = call_total('connected')
+            missed_calls = call_total('missed')
+            incoming_calls = call_total('incoming')
+            outgoing_calls = call_total('outgoing')
 
             # Pipeline Stages Breakdown
             pipeline_stages_data = []
@@ -178,12 +189,10 @@ class DashboardStatsView(APIView):
                 'ENROLLED': 'Enrolled',
                 'DROPPED': 'Dropped'
             }
-            status_counts = students.values('lead_status').annotate(count=Count('id'))
-            dynamic_stages = {str(stage.id): stage.name for stage in PipelineStage.objects.all()}
+            dynamic_stages = reference.stage_names
             
-            for item in status_counts:
-                status_val = str(item['lead_status'])
-                count = item['count']
+            for status_val, count in sorted(status_counts.items()):
+                status_val = str(status_val)
                 if status_val in standard_mapping:
                     name = standard_mapping[status_val]
                 elif status_val in dynamic_stages:
@@ -198,64 +207,44 @@ class DashboardStatsView(APIView):
                 })
                 
             leaderboard = []
-            for rep in sales_reps:
-                # Count leads assigned to this rep within the selected date range
-                rep_leads = students.filter(assigned_to=rep).count()
-                
-                # Filter interactions strictly by author (sales rep) and call date
-                rep_interactions = LeadInteraction.objects.filter(author=rep, interaction_type='CALL')
-                if start_date:
-                    parsed_start = parse_date(start_date)
-                    if parsed_start:
-                        rep_interactions = rep_interactions.filter(date__date__gte=parsed_start)
-                if end_date:
-                    parsed_end = parse_date(end_date)
-                    if parsed_end:
-                        rep_interactions = rep_interactions.filter(date__date__lte=parsed_end)
-                
-                rep_contacted = rep_interactions.values('student').distinct().count()
-                rep_duration_sec = rep_interactions.aggregate(total_sec=Sum('call_duration'))['total_sec'] or 0
-                rep_call_count = rep_interactions.count()
-                rep_connected = rep_interactions.filter(Q(call_status='CONNECTED') | Q(call_duration__gt=0)).count()
-                rep_missed = rep_interactions.filter(Q(call_status='MISSED') | Q(call_duration=0, call_status__isnull=True)).count()
-                
+            no_calls = {'calls': 0, 'connected': 0, 'missed': 0, 'duration_sec': 0}
+            for rep in sales_reps.only('id', 'username', 'first_name', 'last_name'):
+                rep_calls = call_rows.get(rep.id, no_calls)
                 leaderboard.append({
                     "id": rep.id,
                     "name": rep.get_full_name() or rep.username,
-                    "assigned": rep_leads,
-                    "contacted": rep_contacted,
-                    "total_calls": rep_call_count,
-                    "connected_calls": rep_connected,
-                    "missed_calls": rep_missed,
-                    "total_call_duration": rep_duration_sec,
-                    "formatted_call_duration": format_duration_seconds(rep_duration_sec)
+                    "assigned": rep_assigned.get(rep.id, 0),
+                    "contacted": rep_contacted.get(rep.id, 0),
+                    "total_calls": rep_calls['calls'],
+                    "connected_calls": rep_calls['connected'],
+                    "missed_calls": rep_calls['missed'],
+                    "total_call_duration": rep_calls['duration_sec'],
+                    "formatted_call_duration": format_duration_seconds(rep_calls['duration_sec'])
                 })
             leaderboard.sort(key=lambda x: x['total_call_duration'], reverse=True)
             
-            revenue_qs = Transaction.objects.all()
-            if request.user.role in ['SALES', 'SALES_HEAD', 'SALES_MANAGER', 'MANAGER', 'SALES_LEAD']:
-                user_section = getattr(request.user, 'sales_section', 'BOTH')
-                if user_section and user_section != 'BOTH':
-                    revenue_qs = revenue_qs.filter(
-                        Q(student__assigned_to__sales_section=user_section) |
-                        Q(student__sales_section=user_section)
-                    )
-                if not is_sales_manager:
-                    revenue_qs = revenue_qs.filter(student__assigned_to=request.user)
-            elif section_filter and request.user.role in ['SUPER_ADMIN', 'ADMIN']:
-                revenue_qs = revenue_qs.filter(Q(student__sales_section=section_filter) | Q(student__assigned_to__sales_section=section_filter))
-
-            if start_date:
-                parsed_start = parse_date(start_date)
-                if parsed_start:
-                    revenue_qs = revenue_qs.filter(date__date__gte=parsed_start)
-            if end_date:
-                parsed_end = parse_date(end_date)
-                if parsed_end:
-                    revenue_qs = revenue_qs.filter(date__date__lte=parsed_end)
-                    
-            revenue_agg = revenue_qs.aggregate(total_revenue=Sum('amount'))
-            revenue = float(revenue_agg.get('total_revenue') or 0)
+            # Revenue scoping by the paying student; fact rows carry the student's columns directly
+            def revenue_scope(prefix):
+                scope = Q()
+                if request.user.role in ['SALES', 'SALES_HEAD', 'SALES_MANAGER', 'MANAGER', 'SALES_LEAD']:
+                    user_section = getattr(request.user, 'sales_section', 'BOTH')
+                    if user_section and user_section != 'BOTH':
+                        scope &= (
+                            Q(**{f'{prefix}assigned_to__sales_section': user_section}) |
+                            Q(**{f'{prefix}sales_section': user_section})
+                        )
+                    if not is_sales_manager:
+                        scope &= Q(**{f'{prefix}assigned_to': request.user})
+                elif section_filter and request.user.role in ['SUPER_ADMIN', 'ADMIN']:
+                    scope &= Q(**{f'{prefix}sales_section': section_filter}) | Q(**{f'{prefix}assigned_to__sales_section': section_filter})
+                return scope
+
+            revenue_facts = window.facts(DailyRevenueMetrics.objects.filter(revenue_scope('')))
+            revenue_live = window.live(Transaction.objects.filter(revenue_scope('student__')), 'date')
+            revenue = float(
+                (revenue_facts.aggregate(total_revenue=Sum('amount'))['total_revenue'] or 0) +
+                (revenue_live.aggregate(total_revenue=Sum('amount'))['total_revenue'] or 0)
+            )
             
             return Response({
                 "total_leads": total_leads,
@@ -332,8 +321,9 @@ class WebhookEndpointViewSet(viewsets.ModelViewSet):
     serializer_class = WebhookEndpointSerializer
     permission_classes = [permissions.IsAuthenticated]
 
-class SalesUserListView(APIView):
+class SalesUserListView(ConditionalGetMixin, APIView):
     permission_classes = [permissions.IsAuthenticated]
+    conditional_families = ('users', 'lead_assignment')
     
     def get(self, request):
         from django.db.models import Q
@@ -351,10 +341,11 @@ class SalesUserListView(APIView):
         data = [{'id': u.id, 'name': u.get_full_name() or u.username, 'sales_section': getattr(u, 'sales_section', 'BOTH')} for u in users]
         return Response(data)
 
-class PipelineStageViewSet(viewsets.ModelViewSet):
+class PipelineStageViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = PipelineStage.objects.all()
     serializer_class = PipelineStageSerializer
     permission_classes = [permissions.IsAuthenticated]
+    conditional_families = ('pipeline_stages',)
 
 class LeadInteractionViewSet(viewsets.ModelViewSet):
     serializer_class = LeadInteractionSerializer
@@ -389,13 +380,18 @@ class LeadInteractionViewSet(viewsets.ModelViewSet):
             
         search = self.request.query_params.get('search', None)
         if search:
-            from django.db.models import Q
-            queryset = queryset.filter(
-                Q(student__first_name__icontains=search) |
-                Q(student__last_name__icontains=search) |
-                Q(student__mobile__icontains=search) |
-                Q(student__email__icontains=search)
-            )
+            from core.search import student_search_subquery
+            matching_ids = student_search_subquery(search)
+            if matching_ids is not None:
+                queryset = queryset.filter(student_id__in=matching_ids)
+            else:
+                from django.db.models import Q
+                queryset = queryset.filter(
+                    Q(student__first_name__icontains=search) |
+                    Q(student__last_name__icontains=search) |
+                    Q(student__mobile__icontains=search) |
+                    Q(student__email__icontains=search)
+                )
             
         start_date = self.request.query_params.get('start_date', None)
         end_date = self.request.query_params.get('end_date', None)
@@ -403,12 +399,12 @@ class LeadInteractionViewSet(viewsets.ModelViewSet):
             from django.utils.dateparse import parse_date
             parsed_start = parse_date(start_date)
             if parsed_start:
-                queryset = queryset.filter(date__date__gte=parsed_start)
+                queryset = queryset.filter(date__gte=day_start(parsed_start))
         if end_date:
             from django.utils.dateparse import parse_date
             parsed_end = parse_date(end_date)
             if parsed_end:
-                queryset = queryset.filter(date__date__lte=parsed_end)
+                queryset = queryset.filter(date__lt=day_end(parsed_end))
                 
         return queryset
 
@@ -419,25 +415,26 @@ class LeadInteractionViewSet(viewsets.ModelViewSet):
         print("audio_recording from data:", self.request.data.get('audio_recording'))
         print("audio_recording type:", type(self.request.data.get('audio_recording')))
         print("==========================================")
-        interaction = serializer.save(author=self.request.user)
-        
-        # Manually update new fields if provided
+        # Manually set new fields if provided, so the row is written once
+        extra = {}
         call_duration = self.request.data.get('call_duration')
         if call_duration is not None:
             try:
-                interaction.call_duration = int(call_duration)
+                extra['call_duration'] = int(call_duration)
             except ValueError:
                 pass
         
         call_direction = self.request.data.get('call_direction')
         if call_direction in ['INCOMING', 'OUTGOING']:
-            interaction.call_direction = call_direction
+            extra['call_direction'] = call_direction
             
         call_status = self.request.data.get('call_status')
         if call_status in ['CONNECTED', 'MISSED', 'REJECTED', 'UNANSWERED']:
-            interaction.call_status = call_status
-            
-        interaction.save()
+            extra['call_status'] = call_status
+
+        # A duration written only in the notes is parsed into call_duration by crm.signals
+
+        interaction = serializer.save(author=self.request.user, **extra)
 
         pipeline_status = self.request.data.get('pipeline_status')
         if pipeline_status:
@@ -462,12 +459,31 @@ class CampaignViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
+        from django.db.models import Q
         queryset = super().get_queryset()
         if self.request.user.role == 'SALES' and getattr(self.request.user, 'sales_section', 'BOTH') != 'BOTH':
-            from django.db.models import Q
             queryset = queryset.filter(Q(section=self.request.user.sales_section) | Q(section='BOTH'))
+        if self.action in ['list', 'retrieve']:
+            # Lead/converted counts in the same query; cost ratios are derived from them in the serializer
+            from django.db.models import Count
+            leads = Q(leads__is_active=True) & ~Q(leads__lead_status='DUPLICATE')
+            queryset = queryset.annotate(
+                lead_count=Count('leads', filter=leads),
+                converted_count=Count('leads', filter=leads & Q(leads__lead_status__in=get_reference_data().converted_statuses)),
+            ).order_by(*Campaign._meta.ordering)
+            if self.get_serializer_class() is CampaignSerializer:
+                from django.db.models import Prefetch
+                queryset = queryset.select_related('created_by').prefetch_related(
+                    Prefetch('auto_assign_to', queryset=User.objects.only('id'))
+                )
         return queryset
 
+    def get_serializer_class(self):
+        # ?view=compact serves a slim row for the campaigns grid (no tokens, integrations or assignees)
+        if self.action == 'list' and self.request.query_params.get('view') == 'compact':
+            return CampaignListSerializer
+        return CampaignSerializer
+
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
 
@@ -483,17 +499,11 @@ class CampaignViewSet(viewsets.ModelViewSet):
         if not file:
             return Response({'error': 'No file provided'}, status=status.HTTP_400_BAD_REQUEST)
         
-        from core.models import Program
+        reference = get_reference_data()
         if program_id:
-            default_program = Program.objects.filter(id=program_id).first()
+            default_program = reference.program(program_id)
         else:
-            default_program = None
-            if campaign and campaign.section == 'CAREER_ACADEMY':
-                default_program = Program.objects.filter(name='Natya Career Academy').first()
-            elif campaign and campaign.section == 'REGULAR':
-                default_program = Program.objects.filter(name='Natya').first()
-            if not default_program:
-                default_program = Program.objects.exclude(name="Wise Import").first() or Program.objects.first()
+            default_program = reference.program_for_section(campaign.section if campaign else None)
             
         try:
             decoded_file = file.read().decode('utf-8-sig')
@@ -619,9 +629,12 @@ class CampaignViewSet(viewsets.ModelViewSet):
                     skipped_leads += 1
                     
             # Actually, let's make sure lead_status uses the pipeline stage ID for NEW
-            stage = PipelineStage.objects.filter(name__iexact='New').first()
-            stage_id = str(stage.id) if stage else '2'
-            Student.objects.filter(campaign=campaign, lead_status='2').update(lead_status=stage_id)
+            stage_id = reference.stage_id('New', '2')
+            restaged = list(Student.objects.filter(campaign=campaign, lead_status='2').values_list('id', flat=True))
+            Student.objects.filter(id__in=restaged).update(lead_status=stage_id)
+            # .update() fires no signals: re-roll the closed days these leads count towards
+            mark_students_dirty(restaged)
+            bump_resource_version('dashboards')
 
             return Response({
                 'message': f'CSV upload processed. Total rows: {total_rows}. Successful additions: {leads_created}. Duplicates flagged: {duplicates_created}. Skipped: {skipped_leads}.'
@@ -635,17 +648,11 @@ class CampaignViewSet(viewsets.ModelViewSet):
         rows = request.data.get('rows', [])
         program_id = request.data.get('program_id')
 
-        from core.models import Program
+        reference = get_reference_data()
         if program_id:
-            default_program = Program.objects.filter(id=program_id).first()
+            default_program = reference.program(program_id)
         else:
-            default_program = None
-            if campaign and campaign.section == 'CAREER_ACADEMY':
-                default_program = Program.objects.filter(name='Natya Career Academy').first()
-            elif campaign and campaign.section == 'REGULAR':
-                default_program = Program.objects.filter(name='Natya').first()
-            if not default_program:
-                default_program = Program.objects.exclude(name="Wise Import").first() or Program.objects.first()
+            default_program = reference.program_for_section(campaign.section if campaign else None)
 
         results = []
         for i, row in enumerate(rows):
@@ -692,7 +699,6 @@ class CampaignViewSet(viewsets.ModelViewSet):
                     base_username = mobile if mobile else email if email else first_name
                     username = f"{base_username}_{str(uuid.uuid4())[:8]}" if base_username else f"lead_{str(uuid.uuid4())[:8]}"
                     # Sanitize username to prevent invalid character crashes (only letters, numbers, _, @, +, ., -)
-                    import re
                     username = re.sub(r'[^\w@+\.-]', '_', username)
 
                     check_mobile = mobile if mobile and mobile.upper() not in ['NA', 'N/A', 'NIL', 'NONE'] else None
@@ -728,8 +734,7 @@ class CampaignViewSet(viewsets.ModelViewSet):
                             leads_count = Student.objects.filter(campaign=campaign, is_active=True).exclude(lead_status='DUPLICATE').count()
                             assigned_to_user = reps[leads_count % len(reps)]
 
-                    stage = PipelineStage.objects.filter(name__iexact='New').first()
-                    stage_id = str(stage.id) if stage else '2'
+                    stage_id = reference.stage_id('New', '2')
 
                     student = Student.objects.create(
                         user=user,
@@ -777,6 +782,7 @@ class CampaignViewSet(viewsets.ModelViewSet):
         return Response({'results': results})
 
     @action(detail=True, methods=['get'])
+    @cache_response()
     def report(self, request, pk=None):
         campaign = self.get_object()
         from .models import Student
@@ -784,25 +790,14 @@ class CampaignViewSet(viewsets.ModelViewSet):
         
         total_leads = students.count()
         
-        converted_stages = ['ENROLLED', 'CONVERTED', 'enrolled', 'converted', 'Enrolled', 'Converted']
-        try:
-            from .models import PipelineStage
-            for stage in PipelineStage.objects.filter(name__icontains='convert') | PipelineStage.objects.filter(name__icontains='enroll'):
-                converted_stages.append(str(stage.id))
-                if stage.name:
-                    converted_stages.append(stage.name)
-        except Exception:
-            pass
+        reference = get_reference_data()
+        converted_stages = reference.converted_statuses
             
         lost_stages = ['DROPPED', 'dropped', 'Dropped', 'BUSY', 'busy', 'Busy', 'NOT_ANSWERING', 'not_answering', 'Not Answering', 'NOT ANSWERING', 'Not Answered', 'DUPLICATE', 'duplicate']
-        try:
-            from .models import PipelineStage
-            for stage in PipelineStage.objects.filter(name__icontains='drop') | PipelineStage.objects.filter(name__icontains='busy') | PipelineStage.objects.filter(name__icontains='not answer') | PipelineStage.objects.filter(name__icontains='lost'):
-                lost_stages.append(str(stage.id))
-                if stage.name:
-                    lost_stages.append(stage.name)
-        except Exception:
-            pass
+        for stage in reference.lost_stages:
+            lost_stages.append(str(stage.id))
+            if stage.name:
+                lost_stages.append(stage.name)
             
         converted_leads = students.filter(lead_status__in=converted_stages).count()
         lost_leads = students.filter(lead_status__in=lost_stages).count()
@@ -812,7 +807,7 @@ class CampaignViewSet(viewsets.ModelViewSet):
         try:
             from django.db.models import Count
             status_counts = students.values('lead_status').annotate(count=Count('id'))
-            stages_map = {str(stage.id): stage.name for stage in PipelineStage.objects.all()}
+            stages_map = reference.stage_names
             for item in status_counts:
                 status_id = str(item['lead_status'])
                 name = stages_map.get(status_id, status_id)
@@ -838,22 +833,6 @@ class CampaignViewSet(viewsets.ModelViewSet):
         })
 
 
-import re
-
-def parse_duration_sec(call_duration, notes):
-    if call_duration and call_duration > 0:
-        return call_duration
-    if notes:
-        match = re.search(r'(?:Duration:\s*)?(\d+):(\d{2})(?::(\d{2}))?', str(notes), re.IGNORECASE)
-        if match:
-            if match.group(3):
-                h, m, s = int(match.group(1)), int(match.group(2)), int(match.group(3))
-                return h * 3600 + m * 60 + s
-            else:
-                m, s = int(match.group(1)), int(match.group(2))
-                return m * 60 + s
-    return 0
-
 class BDEReportView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
@@ -890,21 +869,21 @@ class BDEReportView(APIView):
         if start_date:
             parsed_start = parse_date(start_date)
             if parsed_start:
-                leads = leads.filter(created_at__date__gte=parsed_start)
+                leads = leads.filter(created_at__gte=day_start(parsed_start))
         if end_date:
             parsed_end = parse_date(end_date)
             if parsed_end:
-                leads = leads.filter(created_at__date__lte=parsed_end)
+                leads = leads.filter(created_at__lt=day_end(parsed_end))
 
         interactions = LeadInteraction.objects.filter(author=bde).select_related('student')
         if start_date:
             parsed_start = parse_date(start_date)
             if parsed_start:
-                interactions = interactions.filter(date__date__gte=parsed_start)
+                interactions = interactions.filter(date__gte=day_start(parsed_start))
         if end_date:
             parsed_end = parse_date(end_date)
             if parsed_end:
-                interactions = interactions.filter(date__date__lte=parsed_end)
+                interactions = interactions.filter(date__lt=day_end(parsed_end))
                 
         if sort_by == 'oldest':
             interactions = interactions.order_by('date')
@@ -962,53 +941,67 @@ class BDEReportView(APIView):
         if start_date:
             parsed_start = parse_date(start_date)
             if parsed_start:
-                pending_tasks = pending_tasks.filter(created_at__date__gte=parsed_start)
+                pending_tasks = pending_tasks.filter(created_at__gte=day_start(parsed_start))
         if end_date:
             parsed_end = parse_date(end_date)
             if parsed_end:
-                pending_tasks = pending_tasks.filter(created_at__date__lte=parsed_end)
-
-        total_calls = all_interactions.filter(interaction_type='CALL').count()
-        total_notes = all_interactions.filter(interaction_type='NOTE').count()
-        total_whatsapp = all_interactions.filter(interaction_type='WHATSAPP').count()
-        total_emails = all_interactions.filter(interaction_type='EMAIL').count()
-        total_meetings = all_interactions.filter(interaction_type='MEETING').count()
-
-        calls_qs = all_interactions.filter(interaction_type='CALL')
-        total_bde_duration_sec = sum(parse_duration_sec(c.call_duration, c.notes) for c in calls_qs)
+                pending_tasks = pending_tasks.filter(created_at__lt=day_end(parsed_end))
+
+        # Every interaction metric in one grouped pass; call_duration holds parsed note durations too
+        from django.db.models import Count, Q
+        totals = all_interactions.order_by().aggregate(
+            total_interactions=Count('id'),
+            total_calls=Count('id', filter=Q(interaction_type='CALL')),
+            total_notes=Count('id', filter=Q(interaction_type='NOTE')),
+            total_whatsapp=Count('id', filter=Q(interaction_type='WHATSAPP')),
+            total_emails=Count('id', filter=Q(interaction_type='EMAIL')),
+            total_meetings=Count('id', filter=Q(interaction_type='MEETING')),
+            total_call_duration=Sum('call_duration', filter=Q(interaction_type='CALL', call_duration__gt=0)),
+        )
+        total_bde_duration_sec = totals['total_call_duration'] or 0
 
         metrics = {
             'total_assigned': leads.count(),
-            'total_calls': total_calls,
-            'total_notes': total_notes,
-            'total_whatsapp': total_whatsapp,
-            'total_emails': total_emails,
-            'total_meetings': total_meetings,
-            'total_interactions': all_interactions.count(),
+            'total_calls': totals['total_calls'],
+            'total_notes': totals['total_notes'],
+            'total_whatsapp': totals['total_whatsapp'],
+            'total_emails': totals['total_emails'],
+            'total_meetings': totals['total_meetings'],
+            'total_interactions': totals['total_interactions'],
             'total_call_duration': total_bde_duration_sec,
             'formatted_total_call_duration': format_duration_seconds(total_bde_duration_sec),
             'pending_tasks': pending_tasks.count()
         }
 
+        from django.db.models import F
+        lead_rows = leads.values('id', 'first_name', 'last_name', 'crm_student_id', 'lead_status', username=F('user__username'))
+        # Opt-in keyset pagination (?pagination=cursor) for reps with very large books
+        leads_paginator = None
+        if request.query_params.get('pagination') == 'cursor':
+            from core.pagination import StudentCursorPagination
+            leads_paginator = StudentCursorPagination()
+            lead_rows = leads_paginator.paginate_queryset(lead_rows, request, view=self)
+
         leads_list = []
-        for lead in leads:
-            try:
-                username = lead.user.username if lead.user else 'Unknown'
-            except Exception:
-                username = 'Unknown'
+        for lead in lead_rows:
             leads_list.append({
-                'id': lead.id,
-                'name': f"{lead.first_name or ''} {lead.last_name or ''}".strip() or username,
-                'crm_id': lead.crm_student_id,
-                'status': lead.lead_status
+                'id': lead['id'],
+                'name': f"{lead['first_name'] or ''} {lead['last_name'] or ''}".strip() or lead['username'] or 'Unknown',
+                'crm_id': lead['crm_student_id'],
+                'status': lead['lead_status']
             })
 
+        extra = {}
+        if leads_paginator is not None:
+            extra = {'leads_next': leads_paginator.get_next_link(), 'leads_previous': leads_paginator.get_previous_link()}
+
         return Response({
             'bde': {'id': bde.id, 'name': bde.get_full_name() or bde.username, 'email': bde.email},
             'leads': leads_list,
             'metrics': metrics,
             'timeline': timeline,
-            'has_more': has_more
+            'has_more': has_more,
+            **extra
         })
 
 class TaskViewSet(viewsets.ModelViewSet):
@@ -1101,16 +1094,12 @@ class WebhookReceiveView(APIView):
                     campaign = Campaign.objects.filter(id=campaign_id).first()
 
                 # Assign Program (fallback to campaign section match)
+                reference = get_reference_data()
                 program = None
                 if program_id:
-                    program = Program.objects.filter(id=program_id).first()
+                    program = reference.program(program_id)
                 if not program:
-                    if campaign and campaign.section == 'CAREER_ACADEMY':
-                        program = Program.objects.filter(name='Natya Career Academy').first()
-                    elif campaign and campaign.section == 'REGULAR':
-                        program = Program.objects.filter(name='Natya').first()
-                    if not program:
-                        program = Program.objects.exclude(name="Wise Import").first() or Program.objects.first()
+                    program = reference.program_for_section(campaign.section if campaign else None)
 
                 # Check if Student profile already exists for this user
                 student = Student.objects.filter(user=user).first()
@@ -1230,16 +1219,12 @@ class CampaignWebhookReceiveView(APIView):
                 crm_id = f"NATYA-{count:04d}"
 
                 # Assign Program (fallback to campaign section match)
+                reference = get_reference_data()
                 program = None
                 if program_id:
-                    program = Program.objects.filter(id=program_id).first()
+                    program = reference.program(program_id)
                 if not program:
-                    if campaign and campaign.section == 'CAREER_ACADEMY':
-                        program = Program.objects.filter(name='Natya Career Academy').first()
-                    elif campaign and campaign.section == 'REGULAR':
-                        program = Program.objects.filter(name='Natya').first()
-                    if not program:
-                        program = Program.objects.exclude(name="Wise Import").first() or Program.objects.first()
+                    program = reference.program_for_section(campaign.section if campaign else None)
 
                 # Duplicate Check
                 is_duplicate = False
@@ -1361,11 +1346,11 @@ class CallAnalyticsView(APIView):
         if start_date_str:
             start_date = parse_date(start_date_str)
             if start_date:
-                interactions = interactions.filter(date__date__gte=start_date)
+                interactions = interactions.filter(date__gte=day_start(start_date))
         if end_date_str:
             end_date = parse_date(end_date_str)
             if end_date:
-                interactions = interactions.filter(date__date__lte=end_date)
+                interactions = interactions.filter(date__lt=day_end(end_date))
                 
         employee_id = request.query_params.get('employee_id')
         if employee_id:
@@ -1379,125 +1364,83 @@ class CallAnalyticsView(APIView):
         if status:
             interactions = interactions.filter(call_status=status)
 
-        total_incoming = interactions.filter(call_direction='INCOMING').count()
-
-        total_outgoing = interactions.filter(call_direction='OUTGOING').count()
-
-        
+        from django.db.models import Max
+        from django.db.models.functions import Coalesce, ExtractHour, ExtractWeekDay, TruncDate
 
-        missed = interactions.filter(call_status__in=['MISSED', 'UNANSWERED']).count()
+        connected_q = Q(call_status='CONNECTED')
 
-        rejected = interactions.filter(call_status='REJECTED').count()
-
-
-
-        duration_incoming = interactions.filter(call_direction='INCOMING').aggregate(Sum('call_duration'))['call_duration__sum'] or 0
-
-        duration_outgoing = interactions.filter(call_direction='OUTGOING').aggregate(Sum('call_duration'))['call_duration__sum'] or 0
-
-        
-
-        total_calls = interactions.count()
+        def bucket_metrics():
+            return {
+                'calls': Count('id'),
+                'connected': Count('id', filter=connected_q),
+                'duration': Coalesce(Sum('call_duration'), 0),
+            }
 
+        # Summary and quick stats in one conditional aggregate
+        totals = interactions.order_by().aggregate(
+            total_calls=Count('id'),
+            total_incoming=Count('id', filter=Q(call_direction='INCOMING')),
+            total_outgoing=Count('id', filter=Q(call_direction='OUTGOING')),
+            missed=Count('id', filter=Q(call_status__in=['MISSED', 'UNANSWERED'])),
+            rejected=Count('id', filter=Q(call_status='REJECTED')),
+            connected_calls=Count('id', filter=connected_q),
+            duration_incoming=Sum('call_duration', filter=Q(call_direction='INCOMING')),
+            duration_outgoing=Sum('call_duration', filter=Q(call_direction='OUTGOING')),
+            unique_clients=Count('student', distinct=True),
+            unique_connected_calls=Count('student', distinct=True, filter=connected_q),
+        )
+        total_incoming = totals['total_incoming']
+        total_outgoing = totals['total_outgoing']
+        missed = totals['missed']
+        rejected = totals['rejected']
+        duration_incoming = totals['duration_incoming'] or 0
+        duration_outgoing = totals['duration_outgoing'] or 0
+        total_calls = totals['total_calls']
         total_duration = duration_incoming + duration_outgoing
-
-
-
         never_attended = missed + rejected
-
-        unique_clients = interactions.values('student').distinct().count()
-
-        connected_calls = interactions.filter(call_status='CONNECTED').count()
-
-        unique_connected_calls = interactions.filter(call_status='CONNECTED').values('student').distinct().count()
-
-
-
-        employees = {}
-
-        for inter in interactions.select_related('author'):
-
-            author_id = inter.author.id if inter.author else 0
-
-            if author_id not in employees:
-
-                employees[author_id] = {
-
-                    'id': author_id,
-
-                    'name': f"{inter.author.first_name} {inter.author.last_name}".strip() if inter.author else 'Unknown',
-
-                    'total_calls': 0,
-
-                    'total_duration': 0,
-
-                    'connected_calls': 0,
-
-                    'connected_duration': 0,
-
-                    'unique_clients_set': set(),
-
-                    'unique_connected_set': set()
-
-                }
-
-            
-
-            emp = employees[author_id]
-
-            emp['total_calls'] += 1
-
-            emp['total_duration'] += inter.call_duration
-
-            if inter.student_id:
-
-                emp['unique_clients_set'].add(inter.student_id)
-
-            
-
-            if inter.call_status == 'CONNECTED':
-
-                emp['connected_calls'] += 1
-
-                emp['connected_duration'] += inter.call_duration
-
-                if inter.student_id:
-
-                    emp['unique_connected_set'].add(inter.student_id)
-
-
-
+        unique_clients = totals['unique_clients']
+        connected_calls = totals['connected_calls']
+        unique_connected_calls = totals['unique_connected_calls']
+
+        # Per-employee summary grouped in the database, most recently active first
+        employee_rows = (
+            interactions.values('author_id', 'author__first_name', 'author__last_name')
+            .annotate(
+                total_calls=Count('id'),
+                total_duration=Coalesce(Sum('call_duration'), 0),
+                connected_calls=Count('id', filter=connected_q),
+                connected_duration=Coalesce(Sum('call_duration', filter=connected_q), 0),
+                unique_clients=Count('student', distinct=True),
+                unique_connected=Count('student', distinct=True, filter=connected_q),
+                last_call=Max('date'),
+            )
+            .order_by('-last_call', 'author_id')
+        )
         employee_summary = []
-
-        for i, (k, v) in enumerate(employees.items()):
-
-            avg_duration = round(v['connected_duration'] / v['connected_calls']) if v['connected_calls'] > 0 else 0
-
+        for i, row in enumerate(employee_rows):
+            name = f"{row['author__first_name'] or ''} {row['author__last_name'] or ''}".strip() if row['author_id'] else ''
             employee_summary.append({
-
                 'sr_no': i + 1,
-
-                'id': v['id'],
-
-                'name': v['name'] or 'Unknown',
-
-                'total_calls': v['total_calls'],
-
-                'total_duration': v['total_duration'],
-
-                'connected_calls': v['connected_calls'],
-
-                'connected_duration': v['connected_duration'],
-
-                'avg_duration': avg_duration,
-
-                'unique_clients': len(v['unique_clients_set']),
-
-                'unique_connected': len(v['unique_connected_set'])
-
+                'id': row['author_id'] or 0,
+                'name': name or 'Unknown',
+                'total_calls': row['total_calls'],
+                'total_duration': row['total_duration'],
+                'connected_calls': row['connected_calls'],
+                'connected_duration': row['connected_duration'],
+                'avg_duration': round(row['connected_duration'] / row['connected_calls']) if row['connected_calls'] else 0,
+                'unique_clients': row['unique_clients'],
+                'unique_connected': row['unique_connected'],
             })
 
-
+        # Hour-of-day x weekday heatmap (weekday 1 = Sunday ... 7 = Saturday) and a daily series
+        heatmap = list(
+            interactions.values(weekday=ExtractWeekDay('date'), hour=ExtractHour('date'))
+            .annotate(**bucket_metrics()).order_by('weekday', 'hour')
+        )
+        daily_series = [
+            {'date': row['day'].isoformat(), 'calls': row['calls'], 'connected': row['connected'], 'duration': row['duration']}
+            for row in interactions.values(day=TruncDate('date')).annotate(**bucket_metrics()).order_by('day')
+        ]
 
         page = int(request.query_params.get('page', 1))
         page_size = 20
@@ -1559,7 +1502,11 @@ class CallAnalyticsView(APIView):
 
             },
 
-            'employee_summary': employee_summary
+            'employee_summary': employee_summary,
+
+            'heatmap': heatmap,
+
+            'daily_series': daily_series
 
         })
 
@@ -1568,6 +1515,7 @@ class CallAnalyticsView(APIView):
 class MarketingDashboardView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
+    @cache_response()
     def get(self, request):
         from django.db.models import Count, Sum
         from datetime import datetime, timedelta
@@ -1577,14 +1525,18 @@ class MarketingDashboardView(APIView):
         end_date_str = request.query_params.get('end_date')
 
         # Summary Stats
+        from django.db.models.functions import TruncDate
+        from itertools import chain
+        from .models import DailyLeadMetrics
+        from .rollups import RollupWindow, lead_date
+
         campaigns = Campaign.objects.all()
-        students = Student.objects.filter(is_active=True, campaign__isnull=False).exclude(lead_status='DUPLICATE')
+        start_date = end_date = None
 
         if start_date_str:
             try:
                 start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
                 campaigns = campaigns.filter(created_at__date__gte=start_date)
-                students = students.filter(created_at__date__gte=start_date)
             except ValueError:
                 pass
         
@@ -1592,80 +1544,115 @@ class MarketingDashboardView(APIView):
             try:
                 end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
                 campaigns = campaigns.filter(created_at__date__lte=end_date)
-                students = students.filter(created_at__date__lte=end_date)
             except ValueError:
                 pass
 
         # Dynamically determine all converted/enrolled pipeline stage values
         converted_stage_values = set(['ENROLLED', 'CONVERTED', 'converted', 'enrolled', 'Converted', 'Enrolled', 'POSITIVE', 'positive'])
-        try:
-            from .models import PipelineStage
-            for stage in PipelineStage.objects.all():
-                s_name = (stage.name or '').lower()
-                if any(kw in s_name for kw in ['convert', 'enroll', 'positive', 'paid', 'join']):
-                    converted_stage_values.add(str(stage.id))
-                    converted_stage_values.add(stage.name)
-                    converted_stage_values.add(stage.name.lower())
-                    converted_stage_values.add(stage.name.upper())
-        except Exception:
-            pass
+        for stage in get_reference_data().positive_stages:
+            converted_stage_values.add(str(stage.id))
+            converted_stage_values.add(stage.name)
+            converted_stage_values.add(stage.name.lower())
+            converted_stage_values.add(stage.name.upper())
         converted_stages_list = list(converted_stage_values)
 
         total_spend = campaigns.aggregate(total=Sum('budget'))['total'] or 0
-        total_leads = students.count()
-        total_converted = students.filter(lead_status__in=converted_stages_list).count()
 
-        # Chart Data
-        from django.db.models.functions import TruncDate
-        
-        daily_leads_qs = students
+        # Campaign leads per day: closed days from the daily rollups, the rest live
         if not start_date_str:
-            # Default to 30 days if no start date provided
-            thirty_days_ago = timezone.now().date() - timedelta(days=30)
-            daily_leads_qs = students.filter(user__date_joined__date__gte=thirty_days_ago)
-            
-        daily_leads = daily_leads_qs.annotate(date=TruncDate('user__date_joined')).values('date').annotate(count=Count('id')).order_by('date')
+            # Default the chart to 30 days if no start date provided
+            chart_start = timezone.now().date() - timedelta(days=30)
+        else:
+            chart_start = start_date
+        lead_facts = DailyLeadMetrics.objects.filter(campaign__isnull=False).exclude(lead_status='DUPLICATE')
+        students = (
+            Student.objects.filter(is_active=True, campaign__isnull=False).exclude(lead_status='DUPLICATE')
+            .annotate(metric_at=lead_date())
+        )
+        window = RollupWindow(start_date, end_date)
+        # One pass by campaign x stage feeds both the summary and the per-campaign costs
+        summary = lead_facts.values('campaign_id', 'lead_status').annotate(leads=Sum('leads')).order_by()
+        live_summary = students.values('campaign_id', 'lead_status').annotate(leads=Count('id')).order_by()
+        total_leads = total_converted = 0
+        campaign_leads = {}
+        for row in chain(window.facts(summary), window.live(live_summary, 'metric_at')):
+            leads = row['leads'] or 0
+            converted = leads if row['lead_status'] in converted_stage_values else 0
+            total_leads += leads
+            total_converted += converted
+            counts = campaign_leads.setdefault(row['campaign_id'], [0, 0])
+            counts[0] += leads
+            counts[1] += converted
+
+        campaign_report = []
+        for campaign in campaigns.values('id', 'name', 'platform', 'status', 'budget'):
+            leads, converted = campaign_leads.get(campaign['id'], (0, 0))
+            budget = float(campaign['budget'] or 0)
+            campaign_report.append({
+                'id': campaign['id'],
+                'name': campaign['name'],
+                'platform': campaign['platform'],
+                'status': campaign['status'],
+                'budget': budget,
+                'leads': leads,
+                'converted': converted,
+                'cost_per_lead': round(budget / leads, 2) if leads else None,
+                'cost_per_conversion': round(budget / converted, 2) if converted else None
+            })
+
+        # Chart Data
+        chart_window = RollupWindow(chart_start, end_date)
+        daily_leads = {}
+        facts_by_day = chart_window.facts(lead_facts).values('date').annotate(count=Sum('leads')).order_by()
+        live_by_day = (
+            chart_window.live(students, 'metric_at').annotate(day=TruncDate('metric_at'))
+            .values('day').annotate(count=Count('id')).order_by()
+        )
+        for row in chain(facts_by_day, live_by_day):
+            day = row.get('date') or row.get('day')
+            daily_leads[day] = daily_leads.get(day, 0) + row['count']
         
         chart_data = []
-        for d in daily_leads:
+        for day in sorted(daily_leads):
             chart_data.append({
-                'date': str(d['date']),
-                'leads': d['count']
+                'date': str(day),
+                'leads': daily_leads[day]
             })
 
-        # Sales Team Report
+        # Sales Team Report: every rep's counts from one grouped query
+        from django.db.models import Exists, OuterRef, Q
         sales_reps = User.objects.filter(role='SALES')
         if request.user.role == 'SALES' and getattr(request.user, 'sales_section', 'BOTH') != 'BOTH':
-            from django.db.models import Q
             sales_reps = sales_reps.filter(Q(sales_section=request.user.sales_section) | Q(sales_section='BOTH'))
 
+        rep_leads = Student.objects.filter(assigned_to__in=sales_reps, is_active=True).exclude(lead_status='DUPLICATE')
+        if start_date:
+            rep_leads = rep_leads.filter(created_at__gte=day_start(start_date))
+        if end_date:
+            rep_leads = rep_leads.filter(created_at__lt=day_end(end_date))
+        contacted = Exists(LeadInteraction.objects.filter(student=OuterRef('pk')))
+        rep_counts = {
+            row['assigned_to']: row
+            for row in rep_leads.values('assigned_to').annotate(
+                assigned=Count('id'),
+                contacted=Count('id', filter=Q(contacted)),
+                converted=Count('id', filter=Q(lead_status__in=converted_stages_list)),
+            ).order_by()
+        }
+
         sales_report = []
-        for rep in sales_reps:
-            rep_leads = Student.objects.filter(assigned_to=rep, is_active=True).exclude(lead_status='DUPLICATE')
-            if start_date_str:
-                try:
-                    p_start = datetime.strptime(start_date_str, '%Y-%m-%d').date()
-                    rep_leads = rep_leads.filter(created_at__date__gte=p_start)
-                except ValueError:
-                    pass
-            if end_date_str:
-                try:
-                    p_end = datetime.strptime(end_date_str, '%Y-%m-%d').date()
-                    rep_leads = rep_leads.filter(created_at__date__lte=p_end)
-                except ValueError:
-                    pass
-
-            assigned = rep_leads.count()
-            contacted = rep_leads.filter(crm_interactions__isnull=False).distinct().count()
-            converted = rep_leads.filter(lead_status__in=converted_stages_list).count()
-            conversion_rate = round((converted / assigned * 100), 2) if assigned > 0 else 0
+        no_leads = {'assigned': 0, 'contacted': 0, 'converted': 0}
+        for rep in sales_reps.only('id', 'username', 'first_name', 'last_name'):
+            counts = rep_counts.get(rep.id, no_leads)
+            assigned = counts['assigned']
+            conversion_rate = round((counts['converted'] / assigned * 100), 2) if assigned > 0 else 0
             
             sales_report.append({
                 'id': rep.id,
                 'name': rep.get_full_name() or rep.username,
                 'assigned': assigned,
-                'contacted': contacted,
-                'converted': converted,
+                'contacted': counts['contacted'],
+                'converted': counts['converted'],
                 'conversion_rate': conversion_rate
             })
 
@@ -1676,7 +1663,8 @@ class MarketingDashboardView(APIView):
                 'total_converted': total_converted
             },
             'chart_data': chart_data,
-            'sales_report': sales_report
+            'sales_report': sales_report,
+            'campaign_report': campaign_report
         })
 
 class BulkAssignLeadsView(APIView):
@@ -1693,6 +1681,8 @@ class BulkAssignLeadsView(APIView):
             sales_user = User.objects.get(id=sales_user_id, role='SALES')
             students = Student.objects.filter(id__in=lead_ids)
             updated = students.update(assigned_to=sales_user)
+            mark_students_dirty(lead_ids)
+            bump_resource_version('lead_assignment', 'dashboards')
             return Response({'message': f'Successfully assigned {updated} leads to {sales_user.username}'})
         except User.DoesNotExist:
             return Response({'error': 'Sales user not found'}, status=status.HTTP_404_BAD_REQUEST)
@@ -9,7 +9,8 @@ from django.conf import settings
 from django.shortcuts import redirect
 from django.contrib.auth import get_user_model
 from django.utils.dateparse import parse_datetime
-from .models import Campaign, PipelineStage
+from .models import Campaign
+from .reference_data import get_reference_data
 from core.models import Student
 
 User = get_user_model()
@@ -218,8 +219,8 @@ class GoogleSheetSyncView(APIView):
         skipped_count = 0
         
         # Get default stage ID
-        new_stage = PipelineStage.objects.filter(name__iexact='New Lead').first() or PipelineStage.objects.filter(is_default=True).first()
-        new_stage_id = str(new_stage.id) if new_stage else 'NEW'
+        reference = get_reference_data()
+        new_stage_id = reference.stage_id('New Lead') or reference.default_stage_id or 'NEW'
         
         # Import data starting from configured last row
         start_row_index = max(1, campaign.google_last_synced_row)
@@ -288,14 +289,7 @@ class GoogleSheetSyncView(APIView):
                         }
                     )
                     
-                    from core.models import Program
-                    program = None
-                    if campaign and campaign.section == 'CAREER_ACADEMY':
-                        program = Program.objects.filter(name='Natya Career Academy').first()
-                    elif campaign and campaign.section == 'REGULAR':
-                        program = Program.objects.filter(name='Natya').first()
-                    if not program:
-                        program = Program.objects.exclude(name="Wise Import").first() or Program.objects.first()
+                    program = reference.program_for_section(campaign.section if campaign else None)
                     
                     student = Student.objects.create(
                         user=user,
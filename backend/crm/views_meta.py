@@ -13,7 +13,8 @@ from django.utils.crypto import get_random_string
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
-from core.models import Student, Program
+from core.models import Student
+from .reference_data import get_reference_data
 
 
 logger = logging.getLogger(__name__)
@@ -211,13 +212,7 @@ class MetaLeadWebhookView(APIView):
                             today = datetime.date.today()
                             count = Student.objects.filter(user__date_joined__date=today).count() + 1
                             crm_id = f"LLAD-{today.strftime('%d%m%y')}{count:03d}"
-                            program = None
-                            if campaign and campaign.section == 'CAREER_ACADEMY':
-                                program = Program.objects.filter(name='Natya Career Academy').first()
-                            elif campaign and campaign.section == 'REGULAR':
-                                program = Program.objects.filter(name='Natya').first()
-                            if not program:
-                                program = Program.objects.exclude(name="Wise Import").first() or Program.objects.first()
+                            program = get_reference_data().program_for_section(campaign.section if campaign else None)
 
                             # Auto-assign lead to active sales rep using round-robin logic on the campaign's auto_assign_to list
                             assigned_to_user = None
@@ -5,6 +5,7 @@ from django.db.models import Sum
 from .models import Expense, ExpenseCategory
 from .serializers import ExpenseSerializer, ExpenseCategorySerializer
 from datetime import datetime, timedelta
+from core.response_cache import cache_response
 
 class ExpenseCategoryViewSet(viewsets.ModelViewSet):
     queryset = ExpenseCategory.objects.all()
@@ -17,6 +18,7 @@ class ExpenseViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
 
     @action(detail=False, methods=['get'])
+    @cache_response()
     def summary(self, request):
         # Get total expenses for current month
         today = datetime.now()
@@ -2,12 +2,15 @@
 from rest_framework import viewsets, permissions
 from .models import DynamicField, StudentDynamicValue
 from .serializers import DynamicFieldSerializer, StudentDynamicValueSerializer
+from core.conditional import ConditionalGetMixin
 
-class DynamicFieldViewSet(viewsets.ModelViewSet):
+class DynamicFieldViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = DynamicField.objects.all()
     serializer_class = DynamicFieldSerializer
     permission_classes = [permissions.IsAuthenticated] # Or IsAdminUser for mutations
     pagination_class = None
+    # Filtering by course/sub_program also resolves their parents
+    conditional_families = ('dynamic_fields', 'programs')
 
     def get_queryset(self):
         from django.db.models import Q
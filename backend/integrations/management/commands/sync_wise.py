@@ -131,3 +131,7 @@ class Command(BaseCommand):
                     stats["errors"] += 1
         
         self.stdout.write(self.style.SUCCESS(f'Sync completed! Stats: {stats}'))
+
+        # Students created above may own already-mirrored fee transactions
+        from integrations.wise_sync import link_wise_transactions
+        link_wise_transactions()
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+from integrations.models import WiseTransaction
+from integrations.wise_sync import sync_wise_transactions, link_wise_transactions
+
+class Command(BaseCommand):
+    help = 'Mirror new Wise LMS fee transactions into WiseTransaction (incremental from the last chargedAt; run from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Ignore the watermark and refetch every transaction')
+        parser.add_argument('--relink', action='store_true', help='Only re-resolve student links from Student.lms_student_id')
+
+    def handle(self, *args, **options):
+        if options['relink']:
+            WiseTransaction.objects.update(student=None)
+            linked = link_wise_transactions()
+            self.stdout.write(self.style.SUCCESS(f"Linked {linked} Wise transactions to students."))
+            return
+        try:
+            stats = sync_wise_transactions(full=options['full'])
+        except RuntimeError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f"Wise transaction sync completed! Stats: {stats}"))
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0043_export_job'),
+        ('integrations', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WiseTransaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('wise_id', models.CharField(max_length=64, unique=True)),
+                ('lms_student_id', models.CharField(blank=True, db_index=True, default='', max_length=64)),
+                ('student_name', models.CharField(blank=True, default='', help_text='Name as reported by Wise, for students not in the CRM', max_length=255)),
+                ('classroom_name', models.CharField(blank=True, default='', max_length=255)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('charged_at', models.DateTimeField(db_index=True)),
+                ('raw', models.JSONField(blank=True, default=dict)),
+                ('synced_at', models.DateTimeField(auto_now=True)),
+                ('student', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='wise_transactions', to='core.student')),
+            ],
+            options={
+                'ordering': ['-charged_at'],
+            },
+        ),
+    ]
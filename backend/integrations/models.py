@@ -8,3 +8,22 @@ class IntegrationSetting(models.Model):
 
     def __str__(self):
         return self.name
+
+
+class WiseTransaction(models.Model):
+    """Local mirror of Wise LMS fee transactions (CHARGED payments), kept current by integrations.wise_sync"""
+    wise_id = models.CharField(max_length=64, unique=True)
+    lms_student_id = models.CharField(max_length=64, blank=True, default='', db_index=True)
+    student = models.ForeignKey('core.Student', on_delete=models.SET_NULL, null=True, blank=True, related_name='wise_transactions')
+    student_name = models.CharField(max_length=255, blank=True, default='', help_text='Name as reported by Wise, for students not in the CRM')
+    classroom_name = models.CharField(max_length=255, blank=True, default='')
+    amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    charged_at = models.DateTimeField(db_index=True)
+    raw = models.JSONField(default=dict, blank=True)
+    synced_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-charged_at']
+
+    def __str__(self):
+        return f"Wise {self.wise_id} - {self.amount} on {self.charged_at:%Y-%m-%d}"
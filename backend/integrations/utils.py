@@ -3,6 +3,8 @@ import os
 from django.conf import settings
 
 class WiseService:
+    MAX_TRANSACTION_PAGES = 100
+
     def __init__(self):
         self.host = os.getenv('WISE_API_HOST', 'api.wiseapp.live')
         self.api_key = os.getenv('WISE_API_KEY')
@@ -52,6 +54,10 @@ class WiseService:
         """
         Fetches institute transactions from Wise LMS, handling pagination automatically.
         URL: /institutes/{institute_id}/fees/transactions
+
+        Returns {"transactions": [...], "complete": bool, "truncated": bool, "error": str or None}.
+        "complete" is False when a page failed (error says why) or the
+        MAX_TRANSACTION_PAGES cap stopped the walk ("truncated"); the list is then partial.
         """
         if not self.api_key:
             return None
@@ -59,6 +65,8 @@ class WiseService:
         all_transactions = []
         page = 1
         headers = self.get_headers()
+        error = None
+        truncated = False
         
         while True:
             try:
@@ -78,10 +86,12 @@ class WiseService:
                     
                 response = requests.get(url, headers=headers, params=params, timeout=10)
                 if response.status_code != 200:
+                    error = f"HTTP {response.status_code} on page {page}"
                     break
                     
                 data = response.json()
                 if data.get('status') != 200:
+                    error = f"Wise status {data.get('status')} on page {page}"
                     break
                     
                 result_data = data.get('data') or {}
@@ -96,13 +106,16 @@ class WiseService:
                     break
                     
                 page += 1
-                if page > 100:  # safety break
+                if page > self.MAX_TRANSACTION_PAGES:  # safety break
+                    truncated = True
+                    error = f"stopped after {self.MAX_TRANSACTION_PAGES} pages"
                     break
             except Exception as e:
                 print(f"Wise API Transactions Error on page {page}: {e}")
+                error = f"{e} on page {page}"
                 break
                 
-        return {"transactions": all_transactions}
+        return {"transactions": all_transactions, "complete": error is None, "truncated": truncated, "error": error}
 
     # Keeping original get_student_details as a wrapper or deprecated
     def get_student_details(self, lms_student_id):
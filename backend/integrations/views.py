@@ -4,6 +4,7 @@ from core.models import Student
 from .utils import WiseService
 from .models import IntegrationSetting
 from .serializers import IntegrationSettingSerializer
+from core.conditional import ConditionalGetMixin
 import random
 import razorpay
 from django.db import models
@@ -496,14 +497,8 @@ class SyncWiseBatchView(views.APIView):
                  return response.Response({"error": "Class not found in Wise LMS"}, status=404)
             
             # Resolve 'CONVERTED' stage ID
-            converted_stage_id = 'CONVERTED'
-            try:
-                from crm.models import PipelineStage
-                stage = PipelineStage.objects.filter(name__iexact='CONVERTED').first()
-                if stage:
-                    converted_stage_id = str(stage.id)
-            except Exception:
-                pass
+            from crm.reference_data import get_reference_data
+            converted_stage_id = get_reference_data().stage_id('CONVERTED', 'CONVERTED')
             
             # 2. Ensure Course exists
             program, _ = Program.objects.get_or_create(name="Wise Courses", defaults={"slug": "wise-courses"})
@@ -700,8 +695,9 @@ class ConsumeWiseCreditsView(views.APIView):
         except Exception as e:
              return response.Response({"error": str(e)}, status=500)
 
-class IntegrationSettingViewSet(views.APIView):
+class IntegrationSettingViewSet(ConditionalGetMixin, views.APIView):
     permission_classes = [permissions.IsAuthenticated]
+    conditional_families = ('integration_settings',)
 
     def get(self, request):
         if request.user.role not in ['ADMIN', 'SUPER_ADMIN']:
@@ -808,7 +804,9 @@ class SyncWiseAttendanceView(views.APIView):
             return response.Response({"error": "Permission denied"}, status=403)
             
         from core.models import Batch, ClassSession, Attendance
+        from datetime import timezone as dt_timezone
         from django.contrib.auth import get_user_model
+        from django.utils import timezone
         from django.utils.dateparse import parse_datetime
         import threading
         
@@ -837,14 +835,27 @@ class SyncWiseAttendanceView(views.APIView):
                         if not conducting_teacher:
                             conducting_teacher = batch.teacher
 
+                        # Wise reports session length in milliseconds
+                        try:
+                            duration_ms = int(log['duration']) if log.get('duration') is not None else None
+                        except (TypeError, ValueError):
+                            duration_ms = None
+                        duration_label = round(duration_ms / (1000 * 60)) if duration_ms is not None else 'N/A'
+                        summary = f"Auto-synced from Wise LMS Zoom Session (Duration: {duration_label} mins)"
+                        if timezone.is_naive(start_time):
+                            start_time = timezone.make_aware(start_time, dt_timezone.utc)
                         session, created = ClassSession.objects.get_or_create(
                             batch=batch, 
                             date=log_date,
                             teacher=conducting_teacher,
                             defaults={
-                                'teacher_summary': f"Auto-synced from Wise LMS Zoom Session (Duration: {log.get('duration', 'N/A')} mins)"
+                                'teacher_summary': summary,
+                                'duration_ms': duration_ms,
+                                'started_at': start_time,
                             }
                         )
+                        if not created and session.duration_ms is None and duration_ms is not None:
+                            ClassSession.objects.filter(pk=session.pk).update(duration_ms=duration_ms, started_at=start_time)
                         
                         present_lms_ids = log.get('students', [])
                         
@@ -0,0 +1,128 @@
+"""
+Incremental mirror of Wise LMS fee transactions into WiseTransaction.
+
+Each run asks Wise only for transactions charged since the newest `charged_at`
+already stored (less a day of overlap, since Wise filters by date), upserts
+them by Wise id and links unlinked rows to CRM students through
+Student.lms_student_id in one UPDATE. Reports read the table, never the API.
+
+The range is fetched in SYNC_WINDOW date windows (a first or --full sync starts
+at WISE_TRANSACTIONS_SINCE); a window that hits the page cap is split in half
+until it fits. If any window fails or is still truncated the run raises
+WiseSyncError before writing, so the watermark only advances past complete data.
+"""
+import logging
+import os
+from datetime import date, timedelta, timezone as dt_timezone
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import WiseTransaction
+from .utils import WiseService
+
+logger = logging.getLogger(__name__)
+
+WATERMARK_OVERLAP = timedelta(days=1)
+SYNC_WINDOW = timedelta(days=31)
+FIRST_SYNC_DATE = os.getenv('WISE_TRANSACTIONS_SINCE', '2020-01-01')
+UPSERT_FIELDS = ['lms_student_id', 'student_name', 'classroom_name', 'amount', 'charged_at', 'raw', 'synced_at']
+
+
+def parse_wise_transaction(wtx):
+    """WiseTransaction (unsaved) for one API payload, or None if it has no id or date."""
+    wise_id = wtx.get('_id') or wtx.get('id')
+    charged_at = parse_datetime(wtx.get('chargedAt') or wtx.get('createdAt') or '')
+    if not wise_id or not charged_at:
+        return None
+    if timezone.is_naive(charged_at):
+        charged_at = timezone.make_aware(charged_at, dt_timezone.utc)
+
+    amount_obj = wtx.get('amount') or {}
+    raw_amount = amount_obj.get('value', 0) if isinstance(amount_obj, dict) else amount_obj
+    try:
+        # Wise reports amounts in paise
+        amount = Decimal(str(raw_amount or 0)) / 100
+    except InvalidOperation:
+        amount = Decimal('0')
+
+    return WiseTransaction(
+        wise_id=str(wise_id),
+        lms_student_id=str(wtx.get('studentId') or ''),
+        student_name=((wtx.get('student') or {}).get('name') or '')[:255],
+        classroom_name=((wtx.get('classroom') or {}).get('name') or '')[:255],
+        amount=amount.quantize(Decimal('0.01')),
+        charged_at=charged_at,
+        raw=wtx,
+        synced_at=timezone.now(),
+    )
+
+
+def link_wise_transactions():
+    """Attach unlinked rows to the Student with the matching lms_student_id. Returns rows linked."""
+    from core.models import Student
+    match = Student.objects.filter(lms_student_id=OuterRef('lms_student_id')).order_by('id').values('id')[:1]
+    unlinked = WiseTransaction.objects.filter(student__isnull=True).exclude(lms_student_id='')
+    return unlinked.filter(lms_student_id__in=Student.objects.values('lms_student_id')).update(student_id=Subquery(match))
+
+
+class WiseSyncError(RuntimeError):
+    pass
+
+
+def fetch_window(wise, start, end):
+    """Every transaction charged from `start` to `end` (dates), splitting the window while Wise truncates it."""
+    # endDate is asked one day later so the window's last day is covered whether Wise treats it as inclusive or not
+    payload = wise.get_institute_transactions(start_date=start.isoformat(), end_date=(end + timedelta(days=1)).isoformat())
+    if payload is None:
+        raise WiseSyncError('Wise API not configured')
+    if payload.get('complete'):
+        return payload['transactions']
+    if payload.get('truncated') and end > start:
+        middle = start + (end - start) // 2
+        return fetch_window(wise, start, middle) + fetch_window(wise, middle + timedelta(days=1), end)
+    raise WiseSyncError(f"Wise transactions {start} to {end} incomplete: {payload.get('error')}")
+
+
+def sync_wise_transactions(full=False, wise=None):
+    """
+    Fetch new Wise transactions into WiseTransaction. Returns {'fetched', 'stored', 'linked', 'since'}.
+    Raises WiseSyncError, without storing anything, if Wise could not return the whole range.
+    """
+    wise = wise or WiseService()
+    if not wise.api_key:
+        raise RuntimeError('Wise API not configured')
+
+    since = None
+    start = date.fromisoformat(FIRST_SYNC_DATE)
+    if not full:
+        newest = WiseTransaction.objects.order_by('-charged_at').values_list('charged_at', flat=True).first()
+        if newest:
+            start = (newest - WATERMARK_OVERLAP).date()
+            since = start.isoformat()
+
+    today = timezone.localdate()
+    fetched = []
+    while start <= today:
+        end = min(start + SYNC_WINDOW - timedelta(days=1), today)
+        fetched += fetch_window(wise, start, end)
+        start = end + timedelta(days=1)
+
+    rows = {}
+    for wtx in fetched:
+        row = parse_wise_transaction(wtx)
+        if row is not None:
+            rows[row.wise_id] = row
+
+    with transaction.atomic():
+        WiseTransaction.objects.bulk_create(
+            list(rows.values()), batch_size=500,
+            update_conflicts=True, unique_fields=['wise_id'], update_fields=UPSERT_FIELDS,
+        )
+        linked = link_wise_transactions()
+    stats = {'fetched': len(fetched), 'stored': len(rows), 'linked': linked, 'since': since}
+    logger.info("Wise transaction sync: %s", stats)
+    return stats
@@ -26,6 +26,9 @@ class Notification(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'is_read'], name='notification_user_read_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.title}"
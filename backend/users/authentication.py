@@ -0,0 +1,108 @@
+"""
+Token authentication with a bounded, per-process LRU/TTL cache of token -> user.
+
+TokenAuthentication joins Token and User on every request; the mobile app polls
+often enough that this lookup dominates small requests. Entries live for
+TOKEN_AUTH_CACHE_TTL seconds (at most TOKEN_AUTH_CACHE_SIZE of them) and are
+dropped by users.signals whenever the user is saved (other than a login
+stamping last_login) or deleted, or one of their tokens is deleted (logout).
+Other processes see the invalidation through a per-user version stamp in
+Django's cache (core.version_stamps); with a per-process cache the TTL is capped
+at LOCAL_CACHE_MAX_AGE, since those stamps never reach other workers.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework.authentication import TokenAuthentication
+
+from core.version_stamps import bump_version, current_version, local_max_age
+
+VERSION_CACHE_KEY = 'users:token_auth:version:{}'
+
+
+class TokenUserCache:
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, version, user_id, (user, token))
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, version_of):
+        """Cached (user, token) for `key` if unexpired and still at `version_of(user_id)`."""
+        with self._lock:
+            entry = self._entries.get(key)
+        # The version lookup may hit the network, so it runs outside the lock
+        valid = entry is not None and entry[0] >= time.monotonic() and entry[1] == version_of(entry[2])
+        with self._lock:
+            if not valid:
+                if entry is not None and self._entries.get(key) is entry:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            self.hits += 1
+        # Hand out a copy so per-request mutations of request.user never leak into the cache
+        return copy.deepcopy(entry[3])
+
+    def set(self, key, version, user, token):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, version, user.pk, copy.deepcopy((user, token)))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, key=None, user_id=None):
+        with self._lock:
+            for k in [k for k, e in self._entries.items() if k == key or (user_id is not None and e[2] == user_id)]:
+                del self._entries[k]
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 4) if total else None,
+            }
+
+
+def _token_cache_ttl():
+    ttl = getattr(settings, 'TOKEN_AUTH_CACHE_TTL', 300)
+    max_age = local_max_age()
+    return ttl if max_age is None else min(ttl, max_age)
+
+
+token_cache = TokenUserCache(
+    max_size=getattr(settings, 'TOKEN_AUTH_CACHE_SIZE', 1024),
+    ttl=_token_cache_ttl(),
+)
+
+
+def user_version(user_id):
+    return current_version(VERSION_CACHE_KEY.format(user_id))
+
+
+def invalidate_token_cache(key=None, user_id=None):
+    """Drop cached entries for a token and/or user here, and make other processes refetch the user's tokens."""
+    token_cache.discard(key=key, user_id=user_id)
+    if user_id is not None:
+        bump_version(VERSION_CACHE_KEY.format(user_id))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key, user_version)
+        if cached is not None:
+            return cached
+        user, token = super().authenticate_credentials(key)
+        token_cache.set(key, user_version(user.pk), user, token)
+        return user, token
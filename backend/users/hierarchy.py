@@ -0,0 +1,67 @@
+"""
+Maintenance of the UserHierarchy closure table for User.reports_to.
+
+Moving a user moves their whole subtree: links from the subtree to its old
+ancestors are dropped and links to the new parent's ancestors are added, in
+two set-based statements regardless of subtree size.
+"""
+import logging
+
+from django.db import transaction
+
+from .models import User, UserHierarchy
+
+logger = logging.getLogger(__name__)
+
+
+def _subtree(user_id):
+    return list(UserHierarchy.objects.filter(ancestor_id=user_id).values_list('descendant_id', 'depth'))
+
+
+def attach_user(user_id, parent_id):
+    """Link `user_id` (and the subtree below it) under `parent_id`, detaching it from its old ancestors."""
+    with transaction.atomic():
+        UserHierarchy.objects.get_or_create(ancestor_id=user_id, descendant_id=user_id, defaults={'depth': 0})
+        subtree = _subtree(user_id)
+        subtree_ids = [pk for pk, _ in subtree]
+        UserHierarchy.objects.filter(descendant_id__in=subtree_ids).exclude(ancestor_id__in=subtree_ids).delete()
+        if not parent_id:
+            return
+        if parent_id in subtree_ids:
+            logger.warning(f"reports_to cycle: user {parent_id} is already under user {user_id}; hierarchy link skipped")
+            return
+        ancestors = list(UserHierarchy.objects.filter(descendant_id=parent_id).values_list('ancestor_id', 'depth'))
+        if not ancestors:
+            ancestors = [(parent_id, 0)]
+            UserHierarchy.objects.get_or_create(ancestor_id=parent_id, descendant_id=parent_id, defaults={'depth': 0})
+        UserHierarchy.objects.bulk_create([
+            UserHierarchy(ancestor_id=ancestor_id, descendant_id=descendant_id, depth=up + down + 1)
+            for ancestor_id, up in ancestors
+            for descendant_id, down in subtree
+        ])
+
+
+def detach_subordinates(user_id):
+    """Before deleting a user: their reports become roots (reports_to is SET_NULL without signals)."""
+    with transaction.atomic():
+        below = UserHierarchy.objects.filter(ancestor_id=user_id, depth__gt=0).values_list('descendant_id', flat=True)
+        above = UserHierarchy.objects.filter(descendant_id=user_id).values_list('ancestor_id', flat=True)
+        UserHierarchy.objects.filter(descendant_id__in=list(below), ancestor_id__in=list(above)).delete()
+
+
+def rebuild_hierarchy():
+    """Recompute every closure row from User.reports_to. Returns the number of rows written."""
+    parents = dict(User.objects.values_list('id', 'reports_to_id'))
+    rows = []
+    for user_id in parents:
+        seen = {user_id}
+        rows.append(UserHierarchy(ancestor_id=user_id, descendant_id=user_id, depth=0))
+        ancestor_id, depth = parents[user_id], 1
+        while ancestor_id and ancestor_id not in seen:
+            rows.append(UserHierarchy(ancestor_id=ancestor_id, descendant_id=user_id, depth=depth))
+            seen.add(ancestor_id)
+            ancestor_id, depth = parents.get(ancestor_id), depth + 1
+    with transaction.atomic():
+        UserHierarchy.objects.all().delete()
+        UserHierarchy.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from users.hierarchy import rebuild_hierarchy
+
+class Command(BaseCommand):
+    help = 'Rebuild the UserHierarchy closure table from User.reports_to'
+
+    def handle(self, *args, **options):
+        count = rebuild_hierarchy()
+        self.stdout.write(self.style.SUCCESS(f"User hierarchy rebuilt ({count} ancestor/descendant rows)."))
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:43
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def build_user_hierarchy(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    UserHierarchy = apps.get_model('users', 'UserHierarchy')
+    parents = dict(User.objects.values_list('id', 'reports_to_id'))
+    rows = []
+    for user_id in parents:
+        seen = {user_id}
+        rows.append(UserHierarchy(ancestor_id=user_id, descendant_id=user_id, depth=0))
+        ancestor_id, depth = parents[user_id], 1
+        while ancestor_id and ancestor_id not in seen:
+            rows.append(UserHierarchy(ancestor_id=ancestor_id, descendant_id=user_id, depth=depth))
+            seen.add(ancestor_id)
+            ancestor_id, depth = parents.get(ancestor_id), depth + 1
+    UserHierarchy.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0014_alter_rolepermission_module'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserHierarchy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depth', models.PositiveIntegerField()),
+                ('ancestor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='descendant_links', to=settings.AUTH_USER_MODEL)),
+                ('descendant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ancestor_links', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['descendant', 'depth'], name='userhierarchy_desc_depth_idx')],
+                'unique_together': {('ancestor', 'descendant')},
+            },
+        ),
+        migrations.RunPython(build_user_hierarchy, migrations.RunPython.noop),
+    ]
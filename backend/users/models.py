@@ -35,13 +35,34 @@ class User(AbstractUser):
     def __str__(self):
         return f"{self.username} ({self.role})"
         
+    def subordinate_ids(self, include_self=False):
+        """Ids of everyone under this user in the reports_to tree, as a subquery over UserHierarchy."""
+        links = UserHierarchy.objects.filter(ancestor_id=self.pk)
+        if not include_self:
+            links = links.filter(depth__gt=0)
+        return links.values_list('descendant_id', flat=True)
+
     def get_all_subordinates(self):
-        """Recursively get all users who report to this user."""
-        subordinates = list(self.subordinates.all())
-        all_subs = list(subordinates)
-        for sub in subordinates:
-            all_subs.extend(sub.get_all_subordinates())
-        return all_subs
+        """All users who report to this user, directly or indirectly."""
+        return list(User.objects.filter(id__in=self.subordinate_ids()))
+
+class UserHierarchy(models.Model):
+    """
+    Closure table of User.reports_to: one row per (ancestor, descendant) pair,
+    including each user's own depth-0 row. Maintained by users.hierarchy.
+    """
+    ancestor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='descendant_links')
+    descendant = models.ForeignKey(User, on_delete=models.CASCADE, related_name='ancestor_links')
+    depth = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ('ancestor', 'descendant')
+        indexes = [
+            models.Index(fields=['descendant', 'depth'], name='userhierarchy_desc_depth_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.ancestor_id} -> {self.descendant_id} ({self.depth})"
 
 class RolePermission(models.Model):
     MODULE_CHOICES = (
@@ -0,0 +1,89 @@
+"""
+Compiled role -> module -> bitmask view of the RolePermission table.
+
+DynamicRolePermission runs on every API call, so instead of one
+RolePermission query per module each process compiles the whole table once and
+keeps it until the shared version stamp in Django's cache changes (see
+core.version_stamps). users.signals bump the stamp on any RolePermission save
+or delete.
+"""
+from rest_framework import permissions
+
+from core.version_stamps import LocalCopy
+
+VERSION_CACHE_KEY = 'users:permission_matrix:version'
+
+VIEW = 1
+ADD = 2
+EDIT = 4
+DELETE = 8
+FLAG_BITS = {'view': VIEW, 'add': ADD, 'edit': EDIT, 'delete': DELETE}
+
+# A SALES check is satisfied by any of the CRM sub-modules as well
+MODULE_ALIASES = {
+    'SALES': [
+        'SALES', 'CRM_DASHBOARD', 'CRM_CAMPAIGNS', 'CRM_PIPELINE',
+        'CRM_LEADS_TABLE', 'CRM_TASKS', 'CRM_REPORTS', 'CRM_CALL_ANALYTICS',
+    ],
+}
+
+
+def method_bit(method):
+    if method in permissions.SAFE_METHODS:  # GET, HEAD, OPTIONS
+        return VIEW
+    if method == 'POST':
+        return ADD
+    if method in ['PUT', 'PATCH']:
+        return EDIT
+    if method == 'DELETE':
+        return DELETE
+    return 0
+
+
+def _mask(perm):
+    return (
+        (VIEW if perm.can_view else 0)
+        | (ADD if perm.can_add else 0)
+        | (EDIT if perm.can_edit else 0)
+        | (DELETE if perm.can_delete else 0)
+    )
+
+
+_matrix = LocalCopy(VERSION_CACHE_KEY)
+
+
+def _compile():
+    from .models import RolePermission
+    matrix = {}
+    for perm in RolePermission.objects.all():
+        matrix.setdefault(perm.role, {})[perm.module] = _mask(perm)
+    return matrix
+
+
+def get_permission_matrix():
+    """{role: {module: bitmask}} for every RolePermission row."""
+    return _matrix.get(_compile)
+
+
+def role_masks(role):
+    return get_permission_matrix().get(role, {})
+
+
+def role_flags(role):
+    """Same shape UserSerializer.permissions has always returned: {module: {'view': bool, ...}}."""
+    return {
+        module: {flag: bool(mask & bit) for flag, bit in FLAG_BITS.items()}
+        for module, mask in role_masks(role).items()
+    }
+
+
+def has_module_permission(role, module, method):
+    bit = method_bit(method)
+    if not bit:
+        return False
+    masks = role_masks(role)
+    return any(masks.get(mod, 0) & bit for mod in MODULE_ALIASES.get(module, [module]))
+
+
+def invalidate_permission_matrix():
+    _matrix.invalidate()
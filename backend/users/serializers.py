@@ -40,13 +40,8 @@ class UserSerializer(serializers.ModelSerializer):
     def get_permissions(self, obj):
         # Super Admins get all permissions implicitely, but for frontend simplicity
         # let's return a list of permissions
-        perms = RolePermission.objects.filter(role=obj.role)
-        return {p.module: {
-            'view': p.can_view,
-            'add': p.can_add,
-            'edit': p.can_edit,
-            'delete': p.can_delete
-        } for p in perms}
+        from .permission_matrix import role_flags
+        return role_flags(obj.role)
 
     def create(self, validated_data):
         password = validated_data.pop('password', None)
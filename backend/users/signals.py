@@ -0,0 +1,54 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+from .models import User, RolePermission
+from .authentication import invalidate_token_cache
+from .hierarchy import attach_user, detach_subordinates
+from .permission_matrix import invalidate_permission_matrix
+
+
+def _touches_reports_to(update_fields):
+    return update_fields is None or 'reports_to' in update_fields
+
+
+@receiver(pre_save, sender=User)
+def remember_reports_to(sender, instance, update_fields=None, **kwargs):
+    if instance.pk and _touches_reports_to(update_fields):
+        instance._previous_reports_to_id = User.objects.filter(pk=instance.pk).values_list('reports_to_id', flat=True).first()
+
+
+@receiver(post_save, sender=User)
+def update_user_hierarchy(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        attach_user(instance.pk, instance.reports_to_id)
+    elif _touches_reports_to(update_fields) and instance.reports_to_id != getattr(instance, '_previous_reports_to_id', None):
+        attach_user(instance.pk, instance.reports_to_id)
+
+
+@receiver(pre_delete, sender=User)
+def detach_user_hierarchy(sender, instance, **kwargs):
+    detach_subordinates(instance.pk)
+
+
+@receiver(post_save, sender=RolePermission)
+@receiver(post_delete, sender=RolePermission)
+def role_permissions_changed(sender, **kwargs):
+    transaction.on_commit(invalidate_permission_matrix)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, update_fields=None, **kwargs):
+    # Covers password, role and is_active changes; cached request.user must not go stale.
+    # A login only stamps last_login, which is no reason to drop the user's tokens.
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    user_id = instance.pk
+    transaction.on_commit(lambda: invalidate_token_cache(user_id=user_id))
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    key, user_id = instance.key, instance.user_id
+    transaction.on_commit(lambda: invalidate_token_cache(key=key, user_id=user_id))
@@ -1,3 +1,189 @@
-from django.test import TestCase
+import tempfile
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from core.version_stamps import bump_version
+from . import permission_matrix
+from .authentication import VERSION_CACHE_KEY as TOKEN_VERSION_KEY, CachedTokenAuthentication, _token_cache_ttl
+from .hierarchy import rebuild_hierarchy
+from .models import RolePermission, User, UserHierarchy
+
+
+def expected_closure():
+    """(ancestor, descendant, depth) rows walked from User.reports_to."""
+    parents = dict(User.objects.values_list('id', 'reports_to_id'))
+    rows = set()
+    for user_id in parents:
+        ancestor_id, depth, seen = user_id, 0, set()
+        while ancestor_id and ancestor_id not in seen:
+            rows.add((ancestor_id, user_id, depth))
+            seen.add(ancestor_id)
+            ancestor_id, depth = parents.get(ancestor_id), depth + 1
+    return rows
+
+
+class UserHierarchyTests(TestCase):
+    def setUp(self):
+        self.head = self.make_user('head')
+        self.lead = self.make_user('lead', reports_to=self.head)
+        self.rep = self.make_user('rep', reports_to=self.lead)
+        self.junior = self.make_user('junior', reports_to=self.rep)
+        self.other = self.make_user('other')
+
+    def make_user(self, username, **fields):
+        return User.objects.create_user(username, f'{username}@example.com', 'x', role='SALES', **fields)
+
+    def assertClosureMatchesReportsTo(self):
+        self.assertEqual(set(UserHierarchy.objects.values_list('ancestor_id', 'descendant_id', 'depth')), expected_closure())
+
+    def test_created_users_are_linked_to_every_ancestor(self):
+        self.assertClosureMatchesReportsTo()
+        self.assertEqual(UserHierarchy.objects.get(ancestor=self.head, descendant=self.junior).depth, 3)
+
+    def test_moving_a_user_moves_their_subtree(self):
+        self.rep.reports_to = self.other
+        self.rep.save()
+        self.assertClosureMatchesReportsTo()
+        self.assertFalse(UserHierarchy.objects.filter(ancestor=self.head, descendant=self.junior).exists())
+        self.assertEqual(UserHierarchy.objects.get(ancestor=self.other, descendant=self.junior).depth, 2)
+
+    def test_detaching_a_user_makes_their_subtree_a_root(self):
+        self.lead.reports_to = None
+        self.lead.save()
+        self.assertClosureMatchesReportsTo()
+
+    def test_saves_without_reports_to_leave_the_tree_alone(self):
+        self.rep.first_name = 'Renamed'
+        self.rep.save(update_fields=['first_name'])
+        self.assertClosureMatchesReportsTo()
+
+    def test_cycles_are_not_linked(self):
+        self.head.reports_to = self.junior
+        with self.assertLogs('users.hierarchy', 'WARNING'):
+            self.head.save()
+        rows = set(UserHierarchy.objects.values_list('ancestor_id', 'descendant_id'))
+        self.assertNotIn((self.junior.pk, self.head.pk), rows)
+        self.assertIn((self.head.pk, self.junior.pk), rows)
+
+    def test_deleting_a_user_detaches_their_reports(self):
+        self.lead.delete()
+        self.assertClosureMatchesReportsTo()
+        self.assertFalse(UserHierarchy.objects.filter(ancestor=self.head, descendant=self.rep).exists())
+
+    def test_rebuild_matches_incremental_maintenance(self):
+        self.rep.reports_to = self.other
+        self.rep.save()
+        incremental = set(UserHierarchy.objects.values_list('ancestor_id', 'descendant_id', 'depth'))
+        UserHierarchy.objects.all().delete()
+        rebuild_hierarchy()
+        self.assertEqual(set(UserHierarchy.objects.values_list('ancestor_id', 'descendant_id', 'depth')), incremental)
+
+
+class PermissionMatrixTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        permission_matrix.invalidate_permission_matrix()
+        self.perm = RolePermission.objects.create(role='SALES', module='CRM_TASKS', can_view=True)
+
+    def test_matrix_is_compiled_once(self):
+        permission_matrix.get_permission_matrix()
+        with self.assertNumQueries(0):
+            self.assertTrue(permission_matrix.has_module_permission('SALES', 'CRM_TASKS', 'GET'))
+            self.assertFalse(permission_matrix.has_module_permission('SALES', 'CRM_TASKS', 'DELETE'))
+
+    def test_module_aliases(self):
+        self.assertTrue(permission_matrix.has_module_permission('SALES', 'SALES', 'GET'))
+        self.assertFalse(permission_matrix.has_module_permission('SALES', 'SALES', 'POST'))
+        self.assertEqual(permission_matrix.role_flags('SALES')['CRM_TASKS'], {'view': True, 'add': False, 'edit': False, 'delete': False})
+
+    def test_role_permission_writes_invalidate_after_commit(self):
+        self.assertFalse(permission_matrix.has_module_permission('SALES', 'CRM_TASKS', 'DELETE'))
+        self.perm.can_delete = True
+        with self.captureOnCommitCallbacks(execute=True):
+            self.perm.save()
+        self.assertTrue(permission_matrix.has_module_permission('SALES', 'CRM_TASKS', 'DELETE'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.perm.delete()
+        self.assertFalse(permission_matrix.has_module_permission('SALES', 'CRM_TASKS', 'GET'))
+
+    def test_bump_from_another_worker_reloads(self):
+        permission_matrix.get_permission_matrix()
+        RolePermission.objects.filter(pk=self.perm.pk).update(can_add=True)
+        self.assertFalse(permission_matrix.has_module_permission('SALES', 'CRM_TASKS', 'POST'))
+        # What another worker's invalidate_permission_matrix leaves in the shared cache
+        bump_version(permission_matrix.VERSION_CACHE_KEY)
+        self.assertTrue(permission_matrix.has_module_permission('SALES', 'CRM_TASKS', 'POST'))
+
+    @override_settings(LOCAL_CACHE_MAX_AGE=0)
+    def test_local_copy_expires_under_a_per_process_cache(self):
+        permission_matrix.get_permission_matrix()
+        RolePermission.objects.filter(pk=self.perm.pk).update(can_add=True)
+        self.assertTrue(permission_matrix.has_module_permission('SALES', 'CRM_TASKS', 'POST'))
+
+
+class TokenCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('sales', 'sales@example.com', 'x', role='SALES')
+        self.other = User.objects.create_user('other', 'other@example.com', 'x', role='SALES')
+        self.token = Token.objects.create(user=self.user)
+        self.auth = CachedTokenAuthentication()
+
+    def authenticate(self):
+        return self.auth.authenticate_credentials(self.token.key)
+
+    def save(self, instance, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            instance.save(**kwargs)
+
+    def test_repeat_lookups_skip_the_database(self):
+        user, token = self.authenticate()
+        self.assertEqual((user.pk, token.key), (self.user.pk, self.token.key))
+        with self.assertNumQueries(0):
+            self.assertEqual(self.authenticate()[0].pk, self.user.pk)
+
+    def test_cached_user_is_a_copy(self):
+        self.authenticate()[0].role = 'SUPER_ADMIN'
+        self.assertEqual(self.authenticate()[0].role, 'SALES')
+
+    def test_other_users_and_logins_keep_the_entry(self):
+        self.authenticate()
+        self.other.first_name = 'Renamed'
+        self.save(self.other)
+        self.user.last_login = timezone.now()
+        self.save(self.user, update_fields=['last_login'])
+        with self.assertNumQueries(0):
+            self.authenticate()
+
+    def test_deactivation_is_seen_immediately(self):
+        self.authenticate()
+        self.user.is_active = False
+        self.save(self.user)
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_logout_is_seen_immediately(self):
+        self.authenticate()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.token.delete()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_bump_from_another_worker_refetches(self):
+        self.authenticate()
+        User.objects.filter(pk=self.user.pk).update(role='MENTOR')
+        # What another worker's invalidate_token_cache(user_id=...) leaves in the shared cache
+        bump_version(TOKEN_VERSION_KEY.format(self.user.pk))
+        self.assertEqual(self.authenticate()[0].role, 'MENTOR')
+
+    @override_settings(TOKEN_AUTH_CACHE_TTL=300, LOCAL_CACHE_MAX_AGE=20)
+    def test_ttl_is_capped_under_a_per_process_cache(self):
+        self.assertEqual(_token_cache_ttl(), 20)
+        shared = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': tempfile.gettempdir()}}
+        with self.settings(CACHES=shared):
+            self.assertEqual(_token_cache_ttl(), 300)
@@ -1,7 +1,7 @@
 
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import LoginView, UserDetailView, UserViewSet, MentorListView, TeacherListView, TeacherViewSet, RolePermissionViewSet, ExpoTokenView
+from .views import LoginView, UserDetailView, UserViewSet, MentorListView, TeacherListView, TeacherViewSet, RolePermissionViewSet, ExpoTokenView, OrgChartView, LogoutView, TokenCacheStatsView
 
 router = DefaultRouter()
 router.register(r'users', UserViewSet, basename='user')
@@ -10,9 +10,12 @@ router.register(r'permissions', RolePermissionViewSet)
 
 urlpatterns = [
     path('login/', LoginView.as_view(), name='login'),
+    path('logout/', LogoutView.as_view(), name='logout'),
+    path('token-cache-stats/', TokenCacheStatsView.as_view(), name='token-cache-stats'),
     path('me/', UserDetailView.as_view(), name='user-detail'),
     path('mentors/', MentorListView.as_view(), name='mentor-list'),
     path('teachers/', TeacherListView.as_view(), name='teacher-list'),
+    path('org-chart/', OrgChartView.as_view(), name='org-chart'),
     path('management/', include(router.urls)),
     path('expo-token/', ExpoTokenView.as_view(), name='expo-token'),
 ]
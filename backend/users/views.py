@@ -4,7 +4,8 @@ from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
 from django.contrib.auth import authenticate
 from .serializers import UserSerializer, RolePermissionSerializer
-from .models import RolePermission
+from .models import RolePermission, UserHierarchy
+from core.conditional import ConditionalGetMixin
 from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 from django.contrib.auth import get_user_model
 
@@ -28,12 +29,35 @@ class LoginView(views.APIView):
             })
         return Response({'error': 'Invalid Credentials'}, status=status.HTTP_400_BAD_REQUEST)
 
+class LogoutView(views.APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        # Deleting the token also evicts it from the token auth cache (users.signals)
+        Token.objects.filter(user=request.user).delete()
+        return Response({'status': 'logged out'})
+
+class TokenCacheStatsView(views.APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        from .authentication import token_cache
+        # Counters are per worker process
+        return Response(token_cache.stats())
+
 class UserDetailView(views.APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
+        from .permission_matrix import role_masks, FLAG_BITS
         serializer = UserSerializer(request.user)
-        return Response(serializer.data)
+        data = serializer.data
+        # Compiled bitmasks so the frontend can gate UI with the same check the API uses
+        data['permission_matrix'] = {
+            'bits': FLAG_BITS,
+            'modules': role_masks(request.user.role),
+        }
+        return Response(data)
 
 class UserViewSet(viewsets.ModelViewSet):
     serializer_class = UserSerializer
@@ -51,18 +75,66 @@ class UserViewSet(viewsets.ModelViewSet):
                 queryset = queryset.filter(role=role)
         return queryset.order_by('-id')
 
-class MentorListView(generics.ListAPIView):
+class MentorListView(ConditionalGetMixin, generics.ListAPIView):
     serializer_class = UserSerializer
     permission_classes = [IsAuthenticated]
     pagination_class = None
+    # UserSerializer includes teacher batches and class counts
+    conditional_families = ('users', 'teaching')
 
     def get_queryset(self):
         return User.objects.filter(role='MENTOR')
 
-class TeacherListView(generics.ListAPIView):
+class OrgChartView(views.APIView):
+    """
+    Nested reports_to tree. Admins get every tree (or the one under ?root=<id>);
+    other users get their own subtree, or a subordinate's via ?root=.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        user = request.user
+        is_admin = user.role in ['ADMIN', 'SUPER_ADMIN'] or user.is_superuser
+        root = request.query_params.get('root')
+        if root is not None and not str(root).isdigit():
+            return Response({'error': 'root must be a user id'}, status=status.HTTP_400_BAD_REQUEST)
+        if root is None and not is_admin:
+            root = user.id
+        if root is not None and not is_admin and not user.subordinate_ids(include_self=True).filter(descendant_id=root).exists():
+            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+
+        members = User.objects.filter(is_active=True)
+        if root is not None:
+            members = members.filter(id__in=UserHierarchy.objects.filter(ancestor_id=root).values('descendant_id'))
+        rows = list(members.order_by('first_name', 'username').values('id', 'username', 'first_name', 'last_name', 'role', 'reports_to_id'))
+
+        nodes = {}
+        for row in rows:
+            nodes[row['id']] = {
+                'id': row['id'],
+                'username': row['username'],
+                'name': f"{row['first_name']} {row['last_name']}".strip() or row['username'],
+                'role': row['role'],
+                'reports_to': row['reports_to_id'],
+                'children': [],
+            }
+        roots = []
+        for node in nodes.values():
+            parent = nodes.get(node['reports_to'])
+            if parent is not None and node['id'] != (int(root) if root is not None else None):
+                parent['children'].append(node)
+            else:
+                roots.append(node)
+        if root is None:
+            # Whole organisation: only people who are part of some reporting line
+            roots = [n for n in roots if n['children'] or n['reports_to']]
+        return Response(roots)
+
+class TeacherListView(ConditionalGetMixin, generics.ListAPIView):
     serializer_class = UserSerializer
     permission_classes = [IsAuthenticated]
     pagination_class = None
+    conditional_families = ('users', 'teaching')
 
     def get_queryset(self):
         return User.objects.filter(role='TEACHER')